@@ -0,0 +1,32 @@
+import pytest
+
+import crud
+from pagination_model import PaginationParams
+
+ERRORS_JSONPATH = '$.issue_logs[*].severity == "error"'
+
+
+@pytest.fixture
+def db(benchmark_database):
+    with benchmark_database() as session:
+        yield session
+
+
+@pytest.mark.parametrize("page", ["first", "last"])
+def test_get_response_details(benchmark, db, seeded_request, rows, page):
+    params = PaginationParams(offset=0 if page == "first" else rows - 50, limit=50)
+
+    result = benchmark(crud.get_response_details, db, seeded_request, None, params)
+
+    assert result.total_results_available == rows
+    assert len(result.data) == 50
+
+
+def test_get_response_details_with_jsonpath(benchmark, db, seeded_request, rows):
+    params = PaginationParams(offset=0, limit=50)
+
+    result = benchmark(
+        crud.get_response_details, db, seeded_request, ERRORS_JSONPATH, params
+    )
+
+    assert result.total_results_available == rows // 10
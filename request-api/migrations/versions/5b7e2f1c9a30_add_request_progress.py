@@ -0,0 +1,28 @@
+"""add request progress
+
+Revision ID: 5b7e2f1c9a30
+Revises: d45c986e2727
+Create Date: 2026-10-19 09:12:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "5b7e2f1c9a30"
+down_revision = "d45c986e2727"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "request",
+        sa.Column("progress", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("request", "progress")
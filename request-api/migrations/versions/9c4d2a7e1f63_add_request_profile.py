@@ -0,0 +1,42 @@
+"""add request profile
+
+Revision ID: 9c4d2a7e1f63
+Revises: 5b7e2f1c9a30
+Create Date: 2026-10-19 15:27:09.331842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import func
+
+
+# revision identifiers, used by Alembic.
+revision = "9c4d2a7e1f63"
+down_revision = "5b7e2f1c9a30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "request_profile",
+        sa.Column(
+            "id", sa.BIGINT(), primary_key=True, autoincrement=True, nullable=False
+        ),
+        sa.Column("request_id", sa.Text(), sa.ForeignKey("request.id"), nullable=False),
+        sa.Column(
+            "created",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=func.now(),
+        ),
+        sa.Column("seconds", sa.Float(), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("idx_request_profile_request_id", "request_profile", ["request_id"])
+    op.create_index("idx_request_profile_created", "request_profile", ["created"])
+
+
+def downgrade():
+    op.drop_table("request_profile")
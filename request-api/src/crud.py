@@ -58,3 +58,30 @@ def create_request(db: Session, request: schemas.RequestCreate):
     db.commit()
     db.refresh(db_request)
     return db_request
+
+
+def get_slowest_profiles(db: Session, since, limit: int):
+    """The slowest requests profiled since the given time, without their profiles."""
+    return (
+        db.query(
+            models.RequestProfile.request_id,
+            models.Request.type,
+            models.Request.params["dataset"].astext.label("dataset"),
+            models.RequestProfile.created,
+            models.RequestProfile.seconds,
+        )
+        .join(models.Request, models.Request.id == models.RequestProfile.request_id)
+        .filter(models.RequestProfile.created >= since)
+        .order_by(models.RequestProfile.seconds.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def get_profile(db: Session, request_id: str):
+    return (
+        db.query(models.RequestProfile)
+        .filter(models.RequestProfile.request_id == request_id)
+        .order_by(models.RequestProfile.created.desc())
+        .first()
+    )
@@ -1,12 +1,13 @@
 import logging
 import os
-from datetime import datetime
-from typing import List, Dict, Any
+import secrets
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
 import sentry_sdk
 
-import boto3
-from botocore.exceptions import ClientError, BotoCoreError
-from fastapi import FastAPI, Depends, Request, Response, HTTPException
+from fastapi import FastAPI, Depends, Header, Query, Request, Response, HTTPException
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.starlette import StarletteIntegration
 from slack_sdk import WebClient
@@ -15,6 +16,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 import crud
+import metrics
 from database import session_maker
 from pagination_model import PaginationParams
 from request_model import models, schemas
@@ -23,7 +25,10 @@ from schema import (
     HealthCheckResponse,
     HealthStatus,
     DependencyHealth,
+    ProfileSummary,
 )
+from task_interface import aws_clients, tracing
+from task_interface.health import HealthMonitor
 from task_interface.base_tasks import (
     celery,
     CheckDataFileTask,
@@ -49,7 +54,22 @@ if os.environ.get("SENTRY_ENABLED", "false").lower() == "true":
         enable_logs=True,
     )
 
-app = FastAPI()
+tracing.init("request-api")
+
+# Token for the admin endpoints and for profiling requests, which are disabled without one
+ADMIN_API_TOKEN = os.environ.get("ADMIN_API_TOKEN")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_monitor.start()
+    yield
+    health_monitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
 
 
 def send_slack_alert(message):
@@ -69,6 +89,13 @@ def is_connection_restored(last_attempt_time, max_retry_duration=60):
     return (current_time - last_attempt_timestamp) > max_retry_duration
 
 
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
 # Dependency
 def _get_db():
     retries = 5
@@ -84,80 +111,104 @@ def _get_db():
             logging.exception(f"Database connection failed (Attempt {attempt+1}): {e}")
             if is_connection_restored(datetime.now()):
                 break
-    send_slack_alert("DB connection issue detected in async-request-backend..")
+    # request-db outages are alerted on by the health monitor
 
 
-def _get_sqs_client():
-    retries = 5
-    for attempt in range(retries):
-        try:
-            logging.info(f"SQS client successfully connected on attempt {attempt}.")
-            return boto3.client("sqs")
-        except (ClientError, BotoCoreError) as e:
-            logging.exception(
-                f"SQS connection failed on attempt {attempt}. Retrying...Error: {e}"
-            )
-            if is_connection_restored(datetime.now()):
-                break
-    send_slack_alert("SQS connection issue detected in async-request-backend..")
+def _probe_db():
+    db = session_maker()()
+    try:
+        return len(db.execute(text("SELECT 1")).all()) == 1
+    finally:
+        db.close()
 
 
-@app.get("/health", response_model=HealthCheckResponse)
-def healthcheck(
-    response: Response, db: Session = Depends(_get_db), sqs=Depends(_get_sqs_client)
-):
-    try:
-        db_result = db.execute(text("SELECT 1"))
-        db_reachable = len(db_result.all()) == 1
-    except SQLAlchemyError:
-        logging.exception(
-            "Health check of request-db failed",
-        )
-        db_reachable = False
+def _probe_sqs():
+    aws_clients.client("sqs").get_queue_url(QueueName="celery")
+    return True
 
-    try:
-        sqs.get_queue_url(QueueName="celery")
-        queue_reachable = True
-    except (ClientError, BotoCoreError):
-        logging.exception("Health check of sqs failed")
-        queue_reachable = False
 
-    response.status_code = 200 if db_reachable & queue_reachable else 500
+# The alert text operators filter on, by probe
+UNHEALTHY_ALERTS = {
+    "request-db": "DB connection issue detected in async-request-backend..",
+    "sqs": "SQS connection issue detected in async-request-backend..",
+}
 
+health_monitor = HealthMonitor(
+    {"request-db": _probe_db, "sqs": _probe_sqs},
+    on_unhealthy=lambda name: send_slack_alert(UNHEALTHY_ALERTS[name]),
+)
+
+
+def _health_response(dependencies=None, checked=None, age=None):
     return HealthCheckResponse(
         name="request-api",
         version=os.environ.get("GIT_COMMIT", "unknown"),
         dependencies=[
             DependencyHealth(
-                name="request-db",
-                status=HealthStatus.HEALTHY if db_reachable else HealthStatus.UNHEALTHY,
-            ),
-            DependencyHealth(
-                name="sqs",
-                status=HealthStatus.HEALTHY
-                if queue_reachable
-                else HealthStatus.UNHEALTHY,
-            ),
+                name=name,
+                status=HealthStatus.HEALTHY if healthy else HealthStatus.UNHEALTHY,
+            )
+            for name, healthy in (dependencies or {}).items()
         ],
+        checked=checked,
+        age_seconds=age,
     )
 
 
+def _dependency_health(response: Response, unhealthy_status_code):
+    results, checked, age = health_monitor.status()
+    healthy = all(results.values()) and health_monitor.is_fresh(age)
+    response.status_code = 200 if healthy else unhealthy_status_code
+    return _health_response(results, checked, age)
+
+
+@app.get("/health", response_model=HealthCheckResponse)
+def healthcheck(response: Response):
+    """Dependency health from the last background probe."""
+    return _dependency_health(response, 500)
+
+
+@app.get("/health/live", response_model=HealthCheckResponse)
+def liveness():
+    """The api is serving requests, dependencies are not checked."""
+    return _health_response()
+
+
+@app.get("/health/ready", response_model=HealthCheckResponse)
+def readiness(response: Response):
+    """Whether the api can take requests, 503 until its dependencies are healthy."""
+    return _dependency_health(response, 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/requests", status_code=202, response_model=schemas.Request)
 def create_request(
     request: schemas.RequestCreate,
     http_request: Request,
     http_response: Response,
+    profile: bool = False,
+    x_admin_token: Optional[str] = Header(None),
     db: Session = Depends(_get_db),
 ):
+    if profile:
+        _require_admin(x_admin_token)
     request_schema = _map_to_schema(request_model=crud.create_request(db, request))
+    task_request = request_schema.model_dump()
+    if profile:
+        # The worker profiles the task and saves the profile with the request
+        task_request["profile"] = True
 
     try:
         if request_schema.type == "check_file":
-            CheckDataFileTask.delay(request_schema.model_dump())
+            metrics.enqueue(CheckDataFileTask, task_request)
         elif request_schema.type == "check_url":
-            CheckDataUrlTask.delay(request_schema.model_dump())
+            metrics.enqueue(CheckDataUrlTask, task_request)
         elif request_schema.type == "add_data":
-            AddDataTask.delay(request_schema.model_dump())
+            metrics.enqueue(AddDataTask, task_request)
         else:
             raise ValueError("invalid request type")
 
@@ -208,6 +259,48 @@ def read_response_details(
     return list(map(lambda detail: detail.detail, paginated_result.data))
 
 
+@app.get(
+    "/admin/profiles",
+    response_model=List[ProfileSummary],
+    dependencies=[Depends(_require_admin)],
+)
+def read_profiles(
+    limit: int = Query(20, ge=1, le=100),
+    days: int = Query(7, ge=1),
+    db: Session = Depends(_get_db),
+):
+    """The slowest requests profiled in the last few days."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return crud.get_slowest_profiles(db, since, limit)
+
+
+def _get_profile(db, request_id):
+    profile = crud.get_profile(db, request_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=404, detail=f"No profile found for request {request_id}"
+        )
+    return profile
+
+
+@app.get("/admin/profiles/{request_id}", dependencies=[Depends(_require_admin)])
+def read_profile(request_id: str, db: Session = Depends(_get_db)):
+    """The profile in the pstats format, for pstats, snakeviz and similar tools."""
+    profile = _get_profile(db, request_id)
+    return Response(
+        profile.data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{request_id}.prof"'},
+    )
+
+
+@app.get("/admin/profiles/{request_id}/summary", dependencies=[Depends(_require_admin)])
+def read_profile_summary(request_id: str, db: Session = Depends(_get_db)):
+    """The slowest calls of the profile, by cumulative time."""
+    profile = _get_profile(db, request_id)
+    return Response(profile.summary or "", media_type="text/plain")
+
+
 def _map_to_schema(request_model: models.Request) -> schemas.Request:
     response = None
     if request_model.response:
@@ -228,4 +321,5 @@ def _map_to_schema(request_model: models.Request) -> schemas.Request:
         modified=request_model.modified,
         params=request_model.params,
         response=response,
+        progress=request_model.progress,
     )
@@ -0,0 +1,179 @@
+"""
+Prometheus metrics for the api, served from /metrics.
+
+Requests are measured by a plain ASGI middleware and labelled with the route
+template rather than the path, so /requests/{request_id} is one series. The
+queries made while handling a request are counted by SQLAlchemy engine events
+into a per-request context variable. Connection pool gauges are read when
+/metrics is scraped.
+"""
+
+import time
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+import database
+from task_interface import tracing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time taken to handle a request",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries made while handling a request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50),
+)
+DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries while handling a request",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+ENQUEUE_LATENCY = Histogram(
+    "celery_enqueue_duration_seconds",
+    "Time taken to send a task to the broker",
+    ["task"],
+    buckets=LATENCY_BUCKETS,
+)
+ENQUEUE_FAILURES = Counter(
+    "celery_enqueue_failures_total", "Tasks that could not be sent", ["task"]
+)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_query_stats = ContextVar("query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _query_finished(conn):
+    started = conn.info["query_start"].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    _query_finished(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _query_error(exception_context):
+    # Failed queries skip after_cursor_execute, so their start is popped here
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        _query_finished(conn)
+
+
+def _route_template(app, scope):
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Records latency, response size and database use per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        response = {"status": 500, "size": 0}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _query_stats.reset(token)
+            route = _route_template(scope["app"], scope)
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route, response["status"]).observe(
+                time.perf_counter() - start
+            )
+            RESPONSE_SIZE.labels(method, route).observe(response["size"])
+            DB_QUERIES.labels(route).observe(stats.count)
+            DB_DURATION.labels(route).observe(stats.seconds)
+
+
+def enqueue(task, *args):
+    """task.delay(*args), timed."""
+    start = time.perf_counter()
+    try:
+        with tracing.client_call(
+            f"send {task.name}",
+            tracing.PRODUCER,
+            **{"messaging.system": "celery", "messaging.destination.name": task.name},
+        ):
+            return task.delay(*args)
+    except Exception:
+        ENQUEUE_FAILURES.labels(task.name).inc()
+        raise
+    finally:
+        ENQUEUE_LATENCY.labels(task.name).observe(time.perf_counter() - start)
+
+
+class PoolCollector:
+    """Connection pool gauges, read at scrape time once the engine exists."""
+
+    def collect(self):
+        if not database.engine.cache_info().currsize:
+            return
+        pool = database.engine().pool
+        for name, documentation, method in (
+            ("db_pool_size", "Connections kept in the pool", "size"),
+            ("db_pool_checked_out", "Connections in use", "checkedout"),
+            ("db_pool_overflow", "Connections over the pool size", "overflow"),
+        ):
+            if hasattr(pool, method):
+                yield GaugeMetricFamily(
+                    name, documentation, value=getattr(pool, method)()
+                )
+
+
+REGISTRY.register(PoolCollector())
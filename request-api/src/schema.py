@@ -1,7 +1,8 @@
+from datetime import datetime
 from enum import Enum
 from typing import Optional, List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ReadResponseDetailsParams(BaseModel):
@@ -24,3 +25,14 @@ class HealthCheckResponse(BaseModel):
     name: str
     version: str
     dependencies: List[DependencyHealth]
+    checked: Optional[datetime] = None
+    age_seconds: Optional[float] = None
+
+
+class ProfileSummary(BaseModel):
+    request_id: str
+    type: str
+    dataset: Optional[str] = None
+    created: datetime
+    seconds: float
+    model_config = ConfigDict(from_attributes=True)
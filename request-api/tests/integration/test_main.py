@@ -10,58 +10,60 @@ from botocore.exceptions import ClientError
 
 from crud import get_response_details
 import database
-from main import app, _get_db, _get_sqs_client, send_slack_alert
+import main
+from task_interface.health import HealthMonitor
+from main import app, _get_db, _probe_sqs, send_slack_alert
 from request_model import schemas, models
 
 client = TestClient(app)
 
 
-@patch("main.boto3.client")
-def test_get_sqs_client_success(mock_boto_client):
+@patch("main.aws_clients.client")
+def test_probe_sqs_uses_shared_client(mock_aws_client):
     mock_sqs_client = MagicMock()
-    mock_boto_client.return_value = mock_sqs_client
-    sqs_client_instance = _get_sqs_client()
-    assert sqs_client_instance == mock_sqs_client
-    mock_boto_client.assert_called_once()
+    mock_aws_client.return_value = mock_sqs_client
 
-
-@patch("main.boto3.client")
-def test_get_sqs_client_retry(mock_boto_client):
-    mock_sqs_client = MagicMock()
-    mock_boto_client.return_value = mock_sqs_client
-
-    # Simulate the first 3 attempts failing, and the 4th attempt succeeding
-    mock_boto_client.side_effect = [
-        ClientError({"Error": {"Code": "ThrottlingException"}}, "CreateQueue"),
-        ClientError({"Error": {"Code": "ThrottlingException"}}, "CreateQueue"),
-        ClientError({"Error": {"Code": "ThrottlingException"}}, "CreateQueue"),
-        mock_sqs_client,  # 4th attempt succeeds
-    ]
-    sqs_client_instance = _get_sqs_client()
-    assert mock_boto_client.call_count == 4
-    assert sqs_client_instance == mock_sqs_client
+    assert _probe_sqs() is True
+    mock_aws_client.assert_called_once_with("sqs")
+    mock_sqs_client.get_queue_url.assert_called_once_with(QueueName="celery")
 
 
-@patch("main.boto3.client")
+@patch("main.aws_clients.client")
 @patch("main.send_slack_alert")
-@patch("main.is_connection_restored", return_value=False)
-def test_get_sqs_client_fails_after_retries(
-    mock_restored, mock_slack, mock_boto_client
-):
-    mock_boto_client.side_effect = ClientError(
-        {"Error": {"Code": "ThrottlingException"}}, "CreateQueue"
+def test_sqs_failure_alerts_once(mock_slack, mock_aws_client):
+    mock_aws_client.return_value.get_queue_url.side_effect = ClientError(
+        {"Error": {"Code": "ThrottlingException"}}, "GetQueueUrl"
+    )
+    monitor = HealthMonitor(
+        {"sqs": _probe_sqs}, on_unhealthy=main.health_monitor.on_unhealthy
     )
-    with patch("main.logging.exception") as mock_log:
-        sqs_client = _get_sqs_client()
-        assert sqs_client is None  # Should return None after all retries
 
-        assert mock_boto_client.call_count == 5
+    with patch("task_interface.health.logging.exception") as mock_log:
+        assert monitor.probe() == {"sqs": False}
+        monitor.probe()
+
         mock_slack.assert_called_once_with(
             "SQS connection issue detected in async-request-backend.."
         )
         mock_log.assert_called()
 
 
+@patch("main.session_maker", side_effect=SQLAlchemyError("DB connection failed"))
+@patch("main.send_slack_alert")
+def test_db_failure_alerts_once(mock_slack, mock_session_maker):
+    monitor = HealthMonitor(
+        {"request-db": main._probe_db}, on_unhealthy=main.health_monitor.on_unhealthy
+    )
+
+    with patch("task_interface.health.logging.exception"):
+        assert monitor.probe() == {"request-db": False}
+        monitor.probe()
+
+    mock_slack.assert_called_once_with(
+        "DB connection issue detected in async-request-backend.."
+    )
+
+
 @pytest.fixture
 def mock_session_maker():
     with mock.patch("main.session_maker") as mock_session:
@@ -107,9 +109,8 @@ def test_get_db_fails_after_retries(mock_restored, mock_slack, mock_session_make
         assert next(generator, None) is None
 
         assert mock_session_maker.call_count == 5
-        mock_slack.assert_called_once_with(
-            "DB connection issue detected in async-request-backend.."
-        )
+        # The health monitor alerts on request-db, not each request
+        mock_slack.assert_not_called()
         mock_log.assert_called()
 
 
@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from main import app
+from task_interface import aws_clients
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    aws_clients.reset()
+    yield
+    aws_clients.reset()
+
+
+def _created(service):
+    return (
+        REGISTRY.get_sample_value("aws_clients_created_total", {"service": service})
+        or 0
+    )
+
+
+def test_client_is_created_once_and_reused():
+    before = _created("sqs")
+
+    first = aws_clients.client("sqs", region_name="eu-west-2")
+    second = aws_clients.client("sqs", region_name="eu-west-2")
+
+    assert first is second
+    assert _created("sqs") - before == 1
+
+
+def test_client_is_configured_for_pooling_and_adaptive_retries():
+    sqs = aws_clients.client("sqs", region_name="eu-west-2")
+
+    assert sqs.meta.config.max_pool_connections == aws_clients.AWS_MAX_POOL_CONNECTIONS
+    assert sqs.meta.config.retries["mode"] == "adaptive"
+    assert sqs.meta.config.connect_timeout == aws_clients.AWS_CONNECT_TIMEOUT_SECONDS
+
+
+def test_clients_are_kept_per_region():
+    before = _created("s3")
+
+    london = aws_clients.client("s3", region_name="eu-west-2")
+    ireland = aws_clients.client("s3", region_name="eu-west-1")
+
+    assert london is not ireland
+    assert _created("s3") - before == 2
+
+
+def test_clients_created_are_served_from_metrics():
+    aws_clients.client("sqs", region_name="eu-west-2")
+
+    response = TestClient(app).get("/metrics")
+
+    assert b'aws_clients_created_total{service="sqs"}' in response.content
@@ -0,0 +1,63 @@
+import threading
+from unittest.mock import MagicMock
+
+from task_interface.health import HealthMonitor
+
+
+def test_probe_times_out_slow_dependencies():
+    release = threading.Event()
+    monitor = HealthMonitor(
+        {"request-db": lambda: True, "sqs": lambda: release.wait(5)}, timeout=0.05
+    )
+
+    try:
+        results = monitor.probe()
+    finally:
+        release.set()
+
+    assert results == {"request-db": True, "sqs": False}
+
+
+def test_stuck_probe_is_not_started_again():
+    release = threading.Event()
+    calls = []
+
+    def slow_probe():
+        calls.append(1)
+        return release.wait(5)
+
+    monitor = HealthMonitor({"sqs": slow_probe}, timeout=0.05)
+    try:
+        monitor.probe()
+        monitor.probe()
+    finally:
+        release.set()
+
+    assert len(calls) == 1
+
+
+def test_failing_probe_is_unhealthy_and_alerts_once():
+    on_unhealthy = MagicMock()
+    monitor = HealthMonitor(
+        {"sqs": MagicMock(side_effect=RuntimeError("down"))},
+        on_unhealthy=on_unhealthy,
+    )
+
+    assert monitor.probe() == {"sqs": False}
+    monitor.probe()
+
+    on_unhealthy.assert_called_once_with("sqs")
+
+
+def test_status_reports_age_of_last_probe():
+    clock = MagicMock(return_value=100)
+    monitor = HealthMonitor({"sqs": lambda: True}, max_age=30, clock=clock)
+    monitor.probe()
+    clock.return_value = 110
+
+    results, checked, age = monitor.status()
+
+    assert results == {"sqs": True}
+    assert checked is not None
+    assert age == 10
+    assert monitor.is_fresh(age)
@@ -6,15 +6,16 @@ from botocore.exceptions import BotoCoreError
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from kombu.exceptions import OperationalError
-from sqlalchemy import Result
+from sqlalchemy import Result, text
 from sqlalchemy.engine.result import ResultMetaData
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 import main
+from task_interface.health import HealthMonitor
 from main import app
 from request_model import models, schemas
-from schema import HealthCheckResponse, DependencyHealth, HealthStatus
+from schema import DependencyHealth, HealthStatus
 
 client = TestClient(app)
 
@@ -60,6 +61,24 @@ def test_read_request_when_not_found(mock_get_request):
         assert 400 == exception.value.detail["errCode"]
 
 
+def test_read_request_includes_progress():
+    request_model = _create_request_model()
+    request_model.status = "PROCESSING"
+    request_model.progress = {
+        "stage": "transforming",
+        "rows_processed": 50000,
+        "rows_total": 200000,
+        "updated": "2024-05-16T07:38:06+00:00",
+    }
+
+    with patch("crud.get_request", return_value=request_model):
+        request_schema = main.read_request(request_model.id, db=MagicMock())
+
+    assert request_schema.progress.stage == "transforming"
+    assert request_schema.progress.rows_processed == 50000
+    assert request_schema.progress.rows_total == 200000
+
+
 @pytest.mark.parametrize(
     "db_status, sqs_status, expected_status, expected_response",
     [
@@ -114,16 +133,157 @@ def test_healthcheck(
         mock_db.execute = MagicMock(side_effect=SQLAlchemyError())
     if not sqs_status:
         mock_sqs.get_queue_url = MagicMock(side_effect=BotoCoreError())
-
-    response = main.healthcheck(response=mock_response, db=mock_db, sqs=mock_sqs)
-    assert response == HealthCheckResponse(
-        name="request-api",
-        version="unknown",
-        dependencies=expected_response,
+    monitor = HealthMonitor(
+        {
+            "request-db": lambda: len(mock_db.execute(text("SELECT 1")).all()) == 1,
+            "sqs": lambda: mock_sqs.get_queue_url(QueueName="celery") is not None,
+        }
     )
+
+    with patch("main.health_monitor", monitor):
+        response = main.healthcheck(response=mock_response)
+
+    assert response.name == "request-api"
+    assert response.version == "unknown"
+    assert response.dependencies == expected_response
+    assert response.checked is not None
+    assert response.age_seconds >= 0
     assert mock_response.status_code == expected_status
 
 
+def test_healthcheck_returns_cached_result(mock_response):
+    probe = MagicMock(return_value=True)
+    monitor = HealthMonitor({"sqs": probe})
+
+    with patch("main.health_monitor", monitor):
+        main.healthcheck(response=mock_response)
+        main.healthcheck(response=mock_response)
+
+    probe.assert_called_once()
+    assert mock_response.status_code == 200
+
+
+def test_readiness_is_unavailable_when_result_is_stale(mock_response):
+    clock = MagicMock(return_value=0)
+    monitor = HealthMonitor({"sqs": lambda: True}, max_age=30, clock=clock)
+    monitor.probe()
+    clock.return_value = 60
+
+    with patch("main.health_monitor", monitor):
+        response = main.readiness(response=mock_response)
+
+    assert response.age_seconds == 60
+    assert mock_response.status_code == 503
+
+
+def test_liveness_does_not_probe_dependencies():
+    with patch("main.health_monitor") as monitor:
+        response = client.get("/health/live")
+
+    assert response.status_code == 200
+    assert response.json()["dependencies"] == []
+    monitor.status.assert_not_called()
+
+
+@pytest.fixture
+def admin_client():
+    app.dependency_overrides[main._get_db] = lambda: MagicMock()
+    with patch("main.ADMIN_API_TOKEN", "secret"):
+        yield client
+    app.dependency_overrides.clear()
+
+
+def test_admin_endpoints_are_disabled_without_a_token():
+    with patch("main.ADMIN_API_TOKEN", None):
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "guess"})
+
+    assert response.status_code == 404
+
+
+def test_admin_endpoints_need_the_token(admin_client):
+    response = admin_client.get("/admin/profiles", headers={"X-Admin-Token": "guess"})
+
+    assert response.status_code == 403
+
+
+def test_read_profiles_lists_slowest(admin_client):
+    profiles = [
+        {
+            "request_id": "slow",
+            "type": "check_url",
+            "dataset": "tree",
+            "created": datetime(2026, 10, 19),
+            "seconds": 42.5,
+        }
+    ]
+    with patch("crud.get_slowest_profiles", return_value=profiles) as get_profiles:
+        response = admin_client.get(
+            "/admin/profiles?limit=5", headers={"X-Admin-Token": "secret"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()[0]["request_id"] == "slow"
+    assert get_profiles.call_args.args[2] == 5
+
+
+def test_read_profile_downloads_pstats(admin_client):
+    profile = models.RequestProfile(request_id="slow", data=b"stats", summary="calls")
+    with patch("crud.get_profile", return_value=profile):
+        response = admin_client.get(
+            "/admin/profiles/slow", headers={"X-Admin-Token": "secret"}
+        )
+        summary = admin_client.get(
+            "/admin/profiles/slow/summary", headers={"X-Admin-Token": "secret"}
+        )
+
+    assert response.content == b"stats"
+    assert "slow.prof" in response.headers["Content-Disposition"]
+    assert summary.text == "calls"
+
+
+def test_read_profile_when_not_found(admin_client):
+    with patch("crud.get_profile", return_value=None):
+        response = admin_client.get(
+            "/admin/profiles/unknown", headers={"X-Admin-Token": "secret"}
+        )
+
+    assert response.status_code == 404
+
+
+@patch("crud.create_request", return_value=_create_request_model())
+def test_profiled_request_needs_the_admin_token(mock_create_request, helpers):
+    with patch("main.ADMIN_API_TOKEN", "secret"), pytest.raises(HTTPException) as e:
+        main.create_request(
+            helpers.build_request_create(),
+            http_request=None,
+            http_response=None,
+            profile=True,
+            x_admin_token="guess",
+        )
+
+    assert e.value.status_code == 403
+    mock_create_request.assert_not_called()
+
+
+@patch("crud.create_request", return_value=_create_request_model())
+@patch("task_interface.base_tasks.CheckDataFileTask.delay")
+def test_profiled_request_is_sent_with_profile_set(
+    mock_task_delay, mock_create_request, helpers
+):
+    http_request = MagicMock(headers={"Host": "localhost"})
+    with patch("main.ADMIN_API_TOKEN", "secret"):
+        main.create_request(
+            helpers.build_request_create(),
+            http_request=http_request,
+            http_response=MagicMock(),
+            profile=True,
+            x_admin_token="secret",
+            db=MagicMock(),
+        )
+
+    assert mock_task_delay.call_args.args[0]["profile"] is True
+
+
 @pytest.fixture
 def mock_response():
     mock_response = Mock()
@@ -0,0 +1,112 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+import metrics
+from main import app
+
+client = TestClient(app)
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_labelled_with_route_template():
+    before = _sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/requests/{request_id}",
+        status="404",
+    )
+
+    with patch("crud.get_request", return_value=None), patch(
+        "main.session_maker", return_value=MagicMock()
+    ):
+        client.get("/requests/abc")
+        client.get("/requests/def")
+
+    assert (
+        _sample(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route="/requests/{request_id}",
+            status="404",
+        )
+        == before + 2
+    )
+
+
+def test_database_queries_are_counted_per_request():
+    engine = create_engine("sqlite://")
+    test_app = FastAPI()
+    test_app.add_middleware(metrics.MetricsMiddleware)
+
+    @test_app.get("/things/{thing_id}")
+    def read_thing(thing_id: str):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {"id": thing_id}
+
+    before = _sample("http_request_db_queries_sum", route="/things/{thing_id}")
+    response = TestClient(test_app).get("/things/1")
+
+    assert response.status_code == 200
+    assert _sample("http_request_db_queries_sum", route="/things/{thing_id}") == (
+        before + 2
+    )
+    assert _sample(
+        "http_response_size_bytes_sum", method="GET", route="/things/{thing_id}"
+    ) >= len(response.content)
+
+
+def test_failed_queries_are_counted_and_unwound():
+    engine = create_engine("sqlite://")
+    stats = metrics.QueryStats()
+    token = metrics._query_stats.set(stats)
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(Exception):
+                connection.execute(text("SELECT * FROM missing"))
+            connection.execute(text("SELECT 1"))
+            assert connection.info["query_start"] == []
+    finally:
+        metrics._query_stats.reset(token)
+
+    assert stats.count == 2
+
+
+def test_enqueue_times_task_delay():
+    task = MagicMock()
+    task.name = "test.enqueue_task"
+
+    metrics.enqueue(task, {"id": "1"})
+
+    task.delay.assert_called_once_with({"id": "1"})
+    assert (
+        _sample("celery_enqueue_duration_seconds_count", task="test.enqueue_task") == 1
+    )
+
+
+def test_enqueue_failures_are_counted():
+    task = MagicMock()
+    task.name = "test.failing_task"
+    task.delay.side_effect = RuntimeError("broker down")
+
+    with pytest.raises(RuntimeError):
+        metrics.enqueue(task, {"id": "1"})
+
+    assert _sample("celery_enqueue_failures_total", task="test.failing_task") == 1
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert b"http_request_duration_seconds" in response.content
@@ -0,0 +1,111 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from task_interface import tracing
+
+
+@pytest.fixture
+def exported(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracing.init("test-service", str(path))
+
+    def spans():
+        tracing._exporter.close()
+        lines = path.read_text().splitlines() if path.exists() else []
+        return [
+            json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+            for line in lines
+        ]
+
+    yield spans
+    tracing.init("test-service", None)
+
+
+def test_nested_spans_share_a_trace(exported):
+    with tracing.span("transform", "workflow.stage", stage="transform") as outer:
+        with tracing.client_call("GET", **{"url.full": "https://example.com"}):
+            pass
+        outer.set("rows", 3)
+
+    call, stage = exported()
+    assert call["traceId"] == stage["traceId"]
+    assert call["parentSpanId"] == stage["spanId"]
+    assert "parentSpanId" not in stage
+    assert {"key": "rows", "value": {"intValue": "3"}} in stage["attributes"]
+
+
+def test_span_records_errors(exported):
+    with pytest.raises(ValueError):
+        with tracing.span("persist", "workflow.stage"):
+            raise ValueError("failed")
+
+    (stage,) = exported()
+    assert stage["status"] == {"code": 2, "message": "failed"}
+
+
+def test_calls_outside_a_span_are_not_exported(exported):
+    with tracing.client_call("GET"):
+        pass
+
+    assert exported() == []
+
+
+def test_nothing_is_recorded_without_an_export_file():
+    tracing.init("test-service", None)
+
+    with tracing.span("fetch", "workflow.stage") as stage:
+        assert stage is tracing.NO_SPAN
+
+
+def test_traceparent_is_carried_to_the_task(exported):
+    headers = {}
+    with tracing.span("POST /requests", "http.server") as request_span:
+        tracing._inject_traceparent(headers=headers)
+    task = SimpleNamespace(
+        name="task_interface.check_url_task",
+        request=SimpleNamespace(traceparent=headers["traceparent"]),
+    )
+
+    tracing.task_started("task-1", task)
+    with tracing.span("fetch", "workflow.stage"):
+        pass
+    tracing.task_finished("task-1")
+
+    _, stage, task_span = exported()
+    assert task_span["traceId"] == request_span.trace_id
+    assert task_span["parentSpanId"] == request_span.span_id
+    assert stage["parentSpanId"] == task_span["spanId"]
+
+
+def test_queries_are_exported_within_a_span(exported):
+    engine = create_engine("sqlite://")
+
+    with tracing.span("persist", "workflow.stage"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    query, stage = exported()
+    assert query["name"] == "SELECT"
+    assert query["parentSpanId"] == stage["spanId"]
+
+
+def test_middleware_continues_incoming_trace(exported):
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get("/requests/{request_id}")
+    def read(request_id: str):
+        return {}
+
+    traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    TestClient(app).get("/requests/1", headers={"traceparent": traceparent})
+
+    (request_span,) = exported()
+    assert request_span["name"] == "GET /requests/{request_id}"
+    assert request_span["traceId"] == "a" * 32
+    assert request_span["parentSpanId"] == "b" * 16
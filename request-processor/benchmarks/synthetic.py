@@ -0,0 +1,117 @@
+"""
+Synthetic check and add data workflow data, shaped like the pipeline's outputs.
+"""
+import csv
+
+FIELDS = ["reference", "name", "geometry", "start-date", "organisation", "notes"]
+# Requests created by the database benchmarks, which are removed afterwards
+REQUEST_PREFIX = "benchmark-"
+ISSUE_TYPES = ["invalid date", "invalid geometry", "missing value", "invalid URI"]
+TRANSFORMED_HEADER = [
+    "end-date",
+    "entity",
+    "entry-date",
+    "entry-number",
+    "field",
+    "fact",
+    "line-number",
+    "priority",
+    "reference-entity",
+    "resource",
+    "start-date",
+    "value",
+]
+
+
+def converted_rows(rows):
+    return [
+        {
+            "reference": f"REF-{i}",
+            "name": f"Site {i}",
+            "geometry": f"POINT ({-1.5 + i / 1e6:.6f} {52 + i / 1e6:.6f})",
+            "start-date": "2024-01-01",
+            "organisation": "local-authority:ABC",
+            "notes": "Ünïcödé notes" if i % 100 == 0 else "notes",
+        }
+        for i in range(rows)
+    ]
+
+
+def transformed_rows(rows):
+    return [
+        {
+            "entity": str(44000000 + i // 10),
+            "entry-number": str(i // 10 + 1),
+            "field": FIELDS[i % len(FIELDS)],
+            "value": f"value {i}",
+        }
+        for i in range(rows)
+    ]
+
+
+def issue_log(rows):
+    """An issue for every tenth row."""
+    return [
+        {
+            "entry-number": str(i + 1),
+            "field": FIELDS[i % len(FIELDS)],
+            "issue-type": ISSUE_TYPES[i % len(ISSUE_TYPES)],
+            "severity": "error" if i % 20 == 0 else "warning",
+            "responsibility": "external",
+            "value": f"value {i}",
+        }
+        for i in range(0, rows, 10)
+    ]
+
+
+def column_field_log(rows):
+    return [{"field": f"field-{i}", "column": f"Column {i}"} for i in range(rows)]
+
+
+def write_converted_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(converted_rows(rows))
+
+
+def write_transformed_csv(path, rows):
+    """A transformed CSV with 10 fields per entry."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(TRANSFORMED_HEADER)
+        for i in range(rows):
+            entry = i // 10 + 1
+            writer.writerow(
+                [
+                    "",
+                    str(44000000 + entry),
+                    "2024-01-01",
+                    str(entry),
+                    f"field-{i % 10}",
+                    f"{i:064x}",
+                    str(entry + 1),
+                    "2",
+                    "",
+                    "a" * 64,
+                    "",
+                    f"value {i}",
+                ]
+            )
+
+
+def write_lookup_csv(path, rows):
+    """A lookup.csv with every entity of a transformed CSV of rows rows."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["prefix", "resource", "organisation", "reference", "entity"])
+        for entry in range(1, rows // 10 + 2):
+            writer.writerow(
+                [
+                    "tree",
+                    "a" * 64,
+                    "local-authority:ABC",
+                    f"REF-{entry}",
+                    44000000 + entry,
+                ]
+            )
@@ -0,0 +1,38 @@
+import pytest
+
+from application.core import csv_reader
+
+
+@pytest.fixture(params=[csv_reader.ARROW, csv_reader.PYTHON])
+def backend(request, monkeypatch):
+    if request.param == csv_reader.ARROW and csv_reader.pa is None:
+        pytest.skip("pyarrow is not installed")
+    monkeypatch.setattr(csv_reader, "CSV_READER_BACKEND", request.param)
+    return request.param
+
+
+def test_read_csv_records(benchmark, backend, reader_transformed_csv, csv_rows):
+    records = benchmark.pedantic(
+        csv_reader.read_csv_records, args=(reader_transformed_csv, "utf-8"), rounds=3
+    )
+
+    assert len(records) == csv_rows
+
+
+def test_iter_csv_records(benchmark, backend, reader_transformed_csv, csv_rows):
+    def read():
+        return sum(
+            1 for _ in csv_reader.iter_csv_records(reader_transformed_csv, "utf-8")
+        )
+
+    assert benchmark.pedantic(read, rounds=3) == csv_rows
+
+
+def test_read_csv_column_values(benchmark, backend, reader_transformed_csv, csv_rows):
+    entities = benchmark.pedantic(
+        csv_reader.read_csv_column_values,
+        args=(reader_transformed_csv, "entity"),
+        rounds=3,
+    )
+
+    assert len(entities) == -(-csv_rows // 10)
@@ -0,0 +1,33 @@
+import itertools
+
+from synthetic import REQUEST_PREFIX, converted_rows, issue_log, transformed_rows
+
+from request_model import models
+from tasks import save_response_to_db
+
+_request_ids = itertools.count()
+
+
+def _check_response(rows):
+    return {
+        "column-field-log": [{"field": "reference", "missing": False}],
+        "error-summary": ["2 dates are in an invalid format"],
+        "converted-csv": converted_rows(rows),
+        "issue-log": issue_log(rows),
+        "transformed-csv": transformed_rows(rows),
+    }
+
+
+def test_save_check_response(benchmark, benchmark_database, db_rows):
+    response = _check_response(db_rows)
+
+    def setup():
+        request_id = f"{REQUEST_PREFIX}{next(_request_ids)}"
+        with benchmark_database() as session:
+            session.add(
+                models.Request(id=request_id, type="check_url", status="PROCESSING")
+            )
+            session.commit()
+        return (request_id, response), {}
+
+    benchmark.pedantic(save_response_to_db, setup=setup, rounds=3)
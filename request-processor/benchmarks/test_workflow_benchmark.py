@@ -0,0 +1,75 @@
+import copy
+
+from synthetic import column_field_log, issue_log
+
+from application.core import utils
+from application.core.pipeline import _map_transformed_entities
+from application.core.workflow import csv_to_json, error_summary, updateColumnFieldLog
+
+
+def test_csv_to_json(benchmark, converted_csv, rows):
+    records = benchmark(csv_to_json, converted_csv)
+
+    assert len(records) == rows
+
+
+def test_csv_to_json_with_known_encoding(benchmark, converted_csv, rows):
+    records = benchmark(csv_to_json, converted_csv, "utf-8")
+
+    assert len(records) == rows
+
+
+def test_detect_encoding(benchmark, converted_csv):
+    encoding = benchmark.pedantic(
+        utils.detect_encoding,
+        args=(converted_csv,),
+        setup=utils._detect_encoding.cache_clear,
+        rounds=20,
+    )
+
+    assert encoding.lower() == "utf-8"
+
+
+def test_detect_encoding_whole_file(benchmark, converted_csv):
+    encoding = benchmark.pedantic(
+        utils.detect_encoding,
+        args=(converted_csv, None),
+        setup=utils._detect_encoding.cache_clear,
+        rounds=5,
+    )
+
+    assert encoding.lower() == "utf-8"
+
+
+def test_error_summary(benchmark, rows):
+    issues = issue_log(rows)
+    column_field = [
+        {"field": field["field"], "missing": i % 2 == 0}
+        for i, field in enumerate(column_field_log(20))
+    ]
+
+    summary = benchmark(error_summary, issues, column_field, ["unmapped"])
+
+    assert summary
+
+
+def test_update_column_field_log(benchmark, rows):
+    log = column_field_log(rows)
+    required_fields = [f"field-{i}" for i in range(0, rows * 2, 2)] + [
+        ["geometry", "point"]
+    ]
+
+    def setup():
+        return (copy.deepcopy(log), required_fields), {}
+
+    benchmark.pedantic(updateColumnFieldLog, setup=setup, rounds=5)
+
+
+def test_map_transformed_entities(
+    benchmark, transformed_csv, lookup_pipeline_dir, rows
+):
+    entities = benchmark(
+        _map_transformed_entities, transformed_csv, lookup_pipeline_dir
+    )
+
+    assert len(entities) == rows // 10
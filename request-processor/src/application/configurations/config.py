@@ -2,6 +2,34 @@ import os
 
 source_url = "https://raw.githubusercontent.com/digital-land/"
 DATASTORE_URL = os.getenv("DATASTORE_URL", "https://files.planning.data.gov.uk/")
+# Processes in the pool each worker transforms multi-file resources in
+WORKFLOW_MAX_WORKERS = int(
+    os.getenv("WORKFLOW_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+# Minimum time between progress writes for the same stage
+PROGRESS_MIN_INTERVAL_SECONDS = float(os.getenv("PROGRESS_MIN_INTERVAL_SECONDS", "5"))
+# Bytes sampled when detecting the encoding of an input file
+ENCODING_SAMPLE_BYTES = int(os.getenv("ENCODING_SAMPLE_BYTES", str(1024 * 1024)))
+# "arrow" reads large workflow outputs with pyarrow when installed, "python" never does
+CSV_READER_BACKEND = os.getenv("CSV_READER_BACKEND", "arrow")
+# Recompile the error summary rules when their YAML files change
+RULES_HOT_RELOAD = os.getenv("RULES_HOT_RELOAD", "false").lower() == "true"
+# Fetched endpoint resources kept per worker, 0 MB disables the cache. Entries
+# younger than the max age are served without asking the provider
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", "/opt/fetch-cache/")
+FETCH_CACHE_MAX_MB = int(os.getenv("FETCH_CACHE_MAX_MB", "512"))
+FETCH_CACHE_MAX_AGE_SECONDS = int(os.getenv("FETCH_CACHE_MAX_AGE_SECONDS", "300"))
+# Valid category values come from the category datasets as well as the
+# pipeline, so cached values are refreshed after this long
+VALID_CATEGORY_VALUES_TTL_SECONDS = int(
+    os.getenv("VALID_CATEGORY_VALUES_TTL_SECONDS", "3600")
+)
+# Response details of check requests are inserted this many rows at a time, as
+# the rows are streamed from the workflow outputs
+RESPONSE_DETAILS_BATCH_ROWS = int(os.getenv("RESPONSE_DETAILS_BATCH_ROWS", "1000"))
+# Uploaded files over this size are refused before downloading from S3
+S3_DOWNLOAD_MAX_MB = int(os.getenv("S3_DOWNLOAD_MAX_MB", "1024"))
+S3_DOWNLOAD_MAX_CONCURRENCY = int(os.getenv("S3_DOWNLOAD_MAX_CONCURRENCY", "10"))
 CONFIG_URL = f"{source_url}config/refs/heads/main/"
 
 
@@ -15,3 +43,36 @@ class Directories:
     SPECIFICATION_DIR = "specification/"
     DATASET_RESOURCE_DIR = "var/dataset-resource/"
     CACHE_DIR = "var/cache"
+
+    @classmethod
+    def for_root(cls, root):
+        """Directories for a single request rooted at root. The specification
+        and organisation cache are shared by every request so stay as they are."""
+        directories = cls()
+        directories.COLLECTION_DIR = os.path.join(root, "collection/")
+        directories.ISSUE_DIR = os.path.join(root, "issue/")
+        directories.COLUMN_FIELD_DIR = os.path.join(root, "column-field/")
+        directories.TRANSFORMED_DIR = os.path.join(root, "transformed/")
+        directories.CONVERTED_DIR = os.path.join(root, "converted/")
+        directories.PIPELINE_DIR = os.path.join(root, "pipeline/")
+        directories.DATASET_RESOURCE_DIR = os.path.join(root, "dataset-resource/")
+        return directories
+
+
+# Per request workspace, "memory" uses a RAM backed directory (tmpfs) and falls
+# back to "disk" for inputs that would not fit
+WORKSPACE_BACKEND = os.getenv("WORKSPACE_BACKEND", "memory")
+WORKSPACE_MEMORY_DIR = os.getenv("WORKSPACE_MEMORY_DIR", "/dev/shm/async-request/")
+WORKSPACE_DISK_DIR = os.getenv("WORKSPACE_DISK_DIR", "/opt/workspace/")
+WORKSPACE_MEMORY_MAX_MB = int(os.getenv("WORKSPACE_MEMORY_MAX_MB", "256"))
+# Memory workspaces of all the concurrent requests of a worker process, keep it
+# below the tmpfs size and within the container memory limit
+WORKSPACE_MEMORY_BUDGET_MB = int(os.getenv("WORKSPACE_MEMORY_BUDGET_MB", "1024"))
+# Workflow outputs (converted, transformed, issue logs) relative to the input size
+WORKSPACE_EXPANSION_FACTOR = int(os.getenv("WORKSPACE_EXPANSION_FACTOR", "8"))
+
+# Fraction of tasks profiled with cProfile, as well as those the api sent with
+# profiling requested
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Calls listed in the text summary saved with each profile
+PROFILE_SUMMARY_LINES = int(os.getenv("PROFILE_SUMMARY_LINES", "50"))
@@ -0,0 +1,290 @@
+"""
+Per-worker caches for reference data that rarely changes between requests.
+
+Each celery worker process holds a single module level instance of each cache,
+so the cost of parsing the underlying files is paid once per process and then
+only again when the files on disk change.
+"""
+import csv
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from digital_land.organisation import Organisation
+
+from application.configurations.config import VALID_CATEGORY_VALUES_TTL_SECONDS
+from application.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def file_fingerprint(path):
+    """Cheap change detection for a file, None if the file does not exist."""
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, TypeError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def content_fingerprint(path):
+    """sha256 of the file contents, None if the file does not exist.
+
+    Used for small per-request files (e.g. pipeline CSVs) which are downloaded
+    into a fresh directory each time, so their mtime changes on every request.
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (FileNotFoundError, TypeError):
+        return None
+
+
+class OrganisationCache:
+    """
+    Caches parsed Organisation indexes keyed by organisation.csv path and the
+    contents of the pipeline patch.csv, which Organisation also reads.
+
+    An entry is reloaded when the fingerprint of organisation.csv changes.
+    Hits, misses and time spent loading are tracked so the savings per request
+    can be logged.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def get(self, organisation_path, pipeline_dir):
+        organisation_path = str(organisation_path)
+        key = (
+            os.path.realpath(organisation_path),
+            content_fingerprint(os.path.join(pipeline_dir, "patch.csv")),
+        )
+        version = file_fingerprint(organisation_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry["load_seconds"]
+                logger.info(
+                    f"Organisation cache hit for {organisation_path}, "
+                    f"saved {entry['load_seconds']:.3f}s"
+                )
+                return entry["organisation"]
+
+            start = time.perf_counter()
+            organisation = Organisation(organisation_path, Path(pipeline_dir))
+            load_seconds = time.perf_counter() - start
+
+            self.misses += 1
+            self.load_seconds += load_seconds
+            self._entries[key] = {
+                "version": version,
+                "organisation": organisation,
+                "load_seconds": load_seconds,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logger.info(
+                f"Organisation cache miss for {organisation_path}, "
+                f"loaded in {load_seconds:.3f}s"
+            )
+            return organisation
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "load_seconds": round(self.load_seconds, 3),
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.load_seconds = 0.0
+            self.saved_seconds = 0.0
+
+
+def directory_fingerprint(directory, suffix=".csv", content=False, exclude=()):
+    """
+    Fingerprint every file ending in suffix in directory, other than those
+    named in exclude, None if it does not exist. Uses mtime and size unless
+    content is True, in which case the file contents are hashed.
+    """
+    try:
+        names = sorted(
+            name
+            for name in os.listdir(directory)
+            if name.endswith(suffix) and name not in exclude
+        )
+    except (FileNotFoundError, NotADirectoryError, TypeError):
+        return None
+    digest = hashlib.sha256()
+    for name in names:
+        path = os.path.join(directory, name)
+        fingerprint = content_fingerprint(path) if content else file_fingerprint(path)
+        digest.update(f"{name}:{fingerprint};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Entity assignments, which grow with every dataset and don't change the
+# valid category values
+ENTITY_PIPELINE_FILES = frozenset(
+    {"lookup.csv", "old-entity.csv", "entity-organisation.csv"}
+)
+
+
+class ValidCategoryValuesCache:
+    """
+    LRU memo of API.get_valid_category_values keyed by dataset, specification
+    fingerprint and pipeline config fingerprint, for at most ttl_seconds.
+
+    Pipeline CSVs are downloaded into a new directory for every request, so
+    they are fingerprinted on content rather than mtime, leaving out the
+    entity assignment files. Cached values are shared between requests and
+    must not be mutated by callers.
+    """
+
+    def __init__(
+        self,
+        max_entries=64,
+        ttl_seconds=VALID_CATEGORY_VALUES_TTL_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, api, dataset, pipeline, specification_dir, pipeline_dir):
+        key = (
+            dataset,
+            directory_fingerprint(specification_dir),
+            directory_fingerprint(
+                pipeline_dir, content=True, exclude=ENTITY_PIPELINE_FILES
+            ),
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and self.clock() - entry["loaded_at"] < self.ttl_seconds
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["values"]
+            self.misses += 1
+
+        valid_category_values = api.get_valid_category_values(dataset, pipeline)
+
+        with self._lock:
+            self._entries[key] = {
+                "values": valid_category_values,
+                "loaded_at": self.clock(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(
+            f"Valid category values cache miss for {dataset} "
+            f"(hits={self.hits}, misses={self.misses})"
+        )
+        return valid_category_values
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class DatasetFieldIndex:
+    """
+    Index of specification dataset-field.csv files, dataset to the frozenset
+    of its fields. An index is rebuilt when the fingerprint of the file changes.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, specification_dir, dataset):
+        """Fields of dataset, None if there is no dataset-field.csv."""
+        path = os.path.realpath(os.path.join(specification_dir, "dataset-field.csv"))
+        version = file_fingerprint(path)
+        if version is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry["version"] != version:
+                entry = {"version": version, "index": _index_dataset_fields(path)}
+                self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry["index"].get(dataset, frozenset())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _index_dataset_fields(path):
+    index = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            index.setdefault(row.get("dataset"), set()).add(row.get("field"))
+    return {dataset: frozenset(fields) for dataset, fields in index.items()}
+
+
+organisation_cache = OrganisationCache()
+valid_category_values_cache = ValidCategoryValuesCache()
+dataset_field_index = DatasetFieldIndex()
+
+
+def get_organisation(cache_dir, pipeline_dir):
+    """Return the worker's cached Organisation for cache_dir/organisation.csv."""
+    return organisation_cache.get(
+        os.path.join(cache_dir, "organisation.csv"), pipeline_dir
+    )
+
+
+def get_valid_category_values(api, dataset, pipeline, specification_dir, pipeline_dir):
+    """Return memoized valid category values for dataset."""
+    return valid_category_values_cache.get(
+        api, dataset, pipeline, specification_dir, pipeline_dir
+    )
+
+
+def get_dataset_fields(specification_dir, dataset):
+    """Return the fields of dataset in the specification, None if it is missing."""
+    return dataset_field_index.get(specification_dir, dataset)
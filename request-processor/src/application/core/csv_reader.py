@@ -0,0 +1,120 @@
+"""
+CSV readers for workflow outputs.
+
+The transformed CSV has a row per field per entry, so large resources produce
+millions of rows. When pyarrow is installed the files are parsed into columns
+and dicts are only built when the rows are returned, otherwise the csv module
+is used. Both backends return the same values as csv.DictReader.
+
+iter_csv_records streams the rows instead, a block at a time with pyarrow, so
+outputs too large to hold in memory can be passed on row by row.
+"""
+import csv
+import itertools
+
+from application.configurations.config import CSV_READER_BACKEND
+from application.logging.logger import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:  # pragma: no cover
+    pa = None
+
+logger = get_logger(__name__)
+
+ARROW = "arrow"
+PYTHON = "python"
+UTF8_ENCODINGS = {"utf-8", "utf8", "ascii", "utf-8-sig"}
+STREAM_BLOCK_BYTES = 4 * 1024 * 1024
+
+
+def backend():
+    """The reader used for UTF-8 files, CSV_READER_BACKEND falls back to python."""
+    if CSV_READER_BACKEND == PYTHON or pa is None:
+        return PYTHON
+    return ARROW
+
+
+def read_csv_records(path, encoding=None):
+    """Rows of path as a list of dicts, as csv.DictReader would return them."""
+    table = _read_table(path, encoding)
+    if table is None:
+        with open(path, "r", encoding=encoding) as f:
+            return list(csv.DictReader(f))
+    return table.to_pylist()
+
+
+def iter_csv_records(path, encoding=None):
+    """Rows of path as dicts, as csv.DictReader would return them, read lazily."""
+    read = 0
+    reader = _open_table(path, encoding)
+    if reader is not None:
+        try:
+            for batch in reader:
+                rows = batch.to_pylist()
+                read += len(rows)
+                yield from rows
+            return
+        except pa.ArrowInvalid as e:
+            # A later block arrow can't parse, the csv module carries on from it
+            logger.info(f"Reading {path} from row {read + 1} with the csv module: {e}")
+    with open(path, "r", encoding=encoding, newline="") as f:
+        yield from itertools.islice(csv.DictReader(f), read, None)
+
+
+def read_csv_column_values(path, column, encoding="utf-8"):
+    """Distinct non-empty, whitespace stripped values of column in path."""
+    table = _read_table(path, encoding, columns=[column])
+    if table is None:
+        with open(path, "r", encoding=encoding) as f:
+            values = {(row.get(column) or "").strip() for row in csv.DictReader(f)}
+        values.discard("")
+        return values
+    if column not in table.column_names:
+        return set()
+    values = pc.unique(pc.utf8_trim_whitespace(table[column])).to_pylist()
+    return {value for value in values if value}
+
+
+def _read_table(path, encoding, columns=None):
+    """
+    Parse path with pyarrow, all columns as strings. Returns None when the
+    python reader should be used instead: pyarrow is not available, the file
+    is not UTF-8, or it does not have the regular shape arrow expects.
+    """
+    return _arrow(pa_csv.read_csv if pa else None, path, encoding, columns)
+
+
+def _open_table(path, encoding):
+    """A pyarrow streaming reader of path, None as for _read_table."""
+    return _arrow(pa_csv.open_csv if pa else None, path, encoding)
+
+
+def _arrow(read, path, encoding, columns=None, block_size=STREAM_BLOCK_BYTES):
+    if backend() != ARROW or (encoding or "utf-8").lower() not in UTF8_ENCODINGS:
+        return None
+    try:
+        with open(path, "r", encoding=encoding or "utf-8", newline="") as f:
+            header = next(csv.reader(f), None)
+        if not header or len(set(header)) != len(header):
+            return None
+        return read(
+            path,
+            read_options=pa_csv.ReadOptions(
+                column_names=header, skip_rows=1, block_size=block_size
+            ),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                include_columns=[
+                    name for name in (columns or header) if name in header
+                ],
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+    except (pa.ArrowInvalid, UnicodeDecodeError) as e:
+        logger.info(f"Reading {path} with the csv module: {e}")
+        return None
@@ -0,0 +1,210 @@
+"""
+Worker-side cache of fetched endpoint resources.
+
+The same endpoint is usually fetched several times in a row (check_url, then
+add_data for the same URL, then re-checks). Resources are kept per URL and
+plugin with the ETag and Last-Modified values of the response. Within
+FETCH_CACHE_MAX_AGE_SECONDS an entry is served as it is, after that plain
+fetches are revalidated with a conditional request and a 304 serves the cached
+resource. Plugin fetches page through a service so can't be revalidated and
+are only served while fresh. Entries are evicted least recently used first
+once FETCH_CACHE_MAX_MB is exceeded.
+
+The index is held in memory, so each worker process keeps its files in its
+own subdirectory of FETCH_CACHE_DIR, made unique with the host name, process
+id and a random suffix as the directory may be shared between containers.
+Only a process's own directory is ever removed, when it exits, so the files
+of a killed process stay until FETCH_CACHE_DIR is cleared.
+"""
+import atexit
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from application.configurations.config import (
+    FETCH_CACHE_DIR,
+    FETCH_CACHE_MAX_AGE_SECONDS,
+    FETCH_CACHE_MAX_MB,
+)
+from application.logging.logger import get_logger
+from task_interface import tracing
+
+logger = get_logger(__name__)
+
+VALIDATORS = {"etag": "If-None-Match", "last-modified": "If-Modified-Since"}
+
+
+def _header(headers, name):
+    """Case-insensitive lookup in the response headers saved in a fetch log."""
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _place(source, target):
+    """Hard link source to target when on the same filesystem, otherwise copy."""
+    if os.path.exists(target):
+        return
+    try:
+        os.link(source, target)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _remove_process_dir(path, pid):
+    # Forked children inherit the exit handlers of their parent
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class FetchCache:
+    """Resources by (url, plugin), bounded by the total size of the files."""
+
+    def __init__(
+        self,
+        cache_dir=FETCH_CACHE_DIR,
+        max_bytes=FETCH_CACHE_MAX_MB * 1024 * 1024,
+        max_age_seconds=FETCH_CACHE_MAX_AGE_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._size = 0
+        self._prepared_pid = None
+        self.process_dir = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _prepare(self):
+        # A forked process inherits the index of its parent but not its files
+        if self._prepared_pid == os.getpid():
+            return
+        self._entries.clear()
+        self._size = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.process_dir = tempfile.mkdtemp(
+            prefix=f"{socket.gethostname()}-{os.getpid()}-", dir=self.cache_dir
+        )
+        atexit.register(_remove_process_dir, self.process_dir, os.getpid())
+        self._prepared_pid = os.getpid()
+
+    def _path(self, key):
+        url, plugin = key
+        digest = hashlib.sha256(f"{plugin or ''}|{url}".encode("utf-8")).hexdigest()
+        return os.path.join(self.process_dir, digest)
+
+    def get(self, url, plugin, resource_dir):
+        """
+        Place the cached resource for url in resource_dir, returning its file
+        name and fetch log, or None when it has to be fetched.
+        """
+        if not self.enabled:
+            return None
+        key = (url, plugin)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            fresh = self.clock() - entry["validated_at"] < self.max_age_seconds
+            if fresh:
+                self.hits += 1
+
+        if fresh:
+            cache_status = "hit"
+        elif plugin is None and self._not_modified(url, entry):
+            with self._lock:
+                entry["validated_at"] = self.clock()
+                self.revalidated += 1
+            cache_status = "revalidated"
+        else:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            _place(entry["path"], os.path.join(resource_dir, entry["file_name"]))
+        except FileNotFoundError:
+            return None
+        logger.info(f"Fetch cache {cache_status} for {url} plugin={plugin}")
+        return entry["file_name"], {**entry["log"], "fetch-cache": cache_status}
+
+    def _not_modified(self, url, entry):
+        headers = {"User-Agent": "DLUHC Digital Land"}
+        for name, header in VALIDATORS.items():
+            if entry.get(name):
+                headers[header] = entry[name]
+        if len(headers) == 1:
+            return False
+        try:
+            with tracing.client_call("GET", **{"url.full": url}):
+                with requests.get(url, headers=headers, timeout=30, stream=True) as r:
+                    return r.status_code == 304
+        except requests.RequestException as e:
+            logger.info(f"Could not revalidate {url}: {e}")
+            return False
+
+    def put(self, url, plugin, resource_path, log):
+        """Keep the fetched resource at resource_path for later requests."""
+        if not self.enabled:
+            return
+        size = os.path.getsize(resource_path)
+        if size > self.max_bytes:
+            return
+        key = (url, plugin)
+        headers = log.get("response-headers", {})
+        with self._lock:
+            self._prepare()
+            self._remove(key)
+            path = self._path(key)
+            shutil.copyfile(resource_path, path)
+            self._entries[key] = {
+                "path": path,
+                "file_name": os.path.basename(resource_path),
+                "size": size,
+                "log": dict(log),
+                "etag": _header(headers, "etag"),
+                "last-modified": _header(headers, "last-modified"),
+                "validated_at": self.clock(),
+            }
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry["size"]
+            try:
+                os.remove(entry["path"])
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+            self.hits = self.revalidated = self.misses = 0
+
+
+fetch_cache = FetchCache()
@@ -1,16 +1,56 @@
 import os
 import csv
+import heapq
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 from application.logging.logger import get_logger
 from digital_land.specification import Specification
-from digital_land.organisation import Organisation
 from digital_land.api import API
 
 from digital_land.pipeline import Pipeline, Lookups
 from digital_land.commands import get_resource_unidentified_lookups
+from application.core.cache import get_organisation, get_valid_category_values
+from application.core.csv_reader import read_csv_column_values
+from application.core.utils import detect_encoding
+from application.core.workspace import out_of_space
+from application.configurations.config import WORKFLOW_MAX_WORKERS
 from pathlib import Path
 
 logger = get_logger(__name__)
 
+_transform_pool = None
+_transform_pool_lock = threading.Lock()
+
+
+def transform_pool():
+    """
+    The process pool multi-file resources are transformed in, shared by the
+    requests of this worker. It is started on first use, as spawned processes
+    take a while to import digital_land, and stays up until the worker shuts down.
+    spawn is used as the worker is eventlet patched.
+    """
+    global _transform_pool
+    with _transform_pool_lock:
+        if _transform_pool is None:
+            _transform_pool = ProcessPoolExecutor(
+                max_workers=WORKFLOW_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _transform_pool
+
+
+def shutdown_transform_pool():
+    global _transform_pool
+    with _transform_pool_lock:
+        pool, _transform_pool = _transform_pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
 
 def fetch_response_data(
     dataset,
@@ -27,31 +67,39 @@ def fetch_response_data(
     cache_dir,
     additional_col_mappings,
     additional_concats,
+    disable_lookups=True,
+    file_done=None,
 ):
-    # define variables for Pipeline Execution
-    specification = Specification(specification_dir)
-    pipeline = Pipeline(pipeline_dir, dataset, specification=specification)
-    api = API(specification=specification)
-
+    """
+    Transform each file of the resource, returning their resource names.
+    file_done is called with the path of each file once it is transformed.
+    """
+    file_done = file_done or _no_file_done
     input_path = os.path.join(collection_dir, "resource", request_id)
     # List all files in the "resource" directory
     files_in_resource = os.listdir(input_path)
     os.makedirs(os.path.join(issue_dir, dataset, request_id), exist_ok=True)
-    try:
-        for file_name in files_in_resource:
-            file_path = os.path.join(input_path, file_name)
-            # retrieve unnassigned entities and assign, TODO: Is this necessary here?
-            assign_entries(
-                resource_path=file_path,
-                dataset=dataset,
-                organisation=organisation,
-                pipeline_dir=pipeline_dir,
-                specification=specification,
-                cache_dir=cache_dir,
-                endpoints=[],
+    # Assigned entities are only used by the lookup phase, so checks which run
+    # with lookups disabled skip the extra pass over every resource
+    if not disable_lookups:
+        try:
+            specification = Specification(specification_dir)
+            for file_name in sorted(files_in_resource):
+                file_path = os.path.join(input_path, file_name)
+                # retrieve unnassigned entities and assign
+                assign_entries(
+                    resource_path=file_path,
+                    dataset=dataset,
+                    organisation=organisation,
+                    pipeline_dir=pipeline_dir,
+                    specification=specification,
+                    cache_dir=cache_dir,
+                    endpoints=[],
+                )
+        except Exception as err:
+            logger.error(
+                "An exception occured during assign_entries process: %s", str(err)
             )
-    except Exception as err:
-        logger.error("An exception occured during assign_entries process: %s", str(err))
 
     # Create directories if they don't exist
     for directory in [
@@ -62,53 +110,142 @@ def fetch_response_data(
     ]:
         os.makedirs(directory, exist_ok=True)
 
-    os.makedirs(os.path.join(transformed_dir, dataset, request_id), exist_ok=True)
+    for directory in [
+        transformed_dir,
+        issue_dir,
+        column_field_dir,
+        dataset_resource_dir,
+    ]:
+        os.makedirs(os.path.join(directory, dataset, request_id), exist_ok=True)
+
+    transform_resource = partial(
+        _transform_resource_file,
+        dataset=dataset,
+        request_id=request_id,
+        converted_dir=converted_dir,
+        issue_dir=issue_dir,
+        column_field_dir=column_field_dir,
+        transformed_dir=transformed_dir,
+        dataset_resource_dir=dataset_resource_dir,
+        pipeline_dir=pipeline_dir,
+        specification_dir=specification_dir,
+        cache_dir=cache_dir,
+        disable_lookups=disable_lookups,
+    )
+    # Access each file in the "resource" directory, in a stable order so the
+    # outputs can be merged deterministically
+    file_paths = [
+        os.path.join(input_path, file_name) for file_name in sorted(files_in_resource)
+    ]
+    if len(file_paths) > 1 and WORKFLOW_MAX_WORKERS > 1:
+        # Each file is independent, so multi-file resources are transformed in
+        # separate processes
+        logger.info(f"Transforming {len(file_paths)} files in the process pool")
+        return _transform_in_pool(transform_resource, file_paths, file_done)
+
+    # Pool processes build their own Pipeline and API, so they are only
+    # created when the files are transformed in this process
+    specification = Specification(specification_dir)
+    pipeline = Pipeline(pipeline_dir, dataset, specification=specification)
+    api = API(specification=specification)
+    resources = []
+    for file_path in file_paths:
+        resources.append(transform_resource(file_path, pipeline=pipeline, api=api))
+        file_done(file_path)
+    return resources
+
+
+def _transform_in_pool(transform_resource, file_paths, file_done):
+    resources = []
+    try:
+        # map returns in order, each file is done when its result is
+        for file_path, resource in zip(
+            file_paths, transform_pool().map(transform_resource, file_paths)
+        ):
+            resources.append(resource)
+            file_done(file_path)
+        return resources
+    except BrokenProcessPool:
+        # A crashed process breaks the pool, the next request starts a new one
+        shutdown_transform_pool()
+        raise
+
 
-    # Access each file in the "resource" directory
-    for file_name in files_in_resource:
-        file_path = os.path.join(input_path, file_name)
+def _no_file_done(file_path):
+    pass
 
-        os.makedirs(os.path.join(issue_dir, dataset, request_id), exist_ok=True)
-        os.makedirs(os.path.join(column_field_dir, dataset, request_id), exist_ok=True)
-        os.makedirs(
-            os.path.join(dataset_resource_dir, dataset, request_id), exist_ok=True
+
+def _transform_resource_file(
+    file_path,
+    dataset,
+    request_id,
+    converted_dir,
+    issue_dir,
+    column_field_dir,
+    transformed_dir,
+    dataset_resource_dir,
+    pipeline_dir,
+    specification_dir,
+    cache_dir,
+    disable_lookups,
+    pipeline=None,
+    api=None,
+):
+    """
+    Transform a single resource file and save its issue, column-field and
+    dataset-resource logs under its own resource name. Pipeline and API are
+    created when not given, as is the case in a pool process.
+    Returns the resource name.
+
+    digital_land streams rows through the transform phases to the output
+    files, so the transform itself holds little more than its issue log and
+    lookups. run_workflow reads the converted rows, issue log and transformed
+    rows back from disk as they are saved, so only the issue log of the
+    transform grows with the size of the resource.
+    """
+    resource = resource_from_path(file_path)
+    try:
+        if pipeline is None:
+            specification = Specification(specification_dir)
+            pipeline = Pipeline(pipeline_dir, dataset, specification=specification)
+            api = API(specification=specification)
+        output_path = os.path.join(
+            transformed_dir, dataset, request_id, f"{resource}.csv"
         )
-        try:
-            resource = resource_from_path(file_path)
-            issue_log = pipeline.transform(
-                input_path=file_path,
-                output_path=Path(
-                    os.path.join(
-                        transformed_dir, dataset, request_id, f"{resource}.csv"
-                    )
-                ),
-                organisation=Organisation(
-                    os.path.join(cache_dir, "organisation.csv"), Path(pipeline.path)
-                ),
-                resource=resource,
-                valid_category_values=api.get_valid_category_values(dataset, pipeline),
-                converted_path=Path(
-                    os.path.join(converted_dir, request_id, f"{resource}.csv")
-                ),
-                disable_lookups=True,
-            )
-            # Issue log needs severity column added, so manually added and saved here
-            issue_log.add_severity_column(
-                os.path.join(specification_dir, "issue-type.csv")
-            )
-            issue_log.save(
-                os.path.join(issue_dir, dataset, request_id, resource + ".csv")
-            )
-            pipeline.save_logs(
-                column_field_path=os.path.join(
-                    column_field_dir, dataset, request_id, resource + ".csv"
-                ),
-                dataset_resource_path=os.path.join(
-                    dataset_resource_dir, dataset, request_id, resource + ".csv"
-                ),
-            )
-        except Exception as err:
-            logger.error("An exception occured during Pipeline Transform: ", str(err))
+        converted_path = os.path.join(converted_dir, request_id, f"{resource}.csv")
+        issue_path = os.path.join(issue_dir, dataset, request_id, resource + ".csv")
+        log_paths = {
+            "column_field_path": os.path.join(
+                column_field_dir, dataset, request_id, resource + ".csv"
+            ),
+            "dataset_resource_path": os.path.join(
+                dataset_resource_dir, dataset, request_id, resource + ".csv"
+            ),
+        }
+        transform_kwargs = {
+            "organisation": get_organisation(cache_dir, pipeline_dir),
+            "resource": resource,
+            "valid_category_values": get_valid_category_values(
+                api, dataset, pipeline, specification_dir, pipeline_dir
+            ),
+            "disable_lookups": disable_lookups,
+        }
+        issue_log = pipeline.transform(
+            input_path=file_path,
+            output_path=Path(output_path),
+            converted_path=Path(converted_path),
+            **transform_kwargs,
+        )
+        # Issue log needs severity column added, so manually added and saved here
+        issue_log.add_severity_column(os.path.join(specification_dir, "issue-type.csv"))
+        issue_log.save(issue_path)
+        pipeline.save_logs(**log_paths)
+    except Exception as err:
+        if out_of_space(err):
+            # The caller can move the workspace to disk and run it again
+            raise
+        logger.error("An exception occured during Pipeline Transform: %s", str(err))
+    return resource
 
 
 def resource_from_path(path):
@@ -202,11 +339,11 @@ def fetch_add_data_response(
     try:
         specification = Specification(specification_dir)
         pipeline = Pipeline(pipeline_dir, dataset, specification=specification)
-        organisation = Organisation(
-            os.path.join(cache_dir, "organisation.csv"), Path(pipeline.path)
-        )
+        organisation = get_organisation(cache_dir, pipeline_dir)
         api = API(specification=specification)
-        valid_category_values = api.get_valid_category_values(dataset, pipeline)
+        valid_category_values = get_valid_category_values(
+            api, dataset, pipeline, specification_dir, pipeline_dir
+        )
 
         files_in_resource = os.listdir(input_dir)
 
@@ -220,6 +357,9 @@ def fetch_add_data_response(
             logger.info(
                 f"Processing file {idx + 1}/{len(files_in_resource)}: {resource_file}"
             )
+            resource = resource_from_path(resource_file_path)
+            scratch_dir = tempfile.mkdtemp(dir=os.path.dirname(output_path))
+            converted_path = os.path.join(scratch_dir, f"{resource}-converted.csv")
             try:
                 # Try add data with pipeline transform to see if no entities found
                 issues_log = pipeline.transform(
@@ -227,8 +367,9 @@ def fetch_add_data_response(
                     output_path=output_path,
                     organisation=organisation,
                     organisations=[organisation_provider],
-                    resource=resource_from_path(resource_file_path),
+                    resource=resource,
                     valid_category_values=valid_category_values,
+                    converted_path=Path(converted_path),
                     disable_lookups=False,
                     endpoints=[endpoint],
                 )
@@ -237,20 +378,24 @@ def fetch_add_data_response(
                     _map_transformed_entities(output_path, pipeline_dir)
                 )
 
-                # Check if there are unknown entity issues in the log
-                unknown_issue_types = {
-                    "unknown entity",
-                    "unknown entity - missing reference",
-                }
-                has_unknown = any(
-                    row.get("issue-type") in unknown_issue_types
-                    for row in issues_log.rows
-                    if isinstance(row, dict)
-                )
-
-                if has_unknown:
+                # Rows the lookup phase could not identify, keyed by line number
+                unknown_rows = _unknown_entity_rows(issues_log)
+
+                if unknown_rows:
+                    # Only the unidentified rows are assigned and transformed again,
+                    # the rest of the first pass output is kept as it is
+                    subset_path = os.path.join(scratch_dir, resource)
+                    line_numbers = _write_rows_subset(
+                        (
+                            converted_path
+                            if os.path.exists(converted_path)
+                            else resource_file_path
+                        ),
+                        unknown_rows,
+                        subset_path,
+                    )
                     new_lookups = assign_entries(
-                        resource_path=resource_file_path,
+                        resource_path=subset_path,
                         dataset=dataset,
                         organisation=organisation_provider,
                         pipeline_dir=pipeline_dir,
@@ -274,23 +419,32 @@ def fetch_add_data_response(
                         pipeline_dir, dataset, specification=specification
                     )
 
-                    # Now re-run transform to check and return issue log
-                    issues_log = pipeline.transform(
-                        input_path=resource_file_path,
-                        output_path=output_path,
+                    subset_output_path = os.path.join(scratch_dir, "transformed.csv")
+                    subset_issues_log = pipeline.transform(
+                        input_path=subset_path,
+                        output_path=subset_output_path,
                         organisation=organisation,
                         organisations=[organisation_provider],
-                        resource=resource_from_path(resource_file_path),
+                        resource=resource,
                         valid_category_values=valid_category_values,
                         disable_lookups=False,
                         endpoints=[endpoint],
                     )
+                    _merge_reprocessed_rows(
+                        issues_log,
+                        subset_issues_log,
+                        output_path,
+                        subset_output_path,
+                        [(line, unknown_rows[line]) for line in line_numbers],
+                    )
                 else:
                     logger.info(f"No unidentified lookups found in {resource_file}")
 
             except Exception as err:
                 logger.error(f"Error processing {resource_file}: {err}")
                 logger.exception("Full traceback: ")
+            finally:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
 
         new_entities_breakdown = _get_entities_breakdown(new_entities)
         existing_entities_breakdown = _get_existing_entities_breakdown(
@@ -323,6 +477,133 @@ def fetch_add_data_response(
         raise
 
 
+def _unknown_entity_rows(issue_log):
+    """
+    Line number to entry number of rows the lookup phase could not find an entity for.
+    Rows missing a reference are left out as no entity can be assigned to them.
+    """
+    unknown_rows = {}
+    for row in getattr(issue_log, "rows", None) or []:
+        if not isinstance(row, dict) or row.get("issue-type") != "unknown entity":
+            continue
+        line_number = str(row.get("line-number", ""))
+        if line_number.isdigit():
+            unknown_rows[int(line_number)] = row.get("entry-number")
+    return unknown_rows
+
+
+def _write_rows_subset(source_path, line_numbers, subset_path):
+    """
+    Copy the header and the given CSV line numbers (the header is line 1) of
+    source_path to subset_path. Returns the line numbers written, in order.
+    """
+    wanted = set(line_numbers)
+    written = []
+    with open(
+        source_path, newline="", encoding=detect_encoding(source_path) or "utf-8"
+    ) as f_in, open(subset_path, "w", newline="", encoding="utf-8") as f_out:
+        writer = csv.writer(f_out)
+        for line_number, row in enumerate(csv.reader(f_in), start=1):
+            if line_number == 1 or line_number in wanted:
+                writer.writerow(row)
+                if line_number != 1:
+                    written.append(line_number)
+    return written
+
+
+def _entry_number(row):
+    value = str(row.get("entry-number", "")) if isinstance(row, dict) else ""
+    return int(value) if value.isdigit() else 0
+
+
+def _numbers_as_strings(row):
+    if not isinstance(row, dict):
+        return row
+    row = dict(row)
+    for name in ("entry-number", "line-number"):
+        if row.get(name) is not None:
+            row[name] = str(row[name])
+    return row
+
+
+def _csv_rows(path):
+    if not os.path.exists(path):
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _csv_header(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None)
+
+
+def _merge_reprocessed_rows(
+    issue_log, subset_issue_log, output_path, subset_output_path, rows
+):
+    """
+    Replace the first pass results for re-processed rows with the results of
+    transforming the subset. rows is a list of (line number, entry number) in
+    the original resource, in the order they were written to the subset.
+
+    Both passes write rows in entry-number order, so the results are merged by
+    entry number, streaming the transformed output through a file rather than
+    reading it into memory.
+    """
+    # Entry n of the subset is the nth row written, its line number is n + 1
+    entry_map = {
+        str(subset_entry): original
+        for subset_entry, original in enumerate(rows, start=1)
+    }
+    replaced = {str(entry_number) for _, entry_number in rows}
+
+    def _remap(row):
+        original = entry_map.get(str(row.get("entry-number", "")))
+        if original is None:
+            return row
+        row = dict(row)
+        row["entry-number"] = original[1]
+        if "line-number" in row:
+            row["line-number"] = original[0]
+        return row
+
+    def _kept(rows):
+        return (
+            row
+            for row in rows
+            if not isinstance(row, dict)
+            or str(row.get("entry-number", "")) not in replaced
+        )
+
+    # Numbers are strings in every merged issue, as they are in the saved logs
+    issue_log.rows = [
+        _numbers_as_strings(row)
+        for row in heapq.merge(
+            _kept(issue_log.rows),
+            (_remap(row) for row in subset_issue_log.rows),
+            key=_entry_number,
+        )
+    ]
+
+    fieldnames = _csv_header(output_path) or _csv_header(subset_output_path)
+    if not fieldnames:
+        return
+    merged_path = f"{output_path}.merged"
+    with open(merged_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(
+            heapq.merge(
+                _kept(_csv_rows(output_path)),
+                (_remap(row) for row in _csv_rows(subset_output_path)),
+                key=_entry_number,
+            )
+        )
+    os.replace(merged_path, output_path)
+
+
 def _get_entities_breakdown(new_entities):
     """
     Convert newly assigned entities to the breakdown format for response.
@@ -411,14 +692,8 @@ def _map_transformed_entities(transformed_csv_path, pipeline_dir):  # noqa: C901
         return mapped_entities
 
     # Extract unique entity values from transformed CSV
-    unique_entities = set()
     try:
-        with open(transformed_csv_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                entity_val = row.get("entity", "").strip()
-                if entity_val:  # Skip empty entities
-                    unique_entities.add(entity_val)
+        unique_entities = read_csv_column_values(transformed_csv_path, "entity")
     except Exception as e:
         logger.error(f"Error reading transformed CSV: {e}")
         return mapped_entities
@@ -0,0 +1,149 @@
+"""
+Pick the collector plugin for an endpoint before fetching it.
+
+The plugin is chosen from the URL, then, for URLs that don't name a file,
+the plugin that last worked for the host, so most endpoints are fetched once.
+When a plain fetch fails, the response content type decides which plugin to
+try next. If it doesn't, the start of the body is read with one more GET, as
+the collector doesn't keep the body of a failed fetch.
+"""
+import posixpath
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from application.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+ARCGIS = "arcgis"
+WFS = "wfs"
+PLUGINS = [None, ARCGIS, WFS]
+
+ARCGIS_URL = re.compile(r"/rest/services/|/(Feature|Map)Server\b", re.I)
+# Query URLs return the data itself, so are fetched as a plain file
+ARCGIS_QUERY_FORMATS = {"json", "geojson", "pjson", "csv"}
+PEEK_BYTES = 4096
+
+
+def classify_url(url):
+    """Plugin implied by the URL, None if it looks like a plain file."""
+    parsed = urlparse(url or "")
+    query = {key.lower(): values for key, values in parse_qs(parsed.query).items()}
+    if ARCGIS_URL.search(parsed.path):
+        formats = {value.lower() for value in query.get("f", [])}
+        if parsed.path.rstrip("/").endswith("/query") or formats & ARCGIS_QUERY_FORMATS:
+            return None
+        return ARCGIS
+    if any(value.lower() == "wfs" for value in query.get("service", [])):
+        return WFS
+    if parsed.path.lower().rstrip("/").endswith("/wfs"):
+        return WFS
+    return None
+
+
+def classify_response(content_type, body=b""):
+    """Plugin implied by a response, None if it is not a service description."""
+    content_type = (content_type or "").lower()
+    head = (body or b"")[:PEEK_BYTES].lower()
+    if b"wfs_capabilities" in head or (b"featurecollection" in head and b"gml" in head):
+        return WFS
+    if b'"layers"' in head or b"arcgis" in head or b'"currentversion"' in head:
+        return ARCGIS
+    if "xml" in content_type:
+        return WFS
+    if "json" in content_type:
+        return ARCGIS
+    return None
+
+
+def peek(url, timeout=30):
+    """Content type and first PEEK_BYTES of url, (None, b"") if it can't be read."""
+    try:
+        with requests.get(
+            url,
+            headers={"User-Agent": "DLUHC Digital Land"},
+            timeout=timeout,
+            stream=True,
+        ) as response:
+            body = next(response.iter_content(PEEK_BYTES), b"")
+            return response.headers.get("Content-Type"), body
+    except requests.RequestException as e:
+        logger.info(f"Could not peek at {url}: {e}")
+        return None, b""
+
+
+class HostPluginCache:
+    """The plugin that last fetched successfully from each host."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        host = urlparse(url or "").netloc.lower()
+        with self._lock:
+            if host not in self._entries:
+                return False, None
+            self._entries.move_to_end(host)
+            return True, self._entries[host]
+
+    def set(self, url, plugin):
+        host = urlparse(url or "").netloc.lower()
+        with self._lock:
+            self._entries[host] = plugin
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+host_plugin_cache = HostPluginCache()
+
+
+def _ordered(first):
+    return [first] + [plugin for plugin in PLUGINS if plugin != first]
+
+
+def _names_file(path):
+    """Whether the last segment of a URL path has a file extension, like data.geojson."""
+    return bool(posixpath.splitext(path.rstrip("/").rsplit("/", 1)[-1])[1])
+
+
+def plugin_order(url):
+    """Plugins to try for url, most likely first."""
+    plugin = classify_url(url)
+    path = urlparse(url or "").path
+    # ArcGIS query URLs and files are fetched plain whatever else the host serves,
+    # the host's plugin only breaks the tie for service-like URLs
+    if plugin is None and not ARCGIS_URL.search(path) and not _names_file(path):
+        cached, host_plugin = host_plugin_cache.get(url)
+        if cached:
+            plugin = host_plugin
+    return _ordered(plugin)
+
+
+def next_plugins(url, remaining, content_type):
+    """
+    Reorder the remaining plugins after a plain fetch failed, using the
+    response content type. When that doesn't classify the response, the start
+    of the body is peeked at, an extra GET on top of the failed fetch.
+    """
+    plugin = classify_response(content_type)
+    if plugin is None:
+        peeked_content_type, body = peek(url)
+        plugin = classify_response(peeked_content_type or content_type, body)
+    if plugin in remaining:
+        return [plugin] + [p for p in remaining if p != plugin]
+    return remaining
+
+
+def record_success(url, plugin):
+    host_plugin_cache.set(url, plugin)
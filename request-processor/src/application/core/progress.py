@@ -0,0 +1,56 @@
+"""
+Rate limited progress reporting for in-flight requests.
+
+The workflow reports its current stage and rows processed through a
+ProgressReporter, which only passes an update on to the writer (a database
+write in the worker) when the stage changes or enough time has passed.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+from application.configurations.config import PROGRESS_MIN_INTERVAL_SECONDS
+from application.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+FETCHING = "fetching"
+CONVERTING = "converting"
+TRANSFORMING = "transforming"
+PERSISTING = "persisting"
+
+
+class ProgressReporter:
+    """Callable taking (stage, rows_processed=None, rows_total=None)."""
+
+    def __init__(
+        self, writer, min_interval=PROGRESS_MIN_INTERVAL_SECONDS, clock=time.monotonic
+    ):
+        self.writer = writer
+        self.min_interval = min_interval
+        self.clock = clock
+        self.progress = None
+        self._last_write = None
+        self._lock = threading.Lock()
+
+    def __call__(self, stage, rows_processed=None, rows_total=None):
+        with self._lock:
+            stage_changed = self.progress is None or self.progress["stage"] != stage
+            if rows_total is None and not stage_changed:
+                rows_total = self.progress["rows_total"]
+            self.progress = {
+                "stage": stage,
+                "rows_processed": rows_processed,
+                "rows_total": rows_total,
+                "updated": datetime.now(timezone.utc).isoformat(),
+            }
+            now = self.clock()
+            if not stage_changed and now - self._last_write < self.min_interval:
+                return
+            self._last_write = now
+            progress = dict(self.progress)
+        try:
+            self.writer(progress)
+        except Exception as e:
+            # Progress is informational only, never fail a request over it
+            logger.warning(f"Failed to record progress {progress}: {e}")
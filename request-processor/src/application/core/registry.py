@@ -0,0 +1,213 @@
+"""
+Indexed endpoint.csv and source.csv registry for add-data validation.
+
+Each request downloads the collection CSVs into its own directory, so parsed
+snapshots are shared between requests by content and each directory gets a
+copy-on-write overlay holding the rows added by the request. Lookups check the
+overlay first, new rows are appended to the CSVs as well as the overlay.
+"""
+import csv
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+from application.core.cache import file_fingerprint
+from application.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+ENDPOINT_FIELDNAMES = [
+    "endpoint",
+    "endpoint-url",
+    "parameters",
+    "plugin",
+    "entry-date",
+    "start-date",
+    "end-date",
+]
+SOURCE_FIELDNAMES = [
+    "source",
+    "attribution",
+    "collection",
+    "documentation-url",
+    "endpoint",
+    "licence",
+    "organisation",
+    "pipelines",
+    "entry-date",
+    "start-date",
+    "end-date",
+]
+
+
+def _strip(value):
+    return (value or "").strip()
+
+
+class RegistrySnapshot:
+    """Immutable indexes of the endpoint and source rows of a collection."""
+
+    def __init__(self, endpoints, sources):
+        self.endpoints_by_url = {}
+        self.endpoints_by_hash = {}
+        for row in endpoints:
+            self.endpoints_by_url.setdefault(_strip(row.get("endpoint-url")), row)
+            self.endpoints_by_hash.setdefault(_strip(row.get("endpoint")), row)
+
+        self.sources_by_key = {}
+        self.endpoints_by_org_pipeline = defaultdict(list)
+        for row in sources:
+            self.sources_by_key.setdefault(_strip(row.get("source")), row)
+            if _strip(row.get("endpoint")):
+                key = (_strip(row.get("organisation")), _strip(row.get("pipelines")))
+                self.endpoints_by_org_pipeline[key].append(row.get("endpoint"))
+
+
+class CollectionRegistry:
+    """A request's view of the registry, rows it adds are kept in the overlay."""
+
+    def __init__(self, config_dir, snapshot):
+        self.config_dir = config_dir
+        self.snapshot = snapshot
+        self.endpoint_csv_path = os.path.join(config_dir, "endpoint.csv")
+        self.source_csv_path = os.path.join(config_dir, "source.csv")
+        self._overlay = RegistrySnapshot([], [])
+        self.version = self._files_version()
+
+    def _files_version(self):
+        return (
+            file_fingerprint(self.endpoint_csv_path),
+            file_fingerprint(self.source_csv_path),
+        )
+
+    def find_endpoint(self, url):
+        url = _strip(url)
+        return self._overlay.endpoints_by_url.get(
+            url
+        ) or self.snapshot.endpoints_by_url.get(url)
+
+    def find_endpoint_by_hash(self, endpoint_key):
+        endpoint_key = _strip(endpoint_key)
+        return self._overlay.endpoints_by_hash.get(
+            endpoint_key
+        ) or self.snapshot.endpoints_by_hash.get(endpoint_key)
+
+    def find_source(self, source_key):
+        source_key = _strip(source_key)
+        return self._overlay.sources_by_key.get(
+            source_key
+        ) or self.snapshot.sources_by_key.get(source_key)
+
+    def endpoints_for(self, organisation, pipelines):
+        key = (_strip(organisation), _strip(pipelines))
+        return list(self.snapshot.endpoints_by_org_pipeline.get(key, [])) + list(
+            self._overlay.endpoints_by_org_pipeline.get(key, [])
+        )
+
+    def add_endpoint(self, row):
+        _append_row(self.endpoint_csv_path, ENDPOINT_FIELDNAMES, row)
+        self._overlay.endpoints_by_url.setdefault(_strip(row["endpoint-url"]), row)
+        self._overlay.endpoints_by_hash.setdefault(_strip(row["endpoint"]), row)
+        self.version = self._files_version()
+
+    def add_source(self, row):
+        _append_row(self.source_csv_path, SOURCE_FIELDNAMES, row)
+        self._overlay.sources_by_key.setdefault(_strip(row["source"]), row)
+        if _strip(row.get("endpoint")):
+            key = (_strip(row.get("organisation")), _strip(row.get("pipelines")))
+            self._overlay.endpoints_by_org_pipeline[key].append(row["endpoint"])
+        self.version = self._files_version()
+
+
+def _append_row(path, fieldnames, row):
+    """
+    Append row to path. Trailing blank lines are stripped first, which only
+    needs a rewrite when there are any.
+    """
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "rb") as f:
+            f.seek(max(os.path.getsize(path) - 4, 0))
+            tail = f.read()
+        if tail.endswith((b"\n\n", b"\n\r\n")) or not tail.strip():
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            while lines and lines[-1].strip() == "":
+                lines.pop()
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.writelines(lines)
+        elif not tail.endswith(b"\n"):
+            with open(path, "a", encoding="utf-8", newline="") as f:
+                f.write("\r\n")
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        csv.DictWriter(f, fieldnames=fieldnames).writerow(row)
+
+
+def _read_rows(path):
+    """Content hash and rows of path, read in one go."""
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None, []
+    rows = list(csv.DictReader(io.StringIO(content.decode("utf-8"), newline="")))
+    return hashlib.sha256(content).hexdigest(), rows
+
+
+class RegistryCache:
+    """Snapshots keyed by content, overlays keyed by config directory."""
+
+    def __init__(self, max_snapshots=8, max_registries=32):
+        self.max_snapshots = max_snapshots
+        self.max_registries = max_registries
+        self._snapshots = OrderedDict()
+        self._registries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, config_dir):
+        key = os.path.realpath(config_dir)
+        with self._lock:
+            registry = self._registries.get(key)
+            if registry is not None and registry.version == registry._files_version():
+                self._registries.move_to_end(key)
+                return registry
+
+            endpoint_hash, endpoints = _read_rows(os.path.join(key, "endpoint.csv"))
+            source_hash, sources = _read_rows(os.path.join(key, "source.csv"))
+            snapshot_key = (endpoint_hash, source_hash)
+            snapshot = self._snapshots.get(snapshot_key)
+            if snapshot is None:
+                snapshot = RegistrySnapshot(endpoints, sources)
+                self._snapshots[snapshot_key] = snapshot
+                while len(self._snapshots) > self.max_snapshots:
+                    self._snapshots.popitem(last=False)
+            self._snapshots.move_to_end(snapshot_key)
+
+            registry = CollectionRegistry(config_dir, snapshot)
+            self._registries[key] = registry
+            while len(self._registries) > self.max_registries:
+                self._registries.popitem(last=False)
+            return registry
+
+    def close(self, config_dir):
+        with self._lock:
+            self._registries.pop(os.path.realpath(config_dir), None)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._registries.clear()
+
+
+registry_cache = RegistryCache()
+
+
+def open_registry(config_dir):
+    """Return the registry for the endpoint.csv and source.csv in config_dir."""
+    return registry_cache.open(config_dir)
+
+
+def close_registry(config_dir):
+    """Drop the overlay for config_dir once the request is done with it."""
+    registry_cache.close(config_dir)
@@ -0,0 +1,81 @@
+"""
+Error summary rules compiled from the YAML files in application/configs.
+
+The files are parsed once per worker into lookup tables. With
+RULES_HOT_RELOAD enabled a file is compiled again when it changes on disk.
+"""
+import os
+import threading
+
+import yaml
+
+from application.configurations import config
+from application.core.cache import file_fingerprint
+from application.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONFIGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "configs")
+MAPPING_PATH = os.path.join(CONFIGS_DIR, "mapping.yaml")
+MANDATORY_FIELDS_PATH = os.path.join(CONFIGS_DIR, "mandatory_fields.yaml")
+
+
+class CompiledYaml:
+    """A YAML file compiled once with compile, and again on change if hot reload is on."""
+
+    def __init__(self, path, compile):
+        self.path = path
+        self.compile = compile
+        self._value = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._value is None or (
+                config.RULES_HOT_RELOAD and file_fingerprint(self.path) != self._version
+            ):
+                self._version = file_fingerprint(self.path)
+                with open(self.path, "r") as f:
+                    self._value = self.compile(yaml.safe_load(f) or {})
+                logger.info(f"Compiled error summary rules from {self.path}")
+            return self._value
+
+
+def _compile_mappings(data):
+    """(field, issue-type) to the mapping with its summary templates."""
+    return {
+        (mapping["field"], mapping["issue-type"]): mapping
+        for mapping in data.get("mappings", [])
+    }
+
+
+def _compile_mandatory_fields(data):
+    """Dataset to its mandatory fields, a list of alternatives for a group."""
+    return {dataset: list(fields or []) for dataset, fields in data.items()}
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def _get(path, compile):
+    with _compiled_lock:
+        compiled = _compiled.get(path)
+        if compiled is None:
+            compiled = _compiled[path] = CompiledYaml(path, compile)
+    return compiled.get()
+
+
+def mappings():
+    return _get(MAPPING_PATH, _compile_mappings)
+
+
+def mandatory_fields(path=MANDATORY_FIELDS_PATH):
+    return _get(os.path.realpath(path), _compile_mandatory_fields)
+
+
+def load():
+    """Compile every rule file, called when the worker starts."""
+    mappings()
+    mandatory_fields()
@@ -0,0 +1,100 @@
+"""
+Per-stage timings of the check and add-data workflows.
+
+Each task times its stages (configuration download, fetch, transform,
+reading the outputs back and saving the response) with a StageMetrics. The
+time, bytes and rows of every stage are exported as Prometheus metrics on the
+worker's /metrics endpoint, labelled by request type, dataset and plugin, and
+summarised in the stored response data under "stage-metrics". Each stage is
+also a tracing span.
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Histogram
+
+from task_interface import tracing
+
+CONFIG = "config"
+FETCH = "fetch"
+TRANSFORM = "transform"
+READ_OUTPUTS = "read-outputs"
+PERSIST = "persist"
+
+LABELS = ["stage", "request_type", "dataset", "plugin"]
+
+STAGE_DURATION = Histogram(
+    "worker_stage_duration_seconds",
+    "Time taken by each stage of a request",
+    LABELS,
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+STAGE_BYTES = Counter(
+    "worker_stage_bytes_total", "Bytes handled by each stage of a request", LABELS
+)
+STAGE_ROWS = Counter(
+    "worker_stage_rows_total", "Rows handled by each stage of a request", LABELS
+)
+
+
+class StageRecord:
+    def __init__(self):
+        self.seconds = 0.0
+        self.bytes = None
+        self.rows = None
+
+    def add(self, bytes=None, rows=None):
+        if bytes is not None:
+            self.bytes = (self.bytes or 0) + bytes
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+
+
+class StageMetrics:
+    """The stages of one request, timed with stage()."""
+
+    def __init__(self, request_type="unknown", dataset=None, plugin=None):
+        self.request_type = request_type
+        self.dataset = dataset
+        self.plugin = plugin
+        self.records = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block, which can add bytes and rows to the yielded record."""
+        record = self.records.setdefault(name, StageRecord())
+        bytes_before, rows_before = record.bytes or 0, record.rows or 0
+        start = time.perf_counter()
+        try:
+            with tracing.span(name, "workflow.stage", stage=name) as span:
+                try:
+                    yield record
+                finally:
+                    span.set("bytes", (record.bytes or 0) - bytes_before)
+                    span.set("rows", (record.rows or 0) - rows_before)
+        finally:
+            seconds = time.perf_counter() - start
+            record.seconds += seconds
+            labels = (
+                name,
+                self.request_type,
+                self.dataset or "unknown",
+                self.plugin or "none",
+            )
+            STAGE_DURATION.labels(*labels).observe(seconds)
+            if (record.bytes or 0) > bytes_before:
+                STAGE_BYTES.labels(*labels).inc(record.bytes - bytes_before)
+            if (record.rows or 0) > rows_before:
+                STAGE_ROWS.labels(*labels).inc(record.rows - rows_before)
+
+    def summary(self):
+        """Stages so far, for the stored response data."""
+        summary = {}
+        for name, record in self.records.items():
+            stage = {"seconds": round(record.seconds, 3)}
+            if record.bytes is not None:
+                stage["bytes"] = record.bytes
+            if record.rows is not None:
+                stage["rows"] = record.rows
+            summary[name] = stage
+        return summary
@@ -1,4 +1,11 @@
 from application.logging.logger import get_logger
+from application.configurations.config import ENCODING_SAMPLE_BYTES
+from application.core.registry import (
+    ENDPOINT_FIELDNAMES,
+    SOURCE_FIELDNAMES,
+    open_registry,
+)
+import codecs
 import os
 import hashlib
 import requests
@@ -6,6 +13,7 @@ from cchardet import UniversalDetector
 import csv
 import json
 from datetime import datetime
+from functools import lru_cache
 
 logger = get_logger(__name__)
 
@@ -46,6 +54,24 @@ def get_request(url, verify_ssl=True):
     return log, content
 
 
+def content_length(url, timeout=30):
+    """Size of url from a HEAD request, None if it isn't given or can't be read."""
+    try:
+        response = requests.head(
+            url,
+            headers={"User-Agent": "DLUHC Digital Land"},
+            timeout=timeout,
+            allow_redirects=True,
+        )
+    except requests.RequestException as e:
+        logger.info(f"Could not get the size of {url}: {e}")
+        return None
+    length = response.headers.get("Content-Length", "")
+    if response.status_code != 200 or not length.isdigit():
+        return None
+    return int(length)
+
+
 def check_content(content):
     """
     Determines if the response content from a URL contains multiple layers.
@@ -89,32 +115,54 @@ def save(path, data):
             f.write(data)
 
 
-def detect_encoding(path):
+# Byte order marks checked before sampling, longest first as the UTF-32 LE
+# mark starts with the UTF-16 LE one
+BOMS = [
+    (codecs.BOM_UTF32_LE, "UTF-32"),
+    (codecs.BOM_UTF32_BE, "UTF-32"),
+    (codecs.BOM_UTF8, "UTF-8-SIG"),
+    (codecs.BOM_UTF16_LE, "UTF-16"),
+    (codecs.BOM_UTF16_BE, "UTF-16"),
+]
+
+
+def detect_encoding(path, max_bytes=ENCODING_SAMPLE_BYTES):
+    """
+    Detect the encoding of path from at most max_bytes (None reads the whole
+    file). Results are cached per file and invalidated when the file changes.
+    """
+    stat = os.stat(path)
+    return _detect_encoding(
+        os.path.realpath(path), stat.st_mtime_ns, stat.st_size, max_bytes
+    )
+
+
+@lru_cache(maxsize=256)
+def _detect_encoding(path, mtime_ns, size, max_bytes):
     with open(path, "rb") as f:
+        head = f.read(4)
+        for bom, encoding in BOMS:
+            if head.startswith(bom):
+                return encoding
+
         detector = UniversalDetector()
         detector.reset()
-
-        for line in f:
-            detector.feed(line)
-            if detector.done:
+        detector.feed(head)
+        read = len(head)
+        while not detector.done and (max_bytes is None or read < max_bytes):
+            block = f.read(64 * 1024)
+            if not block:
                 break
+            detector.feed(block)
+            read += len(block)
         detector.close()
 
-        return detector.result["encoding"]
-
-
-def extract_dataset_field_rows(folder_path, dataset):
-    csv_file_path = os.path.join(folder_path, "dataset-field.csv")
-    if os.path.exists(csv_file_path):
-        reader = csv.DictReader(open(csv_file_path))
-        if reader is not None:
-            filtered_rows = [
-                row for row in reader if "dataset" in row and row["dataset"] == dataset
-            ]
-        return filtered_rows
-    else:
-        logger.error("Error extracting dataset-field.csv in the specified folder.")
-        return None
+    encoding = detector.result["encoding"]
+    if read < size and encoding in (None, "ASCII"):
+        # An ASCII sample says nothing about the rest of the file, UTF-8 is
+        # the ASCII superset most likely to decode it
+        return "UTF-8"
+    return encoding
 
 
 def hash_sha256(value):
@@ -134,48 +182,21 @@ def append_endpoint(
     plugin=None,
 ):
     endpoint_key = hash_sha256(endpoint_url)
+    registry = open_registry(os.path.dirname(endpoint_csv_path))
 
-    exists = False
     new_row = None
-
-    if os.path.exists(endpoint_csv_path) and os.path.getsize(endpoint_csv_path) > 0:
-        with open(endpoint_csv_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        while lines and lines[-1].strip() == "":
-            lines.pop()
-        with open(endpoint_csv_path, "w", encoding="utf-8", newline="") as f:
-            f.writelines(lines)
-
-    if os.path.exists(endpoint_csv_path):
-        with open(endpoint_csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("endpoint-url") == endpoint_url:
-                    exists = True
-                    break
-    if not exists:
-        with open(endpoint_csv_path, "a", newline="", encoding="utf-8") as f:
-            fieldnames = [
-                "endpoint",
-                "endpoint-url",
-                "parameters",
-                "plugin",
-                "entry-date",
-                "start-date",
-                "end-date",
-            ]
-            new_row = {
-                "endpoint": endpoint_key,
-                "endpoint-url": endpoint_url,
-                "parameters": "",
-                "plugin": plugin or "",
-                "entry-date": _formatted_date(entry_date)
-                or datetime.now().date().isoformat(),
-                "start-date": _formatted_date(start_date),
-                "end-date": _formatted_date(end_date),
-            }
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writerow(new_row)
+    if registry.find_endpoint(endpoint_url) is None:
+        new_row = {
+            "endpoint": endpoint_key,
+            "endpoint-url": endpoint_url,
+            "parameters": "",
+            "plugin": plugin or "",
+            "entry-date": _formatted_date(entry_date)
+            or datetime.now().date().isoformat(),
+            "start-date": _formatted_date(start_date),
+            "end-date": _formatted_date(end_date),
+        }
+        registry.add_endpoint(new_row)
     return endpoint_key, new_row
 
 
@@ -193,54 +214,25 @@ def append_source(
     end_date=None,
 ):
     source_key = hash_md5(f"{collection}|{organisation}|{endpoint_key}")
-    exists = False
+    registry = open_registry(os.path.dirname(source_csv_path))
+
     new_row = None
-    if os.path.exists(source_csv_path) and os.path.getsize(source_csv_path) > 0:
-        with open(source_csv_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        while lines and lines[-1].strip() == "":
-            lines.pop()
-        with open(source_csv_path, "w", encoding="utf-8", newline="") as f:
-            f.writelines(lines)
-
-    if os.path.exists(source_csv_path):
-        with open(source_csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("source") == source_key:
-                    exists = True
-                    break
-    if not exists:
-        with open(source_csv_path, "a", newline="", encoding="utf-8") as f:
-            fieldnames = [
-                "source",
-                "attribution",
-                "collection",
-                "documentation-url",
-                "endpoint",
-                "licence",
-                "organisation",
-                "pipelines",
-                "entry-date",
-                "start-date",
-                "end-date",
-            ]
-            new_row = {
-                "source": source_key,
-                "attribution": attribution,
-                "collection": collection,
-                "documentation-url": documentation_url,
-                "endpoint": endpoint_key,
-                "licence": licence,
-                "organisation": organisation,
-                "pipelines": pipelines,
-                "entry-date": _formatted_date(entry_date)
-                or datetime.now().date().isoformat(),
-                "start-date": _formatted_date(start_date),
-                "end-date": _formatted_date(end_date),
-            }
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writerow(new_row)
+    if registry.find_source(source_key) is None:
+        new_row = {
+            "source": source_key,
+            "attribution": attribution,
+            "collection": collection,
+            "documentation-url": documentation_url,
+            "endpoint": endpoint_key,
+            "licence": licence,
+            "organisation": organisation,
+            "pipelines": pipelines,
+            "entry-date": _formatted_date(entry_date)
+            or datetime.now().date().isoformat(),
+            "start-date": _formatted_date(start_date),
+            "end-date": _formatted_date(end_date),
+        }
+        registry.add_source(new_row)
     return source_key, new_row
 
 
@@ -304,38 +296,17 @@ def validate_endpoint(url, config_dir, plugin, start_date=None):
         os.makedirs(os.path.dirname(endpoint_csv_path), exist_ok=True)
         with open(endpoint_csv_path, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
-            writer.writerow(
-                [
-                    "endpoint",
-                    "endpoint-url",
-                    "parameters",
-                    "plugin",
-                    "entry-date",
-                    "start-date",
-                    "end-date",
-                ]
-            )
+            writer.writerow(ENDPOINT_FIELDNAMES)
 
     endpoint_exists = False
     existing_entry = None
 
     try:
-        with open(endpoint_csv_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("endpoint-url", "").strip() == url.strip():
-                    endpoint_exists = True
-                    existing_entry = {
-                        "endpoint": row.get("endpoint", ""),
-                        "endpoint-url": row.get("endpoint-url", ""),
-                        "parameters": row.get("parameters", ""),
-                        "plugin": row.get("plugin", ""),
-                        "entry-date": row.get("entry-date", ""),
-                        "start-date": row.get("start-date", ""),
-                        "end-date": row.get("end-date", ""),
-                    }
-                    logger.info("Endpoint URL found in endpoint.csv")
-                    break
+        row = open_registry(config_dir).find_endpoint(url)
+        if row is not None:
+            endpoint_exists = True
+            existing_entry = {key: row.get(key, "") for key in ENDPOINT_FIELDNAMES}
+            logger.info("Endpoint URL found in endpoint.csv")
     except Exception as e:
         logger.error(f"Error reading endpoint.csv: {e}")
 
@@ -369,16 +340,9 @@ def _find_existing_endpoint_for_org_dataset(source_csv_path, organisation, datas
     if not os.path.exists(source_csv_path):
         return []
     try:
-        with open(source_csv_path, "r", encoding="utf-8") as f:
-            return [
-                row.get("endpoint")
-                for row in csv.DictReader(f)
-                if (
-                    row.get("organisation", "").strip() == organisation.strip()
-                    and row.get("pipelines", "").strip() == dataset.strip()
-                    and row.get("endpoint", "").strip() != ""
-                )
-            ]
+        return open_registry(os.path.dirname(source_csv_path)).endpoints_for(
+            organisation, dataset
+        )
     except Exception as e:
         logger.error(f"Error checking existing endpoint for org/dataset: {e}")
     return []
@@ -386,22 +350,9 @@ def _find_existing_endpoint_for_org_dataset(source_csv_path, organisation, datas
 
 def _read_existing_source_entry(source_csv_path, source_key):
     try:
-        with open(source_csv_path, "r", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                if row.get("source", "").strip() == source_key:
-                    return {
-                        "source": row.get("source", ""),
-                        "attribution": row.get("attribution", ""),
-                        "collection": row.get("collection", ""),
-                        "documentation-url": row.get("documentation-url", ""),
-                        "endpoint": row.get("endpoint", ""),
-                        "licence": row.get("licence", ""),
-                        "organisation": row.get("organisation", ""),
-                        "pipelines": row.get("pipelines", ""),
-                        "entry-date": row.get("entry-date", ""),
-                        "start-date": row.get("start-date", ""),
-                        "end-date": row.get("end-date", ""),
-                    }
+        row = open_registry(os.path.dirname(source_csv_path)).find_source(source_key)
+        if row is not None:
+            return {key: row.get(key, "") for key in SOURCE_FIELDNAMES}
     except Exception as e:
         logger.error(f"Error reading existing source: {e}")
     return None
@@ -4,11 +4,9 @@ import os
 import csv
 from pathlib import Path
 import urllib
-import yaml
 from urllib.error import HTTPError
 from application.core.utils import (
     detect_encoding,
-    extract_dataset_field_rows,
     validate_endpoint,
     validate_source,
 )
@@ -18,8 +16,21 @@ from application.core.pipeline import (
     resource_from_path,
     fetch_add_data_response,
 )
+from application.core.csv_reader import iter_csv_records, read_csv_records
+from application.core import rules, workspace
+from application.core.cache import get_dataset_fields
+from application.core.registry import close_registry
+from application.core.progress import TRANSFORMING
+from application.core.stage_metrics import (
+    CONFIG,
+    READ_OUTPUTS,
+    TRANSFORM,
+    StageMetrics,
+)
 from application.configurations.config import source_url, CONFIG_URL
+from task_interface import tracing
 from collections import defaultdict
+from functools import partial
 import json
 import warnings
 
@@ -35,8 +46,28 @@ def run_workflow(
     geom_type,
     column_mapping,
     directories,
+    progress=None,
+    stages=None,
+    stream_outputs=False,
+    move_to_disk=None,
 ):
+    """
+    stages times the workflow stages, its summary is added to the response.
+
+    With stream_outputs the converted rows, issue log and transformed rows of
+    the response are OutputRows, read from the workflow outputs as they are
+    iterated, so their size doesn't bound the memory of the worker. Only the
+    column-field log, a row per column, is held in memory. The outputs are
+    then left in place and the caller removes them with clean_up_outputs once
+    done.
+
+    If the transform runs out of space, move_to_disk is called to move the
+    workspace to disk and the transform is run again in the directories it
+    returns.
+    """
     additional_concats = None
+    progress = progress or _no_progress
+    stages = stages or StageMetrics("check", dataset)
     response_data = {}
 
     try:
@@ -48,101 +79,267 @@ def run_workflow(
         file_path = os.path.join(input_path, fileName)
         resource = resource_from_path(file_path)
 
-        not_mapped_columns = fetch_pipeline_csvs(
-            collection,
-            dataset,
-            pipeline_dir,
-            geom_type,
-            column_mapping,
-            resource,
-            directories.SPECIFICATION_DIR,
-        )
-
-        fetch_response_data(
-            dataset,
-            organisation,
-            request_id,
-            directories.COLLECTION_DIR,
-            directories.CONVERTED_DIR,
-            directories.ISSUE_DIR,
-            directories.COLUMN_FIELD_DIR,
-            directories.TRANSFORMED_DIR,
-            directories.DATASET_RESOURCE_DIR,
-            pipeline_dir,
-            directories.SPECIFICATION_DIR,
-            directories.CACHE_DIR,
-            additional_col_mappings=column_mapping,
-            additional_concats=additional_concats,
-        )
-        # Need to get the mandatory fields from specification/central place. Hardcoding for MVP
-        required_fields_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "../application/configs/mandatory_fields.yaml",
-        )
-
-        required_fields = getMandatoryFields(required_fields_path, dataset)
-        converted_json = []
-        if os.path.exists(
-            os.path.join(directories.CONVERTED_DIR, request_id, f"{resource}.csv")
-        ):
-            converted_json = csv_to_json(
-                os.path.join(directories.CONVERTED_DIR, request_id, f"{resource}.csv")
-            )
-        else:
-            converted_json = csv_to_json(
-                os.path.join(
-                    directories.COLLECTION_DIR, "resource", request_id, f"{resource}"
-                )
+        with stages.stage(CONFIG):
+            not_mapped_columns = fetch_pipeline_csvs(
+                collection,
+                dataset,
+                pipeline_dir,
+                geom_type,
+                column_mapping,
+                resource,
+                directories.SPECIFICATION_DIR,
             )
 
-        issue_log_json = csv_to_json(
-            os.path.join(directories.ISSUE_DIR, dataset, request_id, f"{resource}.csv")
-        )
-        column_field_json = csv_to_json(
-            os.path.join(
-                directories.COLUMN_FIELD_DIR, dataset, request_id, f"{resource}.csv"
-            )
-        )
-        transformed_json = csv_to_json(
-            os.path.join(
-                directories.TRANSFORMED_DIR, dataset, request_id, f"{resource}.csv"
+        # digital_land converts each file in the first phase of its transform and
+        # streams the rows through the rest, so the whole pass is reported as
+        # transforming. Rows are estimated for CSV inputs and reported as each
+        # file is done, as digital_land doesn't report progress within a file.
+        file_rows = {
+            entry.path: _estimate_rows(entry.path)
+            for entry in os.scandir(input_path)
+            if entry.is_file()
+        }
+        rows_total = sum(file_rows.values()) if None not in file_rows.values() else None
+        rows_done = 0
+
+        def file_done(file_path):
+            nonlocal rows_done
+            if rows_total is not None:
+                rows_done += file_rows.get(file_path) or 0
+                progress(TRANSFORMING, rows_done, rows_total)
+
+        progress(TRANSFORMING, 0 if rows_total is not None else None, rows_total)
+        with stages.stage(TRANSFORM) as record:
+            record.add(bytes=_directory_size(input_path))
+            transform = partial(
+                fetch_response_data,
+                dataset,
+                organisation,
+                request_id,
+                additional_col_mappings=column_mapping,
+                additional_concats=additional_concats,
+                file_done=file_done,
             )
-        )
+            try:
+                resources = transform(*_transform_dirs(directories, pipeline_dir))
+            except OSError as e:
+                if not (move_to_disk and workspace.out_of_space(e)):
+                    raise
+                directories = move_to_disk() or directories
+                pipeline_dir = os.path.join(
+                    directories.PIPELINE_DIR, dataset, request_id
+                )
+                resources = transform(*_transform_dirs(directories, pipeline_dir))
+        # Need to get the mandatory fields from specification/central place. Hardcoding for MVP
+        required_fields = getMandatoryFields(rules.MANDATORY_FIELDS_PATH, dataset)
+        converted_rows = OutputRows()
+        transformed_rows = OutputRows()
+        issue_rows = OutputRows()
+        column_field_json = []
+        # Multi-file resources are merged in the order they were processed, with
+        # entry numbers offset so they stay unique across files
+        with stages.stage(READ_OUTPUTS) as record:
+            for file_resource in resources or [resource]:
+                paths = resource_output_paths(
+                    directories, dataset, request_id, file_resource
+                )
+                offset = converted_rows.rows
+                converted_rows.add(paths["converted-csv"])
+                issue_rows.add(paths["issue-log"], "utf-8", offset)
+                column_field_json.extend(
+                    csv_to_json(paths["column-field-log"], encoding="utf-8")
+                )
+                transformed_rows.add(paths["transformed-csv"], "utf-8", offset)
+            record.add(rows=converted_rows.rows)
         updateColumnFieldLog(column_field_json, required_fields)
-        summary_data = error_summary(
-            issue_log_json, column_field_json, not_mapped_columns
-        )
+        summary_data = error_summary(issue_rows, column_field_json, not_mapped_columns)
 
+        if not stream_outputs:
+            converted_rows = list(converted_rows)
+            issue_rows = list(issue_rows)
+            transformed_rows = list(transformed_rows)
         response_data = {
-            "converted-csv": converted_json,
-            "issue-log": issue_log_json,
+            "converted-csv": converted_rows,
+            "issue-log": issue_rows,
             "column-field-log": column_field_json,
             "error-summary": summary_data,
-            "transformed-csv": transformed_json,
+            "transformed-csv": transformed_rows,
+            "stage-metrics": stages.summary(),
         }
         # logger.info("Error Summary: %s", summary_data)
     except Exception as e:
         logger.exception(f"An error occurred: {e}")
 
     finally:
-        clean_up(
-            request_id,
-            os.path.join(directories.COLLECTION_DIR, "resource"),
-            directories.COLLECTION_DIR,
-            directories.CONVERTED_DIR,
-            os.path.join(directories.ISSUE_DIR, dataset),
-            directories.ISSUE_DIR,
-            directories.COLUMN_FIELD_DIR,
-            os.path.join(directories.TRANSFORMED_DIR, dataset),
-            directories.TRANSFORMED_DIR,
-            directories.DATASET_RESOURCE_DIR,
-            os.path.join(directories.PIPELINE_DIR, dataset),
-            directories.PIPELINE_DIR,
-        )
+        if not (stream_outputs and response_data):
+            clean_up_outputs(request_id, dataset, directories)
 
     return response_data
 
 
+def _transform_dirs(directories, pipeline_dir):
+    """The directory arguments of fetch_response_data."""
+    return (
+        directories.COLLECTION_DIR,
+        directories.CONVERTED_DIR,
+        directories.ISSUE_DIR,
+        directories.COLUMN_FIELD_DIR,
+        directories.TRANSFORMED_DIR,
+        directories.DATASET_RESOURCE_DIR,
+        pipeline_dir,
+        directories.SPECIFICATION_DIR,
+        directories.CACHE_DIR,
+    )
+
+
+def clean_up_outputs(request_id, dataset, directories):
+    """Remove the resource and workflow outputs of a request."""
+    clean_up(
+        request_id,
+        os.path.join(directories.COLLECTION_DIR, "resource"),
+        directories.COLLECTION_DIR,
+        directories.CONVERTED_DIR,
+        os.path.join(directories.ISSUE_DIR, dataset),
+        directories.ISSUE_DIR,
+        directories.COLUMN_FIELD_DIR,
+        os.path.join(directories.TRANSFORMED_DIR, dataset),
+        directories.TRANSFORMED_DIR,
+        directories.DATASET_RESOURCE_DIR,
+        os.path.join(directories.PIPELINE_DIR, dataset),
+        directories.PIPELINE_DIR,
+    )
+
+
+def _no_progress(stage, rows_processed=None, rows_total=None):
+    pass
+
+
+def _estimate_rows(path, sample_bytes=64 * 1024):
+    """
+    Data rows of a CSV file estimated from its size and the rows in its first
+    sample_bytes, or None if its name doesn't show it is a CSV, as the rows of
+    other formats aren't known until digital_land converts them.
+    """
+    if not path.lower().endswith(".csv"):
+        return None
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            sample = f.read(sample_bytes)
+    except OSError:
+        return None
+    lines = sample.count(b"\n")
+    if len(sample) == size:
+        # The whole file was read, less its header
+        return max(lines - (1 if sample.endswith(b"\n") else 0), 0)
+    # Scale the complete rows after the header up to the rest of the file
+    header_end = sample.find(b"\n") + 1
+    rows_end = sample.rfind(b"\n") + 1
+    if rows_end <= header_end:
+        return None
+    return round((size - header_end) * (lines - 1) / (rows_end - header_end))
+
+
+def _directory_size(path):
+    try:
+        return sum(
+            entry.stat().st_size for entry in os.scandir(path) if entry.is_file()
+        )
+    except FileNotFoundError:
+        return 0
+
+
+def resource_output_paths(directories, dataset, request_id, resource):
+    """Paths of the converted, issue, column-field and transformed CSVs of a resource."""
+    converted_path = os.path.join(
+        directories.CONVERTED_DIR, request_id, f"{resource}.csv"
+    )
+    if not os.path.exists(converted_path):
+        converted_path = os.path.join(
+            directories.COLLECTION_DIR, "resource", request_id, f"{resource}"
+        )
+    return {
+        "converted-csv": converted_path,
+        "issue-log": os.path.join(
+            directories.ISSUE_DIR, dataset, request_id, f"{resource}.csv"
+        ),
+        "column-field-log": os.path.join(
+            directories.COLUMN_FIELD_DIR, dataset, request_id, f"{resource}.csv"
+        ),
+        "transformed-csv": os.path.join(
+            directories.TRANSFORMED_DIR, dataset, request_id, f"{resource}.csv"
+        ),
+    }
+
+
+def read_resource_outputs(directories, dataset, request_id, resource):
+    """Read the converted, issue, column-field and transformed CSVs of a resource."""
+    paths = resource_output_paths(directories, dataset, request_id, resource)
+    return {
+        "converted-csv": csv_to_json(paths["converted-csv"]),
+        # Logs and transformed output are written by the pipeline in UTF-8
+        "issue-log": csv_to_json(paths["issue-log"], encoding="utf-8"),
+        "column-field-log": csv_to_json(paths["column-field-log"], encoding="utf-8"),
+        "transformed-csv": csv_to_json(paths["transformed-csv"], encoding="utf-8"),
+    }
+
+
+class OutputRows:
+    """
+    Rows of a workflow output spread over the CSVs of each resource file.
+    They are read from disk each time they are iterated rather than held in
+    memory, with the entry numbers of each file moved on by its offset.
+    Their length is the number of rows counted when files were added without
+    an encoding.
+    """
+
+    def __init__(self):
+        self._files = []
+        self.rows = 0
+
+    def add(self, path, encoding=None, offset=0):
+        """
+        Add the rows of path. Without an encoding, it is detected and checked
+        by counting the rows, as the input may not be written by the pipeline.
+        """
+        if not os.path.isfile(path):
+            return
+        if encoding is None:
+            try:
+                encoding, rows = _count_csv_rows(path)
+            except Exception:
+                logger.error("Cannot process file as CSV ")
+                return
+            self.rows += rows
+        self._files.append((path, encoding, offset))
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        for path, encoding, offset in self._files:
+            for row in iter_csv_records(path, encoding):
+                yield _offset_entry_number(row, offset)
+
+
+def _count_csv_rows(path):
+    """The encoding of path and its number of rows."""
+    encoding = detect_encoding(path)
+    try:
+        return encoding, sum(1 for _ in iter_csv_records(path, encoding))
+    except UnicodeDecodeError:
+        # The sampled prefix did not represent the whole file
+        encoding = detect_encoding(path, max_bytes=None)
+        return encoding, sum(1 for _ in iter_csv_records(path, encoding))
+
+
+def _offset_entry_number(row, offset):
+    entry_number = str(row.get("entry-number", ""))
+    if offset and entry_number.isdigit():
+        row["entry-number"] = str(int(entry_number) + offset)
+    return row
+
+
 # flake8: noqa
 # pragma: mccabe-complexity 11
 def fetch_pipeline_csvs(
@@ -163,7 +360,7 @@ def fetch_pipeline_csvs(
             print(
                 f"{source_url}/{collection + '-collection'}/main/pipeline/{pipeline_csv}"
             )
-            urllib.request.urlretrieve(
+            _retrieve(
                 f"{source_url}/{collection + '-collection'}/main/pipeline/{pipeline_csv}",
                 csv_path,
             )
@@ -176,7 +373,7 @@ def fetch_pipeline_csvs(
                 f"{source_url}/{'config'}/main/pipeline/{collection}/{pipeline_csv}"
             )
             try:
-                urllib.request.urlretrieve(
+                _retrieve(
                     f"{source_url}/{'config'}/main/pipeline/{collection}/{pipeline_csv}",
                     csv_path,
                 )
@@ -205,6 +402,11 @@ def fetch_pipeline_csvs(
     return {}
 
 
+def _retrieve(url, path):
+    with tracing.client_call("GET", **{"url.full": url}):
+        return urllib.request.urlretrieve(url, path)
+
+
 def add_geom_mapping(dataset, pipeline_dir, geom_type, resource, pipeline_csv):
     warnings.warn(
         "depreciated, use column_mapping parameter instead",
@@ -240,7 +442,9 @@ def add_extra_column_mappings(
     specification_dir,
     endpoint_hash=None,
 ):
-    filtered_rows = extract_dataset_field_rows(specification_dir, dataset)
+    dataset_fields = get_dataset_fields(specification_dir, dataset)
+    if dataset_fields is None:
+        logger.error("Error extracting dataset-field.csv in the specified folder.")
     fieldnames = []
     not_mapped_columns = []
     with open(column_path) as f:
@@ -253,22 +457,21 @@ def add_extra_column_mappings(
         mappings = {"dataset": dataset, "resource": resource}
     column_mapping_dump = json.dumps(column_mapping)
     column_mapping_json = json.loads(column_mapping_dump)
+    new_mappings = []
     for key, value in column_mapping_json.items():
-        mappings["column"] = key
-        mappings["field"] = value
-        if filtered_rows is not None:
-            if mappings["field"] != "IGNORE" and mappings["field"] not in [
-                row["field"] for row in filtered_rows
-            ]:
-                logger.error(
-                    f"Error: Field '{mappings['field']}' does not exist in dataset-field.csv"
-                )
-                not_mapped_columns.append(mappings["field"])
-            else:
-                with open(column_path, "a", newline="") as f:
-                    f.write("\n")
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    writer.writerow(mappings)
+        if dataset_fields is None:
+            continue
+        if value != "IGNORE" and value not in dataset_fields:
+            logger.error(f"Error: Field '{value}' does not exist in dataset-field.csv")
+            not_mapped_columns.append(value)
+        else:
+            new_mappings.append({**mappings, "column": key, "field": value})
+
+    if new_mappings:
+        with open(column_path, "a", newline="") as f:
+            f.write("\n")
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writerows(new_mappings)
     return not_mapped_columns
 
 
@@ -304,23 +507,24 @@ def clean_up(request_id, *directories):
         )
 
 
-def csv_to_json(csv_file):
+def csv_to_json(csv_file, encoding=None):
+    """
+    Read csv_file as a list of dicts. encoding can be given for files written
+    by the pipeline, otherwise it is detected from a sample of the file.
+    """
     json_data = []
 
     if os.path.isfile(csv_file):
         # Detect .csv encoding
-        encoding = detect_encoding(csv_file)
+        encoding = encoding or detect_encoding(csv_file)
         # Open the CSV file for reading
         try:
-            with open(csv_file, "r", encoding=encoding) as csv_input:
-                # Read the CSV data
-                csv_data = csv.DictReader(csv_input)
-
-                # Convert CSV to a list of dictionaries
-                data_list = list(csv_data)
-
-                for row in data_list:
-                    json_data.append(row)
+            try:
+                json_data = read_csv_records(csv_file, encoding)
+            except UnicodeDecodeError:
+                # The sampled prefix did not represent the whole file
+                encoding = detect_encoding(csv_file, max_bytes=None)
+                json_data = read_csv_records(csv_file, encoding)
         except Exception:
             logger.error("Cannot process file as CSV ")
 
@@ -329,60 +533,39 @@ def csv_to_json(csv_file):
 
 def updateColumnFieldLog(column_field_log, required_fields):
     # # Updating all the column field entries to missing:False
+    mapped_fields = set()
     for entry in column_field_log:
         entry.setdefault("missing", False)
+        mapped_fields.add(entry["field"])
 
     for field in required_fields:
-        found = any(entry["field"] in field for entry in column_field_log)
-        if not found:
-            # Check if the field is a list, and if so, check if at least one element is present
-            if isinstance(field, list):
-                for f in field:
-                    column_field_log.append({"field": f, "missing": True})
-            else:
-                column_field_log.append({"field": field, "missing": True})
+        # A list is a group of alternatives, at least one of which must be present
+        alternatives = field if isinstance(field, list) else [field]
+        if mapped_fields.isdisjoint(alternatives):
+            for f in alternatives:
+                column_field_log.append({"field": f, "missing": True})
 
 
 def getMandatoryFields(required_fields_path, dataset):
-    with open(required_fields_path, "r") as f:
-        data = yaml.safe_load(f)
-    required_fields = data.get(dataset, [])
-    return required_fields
+    return list(rules.mandatory_fields(required_fields_path).get(dataset, []))
 
 
 def load_mappings():
-    mappings_file_path = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)),
-        "../application/configs/mapping.yaml",
-    )
-    with open(mappings_file_path, "r") as yaml_file:
-        mappings_data = yaml.safe_load(yaml_file)
-
-    mappings = mappings_data.get("mappings", [])
-    mapping_dict = {
-        (mapping["field"], mapping["issue-type"]): mapping for mapping in mappings
-    }
-    return mapping_dict
+    return rules.mappings()
 
 
 def error_summary(issue_log, column_field, not_mapped_columns):
-    error_issues = [
-        issue
-        for issue in issue_log
-        if issue["severity"] == "error" and issue["responsibility"] == "external"
-    ]
-    missing_columns = [field for field in column_field if field["missing"]]
-    # Count occurrences for each issue-type and field
+    # Count occurrences for each issue-type and field of external errors, in a
+    # single pass as the issue log may be streamed from disk
     error_summary = defaultdict(int)
-    for issue in error_issues:
-        field = issue["field"]
-        issue_type = issue["issue-type"]
-        error_summary[(issue_type, field)] += 1
+    for issue in issue_log:
+        if issue["severity"] == "error" and issue["responsibility"] == "external":
+            error_summary[(issue["issue-type"], issue["field"])] += 1
 
     # fetch missing columns
-    for column in missing_columns:
-        field = column["field"]
-        error_summary[("missing", field)] = True
+    for column in column_field:
+        if column["missing"]:
+            error_summary[("missing", column["field"])] = True
 
     for col in not_mapped_columns:
         error_summary[("mapping_missing", col)] = True
@@ -438,6 +621,8 @@ def add_data_workflow(
     geom_type=None,
     column_mapping=None,
     github_branch=None,
+    progress=None,
+    stages=None,
 ):
     """
     Setup directories and download required CSVs to manage add-data pipeline
@@ -457,8 +642,11 @@ def add_data_workflow(
         geom_type (str): Optional geometry type for column mapping
         column_mapping (dict): Optional caller-supplied column mappings to append to column.csv
         github_branch (str): Optional branch name to indicate if the data should be appended to a specific branch
+        progress (callable): Optional progress reporter called with the current stage
+        stages (StageMetrics): Optional stage timings, summarised in the response
     """
     response_data = {}
+    stages = stages or StageMetrics("add_data", dataset, plugin)
 
     try:
         pipeline_dir = os.path.join(directories.PIPELINE_DIR, collection, request_id)
@@ -472,40 +660,41 @@ def add_data_workflow(
         endpoint_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()
 
         # Loads csvs for Pipeline and Config
-        if not fetch_add_data_pipeline_csvs(
-            collection,
-            pipeline_dir,
-            column_mapping=column_mapping,
-            geom_type=geom_type,
-            resource=resource,
-            dataset=dataset,
-            specification_dir=directories.SPECIFICATION_DIR,
-            endpoint_hash=endpoint_hash,
-            github_branch=github_branch,
-        ):
-            response_data[
-                "message"
-            ] = f"Unable to find lookups for collection '{collection}', dataset '{dataset}'"
-            return response_data
-        if not fetch_add_data_collection_csvs(
-            collection, collection_dir, github_branch=github_branch
-        ):
+        with stages.stage(CONFIG):
+            config_fetched = fetch_add_data_pipeline_csvs(
+                collection,
+                pipeline_dir,
+                column_mapping=column_mapping,
+                geom_type=geom_type,
+                resource=resource,
+                dataset=dataset,
+                specification_dir=directories.SPECIFICATION_DIR,
+                endpoint_hash=endpoint_hash,
+                github_branch=github_branch,
+            ) and fetch_add_data_collection_csvs(
+                collection, collection_dir, github_branch=github_branch
+            )
+        if not config_fetched:
             response_data[
                 "message"
             ] = f"Unable to find lookups for collection '{collection}', dataset '{dataset}'"
             return response_data
 
         # All processes around transforming the data and generating pipeline summary
-        pipeline_summary = fetch_add_data_response(
-            dataset=dataset,
-            organisation_provider=organisation_provider,
-            pipeline_dir=pipeline_dir,
-            input_dir=input_dir,
-            output_path=output_path,
-            specification_dir=directories.SPECIFICATION_DIR,
-            cache_dir=directories.CACHE_DIR,
-            endpoint=endpoint_hash,
-        )
+        if progress:
+            progress(TRANSFORMING)
+        with stages.stage(TRANSFORM) as record:
+            record.add(bytes=_directory_size(input_dir))
+            pipeline_summary = fetch_add_data_response(
+                dataset=dataset,
+                organisation_provider=organisation_provider,
+                pipeline_dir=pipeline_dir,
+                input_dir=input_dir,
+                output_path=output_path,
+                specification_dir=directories.SPECIFICATION_DIR,
+                cache_dir=directories.CACHE_DIR,
+                endpoint=endpoint_hash,
+            )
 
         # Create endpoint and source summaries in workflow
         endpoint_summary = validate_endpoint(
@@ -526,12 +715,16 @@ def add_data_workflow(
         )
 
         pipeline_issues = pipeline_summary.pop("pipeline-issues", [])
+        with stages.stage(READ_OUTPUTS) as record:
+            transformed_csv = csv_to_json(output_path)
+            record.add(rows=len(transformed_csv))
         response_data = {
             "pipeline-summary": pipeline_summary,
             "pipeline-issues": pipeline_issues,
             "endpoint-summary": endpoint_summary,
             "source-summary": source_summary,
-            "transformed-csv": csv_to_json(output_path),
+            "transformed-csv": transformed_csv,
+            "stage-metrics": stages.summary(),
         }
 
         logger.info(f"add data response is for id {request_id} : {response_data}")
@@ -543,6 +736,7 @@ def add_data_workflow(
         response_data["message"] = f"An error occurred in add_data_workflow: {e}"
 
     finally:
+        close_registry(os.path.join(directories.COLLECTION_DIR, request_id))
         clean_up(
             request_id,
             os.path.join(directories.COLLECTION_DIR, "resource", request_id),
@@ -594,7 +788,7 @@ def fetch_add_data_pipeline_csvs(
             for csv_name in pipeline_csvs:
                 csv_path = os.path.join(pipeline_dir, csv_name)
                 branch_url = f"{source_url}config/refs/heads/{github_branch}/pipeline/{collection}/{csv_name}"
-                urllib.request.urlretrieve(branch_url, csv_path)
+                _retrieve(branch_url, csv_path)
                 logger.info(
                     f"Downloaded {csv_name} from branch '{github_branch}': {branch_url}"
                 )
@@ -624,7 +818,7 @@ def fetch_add_data_pipeline_csvs(
         csv_path = os.path.join(pipeline_dir, csv_name)
         url = f"{CONFIG_URL}pipeline/{collection}/{csv_name}"
         try:
-            urllib.request.urlretrieve(url, csv_path)
+            _retrieve(url, csv_path)
             logger.info(f"Downloaded {csv_name} from {url} to {csv_path}")
         except HTTPError as e:
             logger.warning(f"Failed to retrieve {csv_name}: {e}")
@@ -661,7 +855,7 @@ def fetch_add_data_collection_csvs(collection, config_dir, github_branch=None):
             for csv_name in config_csvs:
                 csv_path = os.path.join(config_dir, csv_name)
                 branch_url = f"{source_url}config/refs/heads/{github_branch}/collection/{collection}/{csv_name}"
-                urllib.request.urlretrieve(branch_url, csv_path)
+                _retrieve(branch_url, csv_path)
                 logger.info(
                     f"Downloaded {csv_name} from branch '{github_branch}': {branch_url}"
                 )
@@ -673,7 +867,7 @@ def fetch_add_data_collection_csvs(collection, config_dir, github_branch=None):
         csv_path = os.path.join(config_dir, csv_name)
         url = f"{CONFIG_URL}collection/{collection}/{csv_name}"
         try:
-            urllib.request.urlretrieve(url, csv_path)
+            _retrieve(url, csv_path)
             logger.info(f"Downloaded {csv_name} from {url} to {csv_path}")
         except HTTPError as e:
             logger.warning(f"Failed to retrieve {csv_name}: {e}")
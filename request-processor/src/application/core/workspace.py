@@ -0,0 +1,202 @@
+"""
+Per request scratch workspaces for workflow runs.
+
+Each task gets its own root directory holding the resource, pipeline CSVs and
+workflow outputs, so the whole run can be removed with a single rmtree. Small
+and medium requests use a RAM backed directory (tmpfs) to avoid the volume
+I/O, large inputs are moved to disk before the workflow starts. Inputs
+fetched from a URL of unknown size are written to disk, and moved into memory
+once their size shows they fit.
+
+tmpfs pages count against the memory of the container, and the requests of a
+worker run concurrently, so memory workspaces reserve their expected size from
+WORKSPACE_MEMORY_BUDGET_MB when fitted and release it when removed. A workflow
+which still runs out of space is moved to disk and run again.
+"""
+import errno
+import json
+import os
+import shutil
+import threading
+
+from application.configurations import config
+from application.configurations.config import Directories
+from application.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+MB = 1024 * 1024
+MEMORY = "memory"
+DISK = "disk"
+CUSTOM = "custom"
+
+# Bytes of the memory budget reserved by each request of this process
+_reserved = {}
+_reserved_lock = threading.Lock()
+
+
+def _directory_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
+
+
+def _memory_available(required_bytes=0):
+    """True if the RAM backed directory exists and can hold required_bytes."""
+    if config.WORKSPACE_BACKEND != MEMORY:
+        return False
+    memory_dir = config.WORKSPACE_MEMORY_DIR.rstrip(os.sep)
+    mount = memory_dir if os.path.isdir(memory_dir) else os.path.dirname(memory_dir)
+    if not (os.path.isdir(mount) and os.access(mount, os.W_OK)):
+        return False
+    limit = config.WORKSPACE_MEMORY_MAX_MB * MB
+    return required_bytes <= limit and required_bytes < shutil.disk_usage(mount).free
+
+
+def _reserve(request_id, required_bytes):
+    """
+    Reserve required_bytes of the memory budget for request_id, in place of
+    any earlier reservation. False, with nothing reserved, if they don't fit.
+    """
+    with _reserved_lock:
+        others = sum(
+            reserved for key, reserved in _reserved.items() if key != request_id
+        )
+        budget = config.WORKSPACE_MEMORY_BUDGET_MB * MB
+        if others + required_bytes > budget or not _memory_available(required_bytes):
+            _reserved.pop(request_id, None)
+            return False
+        _reserved[request_id] = required_bytes
+        return True
+
+
+def _release(request_id):
+    with _reserved_lock:
+        _reserved.pop(request_id, None)
+
+
+def out_of_space(error):
+    """True if error is a write failing because the workspace is full."""
+    return isinstance(error, OSError) and error.errno == errno.ENOSPC
+
+
+class Workspace:
+    """Directories for a single request on a memory or disk backend."""
+
+    def __init__(self, request_id, backend, directories, root=None):
+        self.request_id = request_id
+        self.backend = backend
+        self.directories = directories
+        self.root = root
+        self.held_on_disk = False
+
+    @classmethod
+    def create(cls, request_id, directories=None):
+        """
+        Create the workspace for request_id. directories is the optional JSON
+        override passed to the tasks (used by tests), in which case the given
+        directories are used as they are.
+        """
+        if directories:
+            return cls(request_id, CUSTOM, _directories_from_json(directories))
+
+        backend = MEMORY if _memory_available() else DISK
+        root = _root(backend, request_id)
+        logger.info(f"Using {backend} workspace {root} for request {request_id}")
+        return cls(request_id, backend, Directories.for_root(root), root)
+
+    def fit(self, input_bytes=None):
+        """
+        Move the workspace to disk if the expected size of the workflow run
+        would exceed the memory limit or what is left of the memory budget, or
+        back to memory if it was only held on disk until its size was known.
+        Defaults to the current input size.
+        """
+        if self.backend == CUSTOM:
+            return
+        if self.backend == DISK and not self.held_on_disk:
+            return
+        if input_bytes is None:
+            input_bytes = _directory_size(self.root)
+        required_bytes = input_bytes * config.WORKSPACE_EXPANSION_FACTOR
+        fits = _reserve(self.request_id, required_bytes)
+        if self.backend == MEMORY and not fits:
+            logger.info(
+                f"Input of {input_bytes} bytes doesn't fit the memory workspace, "
+                f"moving request {self.request_id} to disk"
+            )
+            self._move(DISK)
+        elif self.backend == DISK and fits:
+            logger.info(
+                f"Input of {input_bytes} bytes fits the memory workspace, "
+                f"moving request {self.request_id} to memory"
+            )
+            self._move(MEMORY)
+        self.held_on_disk = False
+
+    def hold_on_disk(self):
+        """
+        Move a memory workspace to disk until fit is given the input size, for
+        inputs which are written before their size is known.
+        """
+        if self.backend == MEMORY:
+            self._move(DISK)
+            self.held_on_disk = True
+
+    def move_to_disk(self):
+        """
+        Move a memory workspace which ran out of space to disk, returning its
+        directories, or None if it isn't in memory.
+        """
+        if self.backend != MEMORY:
+            return None
+        logger.warning(
+            f"Memory workspace full, moving request {self.request_id} to disk"
+        )
+        self._move(DISK)
+        return self.directories
+
+    def _move(self, backend):
+        root = _root(backend, self.request_id)
+        if os.path.exists(self.root):
+            os.makedirs(os.path.dirname(root), exist_ok=True)
+            shutil.move(self.root, root)
+        if backend == DISK:
+            _release(self.request_id)
+        self.backend = backend
+        self.root = root
+        self.directories = Directories.for_root(root)
+
+    def clean_up(self):
+        if self.root:
+            shutil.rmtree(self.root, ignore_errors=True)
+        _release(self.request_id)
+
+
+def _root(backend, request_id):
+    base = (
+        config.WORKSPACE_MEMORY_DIR if backend == MEMORY else config.WORKSPACE_DISK_DIR
+    )
+    return os.path.join(base, str(request_id))
+
+
+def _directories_from_json(directories):
+    data_dict = json.loads(directories)
+    # Create an instance of the Directories class
+    instance = Directories()
+    # Update attribute values based on the dictionary
+    for key, value in data_dict.items():
+        setattr(instance, key, value)
+    return instance
+
+
+def remove_workspace(request_id):
+    """Remove any workspace left for request_id, on either backend."""
+    for backend in (MEMORY, DISK):
+        shutil.rmtree(_root(backend, request_id), ignore_errors=True)
+    _release(request_id)
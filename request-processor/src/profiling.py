@@ -0,0 +1,77 @@
+"""
+Opt-in profiling of tasks with cProfile.
+
+A task is profiled when the api sent it with "profile" set, which needs the
+admin token, or when it is sampled at PROFILE_SAMPLE_RATE. The profile is saved
+in the request_profile table next to the request, in the pstats format along
+with a text summary of the slowest calls, and is listed and downloaded from the
+api's /admin/profiles endpoints.
+
+cProfile sees every greenlet on the worker's thread, so profiles only show a
+single task when the worker runs with a concurrency of 1, the default.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import time
+
+import database
+from application.configurations.config import (
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SUMMARY_LINES,
+)
+from application.logging.logger import get_logger
+from request_model import models
+
+logger = get_logger(__name__)
+
+_profiles = {}
+
+
+def should_profile(request):
+    return bool(request.get("profile")) or random.random() < PROFILE_SAMPLE_RATE
+
+
+def task_started(task_id, request):
+    if not should_profile(request):
+        return
+    profiler = cProfile.Profile()
+    _profiles[task_id] = (profiler, time.monotonic())
+    profiler.enable()
+
+
+def task_finished(task_id, request_id):
+    profiler, started = _profiles.pop(task_id, (None, None))
+    if profiler is None:
+        return
+    profiler.disable()
+    seconds = time.monotonic() - started
+    try:
+        save_profile(request_id, profiler, seconds)
+    except Exception as e:
+        logger.warning(f"Could not save profile for request {request_id}: {e}")
+
+
+def summary(profiler, lines=PROFILE_SUMMARY_LINES):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(lines)
+    return stream.getvalue()
+
+
+def save_profile(request_id, profiler, seconds):
+    profiler.create_stats()
+    # As written by pstats.Stats.dump_stats, before pstats.Stats takes the stats
+    data = marshal.dumps(profiler.stats)
+    profile = models.RequestProfile(
+        request_id=request_id,
+        seconds=seconds,
+        summary=summary(profiler),
+        data=data,
+    )
+    db_session = database.session_maker()
+    with db_session() as session:
+        session.add(profile)
+        session.commit()
+    logger.info(f"Saved {seconds:.1f}s profile for request {request_id}")
@@ -17,12 +17,18 @@ thread usage and time to transfer.
 # snippet-start:[S3.Python.s3_file_transfer.complete]
 import sys
 import threading
+import time
 
-import boto3
 from boto3.s3.transfer import TransferConfig
 
+from task_interface import aws_clients
+
 MB = 1024 * 1024
-s3 = boto3.resource("s3")
+
+
+def s3():
+    """The shared S3 client, created on first use rather than at import."""
+    return aws_clients.client("s3")
 
 
 class TransferCallback:
@@ -72,8 +78,8 @@ def upload_with_default_configuration(
     configuration.
     """
     transfer_callback = TransferCallback(file_size_mb)
-    s3.Bucket(bucket_name).upload_file(
-        local_file_path, object_key, Callback=transfer_callback
+    s3().upload_file(
+        local_file_path, bucket_name, object_key, Callback=transfer_callback
     )
     return transfer_callback.thread_info
 
@@ -96,8 +102,9 @@ def upload_with_chunksize_and_meta(
 
     config = TransferConfig(multipart_chunksize=1 * MB)
     extra_args = {"Metadata": metadata} if metadata else None
-    s3.Bucket(bucket_name).upload_file(
+    s3().upload_file(
         local_file_path,
+        bucket_name,
         object_key,
         Config=config,
         ExtraArgs=extra_args,
@@ -117,8 +124,12 @@ def upload_with_high_threshold(local_file_path, bucket_name, object_key, file_si
     """
     transfer_callback = TransferCallback(file_size_mb)
     config = TransferConfig(multipart_threshold=file_size_mb * 2 * MB)
-    s3.Bucket(bucket_name).upload_file(
-        local_file_path, object_key, Config=config, Callback=transfer_callback
+    s3().upload_file(
+        local_file_path,
+        bucket_name,
+        object_key,
+        Config=config,
+        Callback=transfer_callback,
     )
     return transfer_callback.thread_info
 
@@ -139,8 +150,12 @@ def upload_with_sse(
         extra_args = {"SSECustomerAlgorithm": "AES256", "SSECustomerKey": sse_key}
     else:
         extra_args = None
-    s3.Bucket(bucket_name).upload_file(
-        local_file_path, object_key, ExtraArgs=extra_args, Callback=transfer_callback
+    s3().upload_file(
+        local_file_path,
+        bucket_name,
+        object_key,
+        ExtraArgs=extra_args,
+        Callback=transfer_callback,
     )
     return transfer_callback.thread_info
 
@@ -153,8 +168,8 @@ def download_with_default_configuration(
     default configuration.
     """
     transfer_callback = TransferCallback(file_size_mb)
-    s3.Bucket(bucket_name).Object(object_key).download_file(
-        download_file_path, Callback=transfer_callback
+    s3().download_file(
+        bucket_name, object_key, download_file_path, Callback=transfer_callback
     )
     return transfer_callback.thread_info
 
@@ -168,8 +183,12 @@ def download_with_single_thread(
     """
     transfer_callback = TransferCallback(file_size_mb)
     config = TransferConfig(use_threads=False)
-    s3.Bucket(bucket_name).Object(object_key).download_file(
-        download_file_path, Config=config, Callback=transfer_callback
+    s3().download_file(
+        bucket_name,
+        object_key,
+        download_file_path,
+        Config=config,
+        Callback=transfer_callback,
     )
     return transfer_callback.thread_info
 
@@ -187,8 +206,12 @@ def download_with_high_threshold(
     """
     transfer_callback = TransferCallback(file_size_mb)
     config = TransferConfig(multipart_threshold=file_size_mb * 2 * MB)
-    s3.Bucket(bucket_name).Object(object_key).download_file(
-        download_file_path, Config=config, Callback=transfer_callback
+    s3().download_file(
+        bucket_name,
+        object_key,
+        download_file_path,
+        Config=config,
+        Callback=transfer_callback,
     )
     return transfer_callback.thread_info
 
@@ -210,10 +233,103 @@ def download_with_sse(
         extra_args = {"SSECustomerAlgorithm": "AES256", "SSECustomerKey": sse_key}
     else:
         extra_args = None
-    s3.Bucket(bucket_name).Object(object_key).download_file(
-        download_file_path, ExtraArgs=extra_args, Callback=transfer_callback
+    s3().download_file(
+        bucket_name,
+        object_key,
+        download_file_path,
+        ExtraArgs=extra_args,
+        Callback=transfer_callback,
     )
     return transfer_callback.thread_info
 
 
 # snippet-end:[S3.Python.s3_file_transfer.complete]
+
+
+class ObjectTooLargeError(Exception):
+    """The object is over the size ceiling, so is not downloaded."""
+
+    def __init__(self, object_key, size, max_size):
+        super().__init__(
+            f"{object_key} is {size} bytes, over the {max_size} byte download limit"
+        )
+        self.size = size
+        self.max_size = max_size
+
+
+class TransferStats:
+    """
+    Bytes transferred per thread, without the lock and stdout writes of
+    TransferCallback. Each thread only updates its own entry.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.thread_info = {}
+        self.seconds = 0.0
+
+    def __call__(self, bytes_transferred):
+        ident = threading.get_ident()
+        self.thread_info[ident] = self.thread_info.get(ident, 0) + bytes_transferred
+
+    @property
+    def transferred(self):
+        return sum(self.thread_info.values())
+
+    @property
+    def throughput_mb_per_second(self):
+        return self.transferred / MB / self.seconds if self.seconds else 0.0
+
+
+def object_size(bucket_name, object_key):
+    """Size in bytes of an object, from a HEAD request."""
+    return s3().head_object(Bucket=bucket_name, Key=object_key)["ContentLength"]
+
+
+def sized_transfer_config(size, max_concurrency=10, min_chunk_size=8 * MB):
+    """
+    A TransferConfig fitted to the object size. Small objects are fetched with
+    a single GET, larger ones in parts of at least min_chunk_size with up to
+    max_concurrency threads, and chunks grow so very large objects stay
+    within about 10 parts per thread.
+    """
+    if size <= min_chunk_size:
+        return TransferConfig(multipart_threshold=min_chunk_size, use_threads=False)
+    chunk_size = max(min_chunk_size, -(-size // (max_concurrency * 10 * MB)) * MB)
+    parts = -(-size // chunk_size)
+    return TransferConfig(
+        multipart_threshold=min_chunk_size,
+        multipart_chunksize=chunk_size,
+        max_concurrency=min(max_concurrency, parts),
+    )
+
+
+def download_sized(
+    bucket_name,
+    object_key,
+    download_file_path,
+    max_size=None,
+    max_concurrency=10,
+    size=None,
+):
+    """
+    Download an object with the chunk size and concurrency picked from its
+    size. The size is read with a HEAD request unless given, and objects over
+    max_size raise ObjectTooLargeError before anything is downloaded.
+    """
+    if size is None:
+        size = object_size(bucket_name, object_key)
+    if max_size is not None and size > max_size:
+        raise ObjectTooLargeError(object_key, size, max_size)
+
+    stats = TransferStats(size)
+    start = time.perf_counter()
+    s3().download_file(
+        bucket_name,
+        object_key,
+        download_file_path,
+        Config=sized_transfer_config(size, max_concurrency),
+        Callback=stats,
+    )
+    stats.seconds = time.perf_counter() - start
+    return stats
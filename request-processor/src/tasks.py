@@ -3,12 +3,22 @@ from typing import Dict
 
 import sentry_sdk
 from celery.utils.log import get_task_logger
-from celery.signals import task_prerun, task_success, task_failure, celeryd_init
+from sqlalchemy import insert
+from celery.signals import (
+    task_prerun,
+    task_success,
+    task_failure,
+    celeryd_init,
+    worker_shutdown,
+)
 import request_model.schemas as schemas
 import request_model.models as models
 import s3_transfer_manager
 import crud
 import database
+import profiling
+import worker_health
+from task_interface import tracing
 from task_interface.base_tasks import (
     celery,
     CheckDataFileTask,
@@ -16,19 +26,28 @@ from task_interface.base_tasks import (
     AddDataTask,
 )
 import json
-from application.core import workflow
-from application.configurations.config import Directories
+from application.core import pipeline, workflow
+from application.configurations.config import (
+    Directories,
+    RESPONSE_DETAILS_BATCH_ROWS,
+    S3_DOWNLOAD_MAX_CONCURRENCY,
+    S3_DOWNLOAD_MAX_MB,
+)
+from application.core.workspace import MEMORY, Workspace, remove_workspace
+from application.core.progress import ProgressReporter, FETCHING, PERSISTING
+from application.core.stage_metrics import FETCH, PERSIST, StageMetrics
+from application.core import plugin_selection, rules
+from application.core.fetch_cache import fetch_cache
 import application.core.utils as utils
 from application.exceptions.customExceptions import (
     CustomException,
     create_generic_error_log,
 )
+from functools import partial
 from pathlib import Path
 from digital_land.collect import Collector, FetchStatus
 
 logger = get_task_logger(__name__)
-# Threshold for s3_transfer_manager to automatically use multipart download
-max_file_size_mb = 30
 
 
 # Remove resource directories created by Collector, necessary if exception occurs, workflow will not clean up
@@ -56,6 +75,9 @@ def clean_up_request_files(request_id):
     except Exception as e:
         logger.error(f"Failed to clean up resource directory {resource_dir}: {e}")
 
+    # Per request workspaces are removed in one go
+    remove_workspace(request_id)
+
 
 @celery.task(base=CheckDataFileTask, name=CheckDataFileTask.name)
 def check_datafile(request: Dict, directories=None):
@@ -66,22 +88,12 @@ def check_datafile(request: Dict, directories=None):
     request_schema = schemas.Request.model_validate(request)
     request_data = request_schema.params
     if not request_schema.status == "COMPLETE":
-        if not directories:
-            directories = Directories
-        elif directories:
-            data_dict = json.loads(directories)
-            # Create an instance of the Directories class
-            directories = Directories()
-            # Update attribute values based on the dictionary
-            for key, value in data_dict.items():
-                setattr(directories, key, value)
-
-        tmp_dir = os.path.join(
-            directories.COLLECTION_DIR, "resource", request_schema.id
-        )
-        # Ensure tmp_dir exists, create it if it doesn't
-        Path(tmp_dir).mkdir(parents=True, exist_ok=True)
-        fileName = handle_check_file(request_schema, request_data, tmp_dir)
+        workspace = Workspace.create(request_schema.id, directories)
+        progress = _progress_reporter(request_schema.id)
+        stages = StageMetrics("check_file", request_data.dataset)
+        progress(FETCHING)
+        fileName = handle_check_file(request_schema, request_data, workspace, stages)
+        directories = workspace.directories
 
         log = {
             "message": "No file processed",
@@ -91,21 +103,36 @@ def check_datafile(request: Dict, directories=None):
 
         if fileName:
             logger.info(f"Running workflow for file: {fileName}")
-            response = workflow.run_workflow(
-                fileName,
-                request_schema.id,
-                request_data.collection,
-                request_data.dataset,
-                "",
-                request_data.geom_type if hasattr(request_data, "geom_type") else "",
-                (
-                    request_data.column_mapping
-                    if hasattr(request_data, "column_mapping")
-                    else {}
-                ),
-                directories,
-            )
-            save_response_to_db(request_schema.id, response)
+            try:
+                response = workflow.run_workflow(
+                    fileName,
+                    request_schema.id,
+                    request_data.collection,
+                    request_data.dataset,
+                    "",
+                    (
+                        request_data.geom_type
+                        if hasattr(request_data, "geom_type")
+                        else ""
+                    ),
+                    (
+                        request_data.column_mapping
+                        if hasattr(request_data, "column_mapping")
+                        else {}
+                    ),
+                    directories,
+                    progress=progress,
+                    stages=stages,
+                    stream_outputs=True,
+                    move_to_disk=workspace.move_to_disk,
+                )
+                progress(PERSISTING)
+                with stages.stage(PERSIST):
+                    save_response_to_db(request_schema.id, response, progress)
+            finally:
+                workflow.clean_up_outputs(
+                    request_schema.id, request_data.dataset, workspace.directories
+                )
             logger.info(
                 f"Workflow completed and response saved for request_id={request_schema.id}"
             )
@@ -118,28 +145,74 @@ def check_datafile(request: Dict, directories=None):
     return _get_request(request_schema.id)
 
 
-def handle_check_file(request_schema, request_data, tmp_dir):
+def handle_check_file(request_schema, request_data, workspace, stages=None):
+    """
+    Download the uploaded file into the workspace. The size is read first, so
+    files over S3_DOWNLOAD_MAX_MB are refused and large ones go straight to a
+    disk workspace. Returns the file name.
+    """
     fileName = request_data.uploaded_filename
+    bucket_name = os.environ["REQUEST_FILES_BUCKET_NAME"]
     try:
-        logger.info(f"Attempting to download file {fileName} from S3 to {tmp_dir}")
-        s3_transfer_manager.download_with_default_configuration(
-            os.environ["REQUEST_FILES_BUCKET_NAME"],
-            request_data.uploaded_filename,
-            f"{tmp_dir}/{request_data.uploaded_filename}",
-            max_file_size_mb,
+        size = s3_transfer_manager.object_size(bucket_name, fileName)
+    except Exception as e:
+        _raise_check_file_error(request_schema.id, e)
+
+    if size > S3_DOWNLOAD_MAX_MB * s3_transfer_manager.MB:
+        _raise_check_file_error(
+            request_schema.id,
+            s3_transfer_manager.ObjectTooLargeError(
+                fileName, size, S3_DOWNLOAD_MAX_MB * s3_transfer_manager.MB
+            ),
+            f"The uploaded file is larger than the {S3_DOWNLOAD_MAX_MB}MB limit",
         )
-        logger.info(f"File {fileName} downloaded successfully.")
+
+    workspace.fit(size)
+    tmp_dir = os.path.join(
+        workspace.directories.COLLECTION_DIR, "resource", request_schema.id
+    )
+    Path(tmp_dir).mkdir(parents=True, exist_ok=True)
+    path = f"{tmp_dir}/{fileName}"
+    stages = stages or StageMetrics("check_file")
+    try:
+        logger.info(f"Attempting to download file {fileName} ({size} bytes) to {path}")
+        with stages.stage(FETCH) as record:
+            stats = s3_transfer_manager.download_sized(
+                bucket_name,
+                fileName,
+                path,
+                max_concurrency=S3_DOWNLOAD_MAX_CONCURRENCY,
+                size=size,
+            )
+            record.add(bytes=size)
     except Exception as e:
-        logger.error(str(e))
-        log = {}
-        log["message"] = "The uploaded file not found in S3 bucket"
-        log["status"] = ""
-        log["exception_type"] = type(e).__name__
-        save_response_to_db(request_schema.id, log)
-        raise CustomException(log)
+        _raise_check_file_error(request_schema.id, e)
+    logger.info(
+        f"File {fileName} downloaded in {stats.seconds:.2f}s "
+        f"({stats.throughput_mb_per_second:.1f}MB/s, {len(stats.thread_info)} threads)"
+    )
+    sentry_sdk.metrics.distribution("async.s3_download.bytes", size, unit="byte")
+    sentry_sdk.metrics.distribution(
+        "async.s3_download.duration", stats.seconds, unit="second"
+    )
+    sentry_sdk.metrics.distribution(
+        "async.s3_download.throughput", stats.throughput_mb_per_second
+    )
     return fileName
 
 
+def _raise_check_file_error(
+    request_id, exception, message="The uploaded file not found in S3 bucket"
+):
+    logger.error(str(exception))
+    log = {}
+    log["message"] = message
+    log["status"] = ""
+    log["exception_type"] = type(exception).__name__
+    save_response_to_db(request_id, log)
+    raise CustomException(log)
+
+
 @celery.task(base=CheckDataUrlTask, name=CheckDataUrlTask.name)
 def check_dataurl(request: Dict, directories=None):  # noqa
     logger.info(
@@ -153,23 +226,24 @@ def check_dataurl(request: Dict, directories=None):  # noqa
         logger.info(f"Request {request_schema.id} already COMPLETE")
         return _get_request(request_schema.id)
 
-    if not directories:
-        directories = Directories
-    elif directories:
-        data_dict = json.loads(directories)
-        directories = Directories()
-        for key, value in data_dict.items():
-            setattr(directories, key, value)
+    workspace = Workspace.create(request_schema.id, directories)
+    _fit_workspace_to_url(workspace, request_data.url)
+    directories = workspace.directories
 
     resource_dir = os.path.join(
         directories.COLLECTION_DIR, "resource", request_schema.id
     )
 
     file_name = None
+    progress = _progress_reporter(request_schema.id)
+    stages = StageMetrics("check_url", request_data.dataset)
+    progress(FETCHING)
 
     # IMPORTANT: 'message' set in error_log to be user friendly = Map known exception types to user-friendly messages
     try:
-        file_name, fetch_log = _fetch_resource(resource_dir, request_data.url)
+        file_name, fetch_log = _timed_fetch_resource(
+            stages, resource_dir, request_data.url
+        )
         logger.info(f"Fetched resource: file_name={file_name}")
 
     except CustomException as e:
@@ -197,6 +271,8 @@ def check_dataurl(request: Dict, directories=None):  # noqa
         return _get_request(request_schema.id)
 
     if file_name:
+        workspace.fit()
+        directories = workspace.directories
         try:
             response = workflow.run_workflow(
                 file_name,
@@ -207,10 +283,16 @@ def check_dataurl(request: Dict, directories=None):  # noqa
                 getattr(request_data, "geom_type", ""),
                 getattr(request_data, "column_mapping", {}),
                 directories,
+                progress=progress,
+                stages=stages,
+                stream_outputs=True,
+                move_to_disk=workspace.move_to_disk,
             )
             if "plugin" in fetch_log:
                 response["plugin"] = fetch_log["plugin"]
-            save_response_to_db(request_schema.id, response)
+            progress(PERSISTING)
+            with stages.stage(PERSIST):
+                save_response_to_db(request_schema.id, response, progress)
             sentry_sdk.metrics.count("async.url_submission.success", 1)
         except Exception as e:
             logger.error(f"Workflow failed: {e}")
@@ -227,6 +309,10 @@ def check_dataurl(request: Dict, directories=None):  # noqa
                 request_schema.id,
             )
             save_response_to_db(request_schema.id, error_log)
+        finally:
+            workflow.clean_up_outputs(
+                request_schema.id, request_data.dataset, workspace.directories
+            )
     else:
         logger.info("File could not be fetched from collector")
         error_log = create_generic_error_log(
@@ -252,18 +338,19 @@ def add_data_task(request: Dict, directories=None):
     request_data = request_schema.params
     logger.info(f"request_payload_params: {json.dumps(request_data, default=str)}")
     if not request_schema.status == "COMPLETE":
-        if not directories:
-            directories = Directories
-        else:
-            data_dict = json.loads(directories)
-            directories = Directories()
-            for key, value in data_dict.items():
-                setattr(directories, key, value)
+        workspace = Workspace.create(request_schema.id, directories)
+        _fit_workspace_to_url(workspace, request_data.url)
+        directories = workspace.directories
 
         resource_dir = os.path.join(
             directories.COLLECTION_DIR, "resource", request_schema.id
         )
-        file_name, log = _fetch_resource(resource_dir, request_data.url)
+        progress = _progress_reporter(request_schema.id)
+        stages = StageMetrics("add_data", request_data.dataset)
+        progress(FETCHING)
+        file_name, log = _timed_fetch_resource(stages, resource_dir, request_data.url)
+        workspace.fit()
+        directories = workspace.directories
         # Auto detect plugin needs to update request_data.plugin for downstream processing
         if "plugin" in log:
             request_data.plugin = log["plugin"]
@@ -286,11 +373,15 @@ def add_data_task(request: Dict, directories=None):
                 geom_type=getattr(request_data, "geom_type", ""),
                 column_mapping=getattr(request_data, "column_mapping", {}),
                 github_branch=request_data.github_branch,
+                progress=progress,
+                stages=stages,
             )
             if "plugin" in log:
                 response["plugin"] = log["plugin"]
             logger.info(f"response is : {response}")
-            save_response_to_db(request_schema.id, response)
+            progress(PERSISTING)
+            with stages.stage(PERSIST):
+                save_response_to_db(request_schema.id, response)
         else:
             save_response_to_db(request_schema.id, log)
             raise CustomException(log)
@@ -299,14 +390,20 @@ def add_data_task(request: Dict, directories=None):
 
 @task_prerun.connect
 def before_task(task_id, task, args, **kwargs):
+    worker_health.task_started(task_id, task.name)
+    tracing.task_started(task_id, task)
     request_id = args[0]["id"]
     logger.debug(f"Set status to PROCESSING for request {request_id}")
     _update_request_status(request_id, "PROCESSING")
+    profiling.task_started(task_id, args[0])
 
 
 @task_success.connect
 def after_task_success(sender, result, **kwargs):
+    worker_health.task_finished(sender.request.id, "success")
+    tracing.task_finished(sender.request.id)
     request_id = sender.request.args[0]["id"]
+    profiling.task_finished(sender.request.id, request_id)
     logger.debug(f"Set status to PROCESSING for request {request_id}")
     _update_request_status(request_id, "COMPLETE")
     clean_up_request_files(request_id)
@@ -317,12 +414,38 @@ def after_task_success(sender, result, **kwargs):
 
 @task_failure.connect
 def after_task_failure(task_id, exception, traceback, einfo, args, **kwargs):
+    worker_health.task_finished(task_id, "failure")
+    tracing.task_finished(task_id, exception)
     request_id = args[0]["id"]
+    profiling.task_finished(task_id, request_id)
     logger.debug(f"Set status to FAILED for request {request_id}")
     _update_request_status(request_id, "FAILED")
     clean_up_request_files(request_id)
 
 
+@celeryd_init.connect
+def load_error_summary_rules(**_kwargs):
+    rules.load()
+
+
+@celeryd_init.connect
+def start_worker_health(**_kwargs):
+    try:
+        worker_health.start()
+    except OSError as e:
+        logger.warning(f"Worker health server not started: {e}")
+
+
+@celeryd_init.connect
+def init_tracing(**_kwargs):
+    tracing.init("request-processor")
+
+
+@worker_shutdown.connect
+def shutdown_transform_pool(**_kwargs):
+    pipeline.shutdown_transform_pool()
+
+
 @celeryd_init.connect
 def init_sentry(**_kwargs):
     if os.environ.get("SENTRY_ENABLED", "false").lower() == "true":
@@ -343,10 +466,28 @@ def _update_request_status(request_id, status):
     with db_session() as session:
         model = crud.get_request(session, request_id)
         model.status = status
+        if status in ("COMPLETE", "FAILED"):
+            # Progress is only shown for requests in flight
+            model.progress = None
         session.commit()
         session.flush()
 
 
+def _update_request_progress(request_id, progress):
+    worker_health.beat()
+    db_session = database.session_maker()
+    with db_session() as session:
+        model = crud.get_request(session, request_id)
+        if model is None:
+            return
+        model.progress = progress
+        session.commit()
+
+
+def _progress_reporter(request_id):
+    return ProgressReporter(partial(_update_request_progress, request_id))
+
+
 def _get_request(request_id):
     db_session = database.session_maker()
     with db_session() as session:
@@ -406,12 +547,19 @@ def _get_response(request_id):
     return result
 
 
-def save_response_to_db(request_id, response_data):
+def _stage_summary(response_data):
+    if "stage-metrics" in response_data:
+        return {"stage-metrics": response_data["stage-metrics"]}
+    return {}
+
+
+def save_response_to_db(request_id, response_data, progress=None):
     """Currently handles three types of response_data:
     1. Full check data workflow response with 'converted-csv', 'issue-log', etc.
     2. Full add data workflow pipeline summary response with 'pipeline-summary'.
     3. Error log with 'message'.
     Saves appropriately to Response and ResponseDetails tables.
+    A check response reports the rows saved to progress as it goes.
     """
     logger.info(f"save_response_to_db started for request_id: {request_id}")
     db_session = database.session_maker()
@@ -431,6 +579,7 @@ def save_response_to_db(request_id, response_data):
                         "error-summary": response_data.get("error-summary", {}),
                         "plugin": response_data.get("plugin", None),
                     }
+                    data.update(_stage_summary(response_data))
                     # Create a new Response instance
                     new_response = models.Response(request_id=request_id, data=data)
 
@@ -438,40 +587,9 @@ def save_response_to_db(request_id, response_data):
                     session.add(new_response)
                     session.flush()  # Flush to get the response ID
 
-                    # Initialize line number
-                    entry_number = 1
-                    converted_row_data = response_data.get("converted-csv")
-                    issue_log_data = response_data.get("issue-log")
-                    transformed_data = response_data.get("transformed-csv")
-                    # Save converted_row_data and issue_log_data in ResponseDetails
-                    for converted_row in converted_row_data:
-                        # Collect issue logs corresponding to the current line number
-                        current_issue_logs = [
-                            issue_log
-                            for issue_log in issue_log_data
-                            if issue_log.get("entry-number") == str(entry_number)
-                        ]
-                        transformed_csv = [
-                            transformed
-                            for transformed in transformed_data
-                            if transformed.get("entry-number") == str(entry_number)
-                        ]
-
-                        new_response_detail = models.ResponseDetails(
-                            response_id=new_response.id,
-                            detail={
-                                "converted_row": converted_row,
-                                "issue_logs": current_issue_logs,
-                                "entry_number": entry_number,
-                                "transformed_row": transformed_csv,
-                            },
-                        )
-                        session.add(new_response_detail)
-
-                        # Increment line number for the next iteration
-                        entry_number += 1
-
-                        session.add(new_response_detail)
+                    _save_check_details(
+                        session, new_response.id, response_data, progress
+                    )
 
                     # Commit the changes to the database
                     session.commit()
@@ -482,6 +600,7 @@ def save_response_to_db(request_id, response_data):
                         "endpoint-summary": response_data.get("endpoint-summary"),
                         "source-summary": response_data.get("source-summary"),
                     }
+                    data.update(_stage_summary(response_data))
                     new_response = models.Response(request_id=request_id, data=data)
                     session.add(new_response)
                     session.flush()
@@ -526,6 +645,112 @@ def save_response_to_db(request_id, response_data):
             raise e
 
 
+def _save_check_details(session, response_id, response_data, progress=None):
+    """
+    Save a ResponseDetails row for each converted row, with its issues and
+    transformed rows. These may be streamed from the workflow outputs, so
+    details are inserted RESPONSE_DETAILS_BATCH_ROWS at a time and the issues
+    and transformed rows, both in entry-number order, are read alongside.
+    """
+    converted_rows = response_data.get("converted-csv")
+    rows_total = len(converted_rows)
+    progress = progress or _no_progress
+    progress(PERSISTING, 0, rows_total)
+    issue_logs = _EntryRows(response_data.get("issue-log"))
+    transformed = _EntryRows(response_data.get("transformed-csv"))
+
+    details = []
+    for entry_number, converted_row in enumerate(converted_rows, start=1):
+        details.append(
+            {
+                "response_id": response_id,
+                "detail": {
+                    "converted_row": converted_row,
+                    "issue_logs": issue_logs.take(entry_number),
+                    "entry_number": entry_number,
+                    "transformed_row": transformed.take(entry_number),
+                },
+            }
+        )
+        if len(details) >= RESPONSE_DETAILS_BATCH_ROWS:
+            session.execute(insert(models.ResponseDetails), details)
+            details = []
+            progress(PERSISTING, entry_number, rows_total)
+    if details:
+        session.execute(insert(models.ResponseDetails), details)
+    progress(PERSISTING, rows_total, rows_total)
+
+
+def _no_progress(stage, rows_processed=None, rows_total=None):
+    pass
+
+
+class _EntryRows:
+    """Rows in entry-number order, taken an entry at a time."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._next = next(self._rows, None)
+
+    def take(self, entry_number):
+        taken = []
+        while self._next is not None:
+            value = str(self._next.get("entry-number", ""))
+            if value.isdigit() and int(value) > entry_number:
+                break
+            if value == str(entry_number):
+                taken.append(self._next)
+            self._next = next(self._rows, None)
+        return taken
+
+
+def _fit_workspace_to_url(workspace, url):
+    """
+    Fit the workspace to url before it is fetched, as the fetch writes into it.
+    Plugins fetch from APIs and many servers don't give a Content-Length, so
+    without a size the fetch is written to disk and the fit after it moves the
+    workspace back into memory if it fits.
+    """
+    if workspace.backend != MEMORY:
+        return
+    size = None
+    if plugin_selection.classify_url(url) is None:
+        size = utils.content_length(url)
+    if size is None:
+        workspace.hold_on_disk()
+    else:
+        workspace.fit(size)
+
+
+def _timed_fetch_resource(stages, resource_dir, url):
+    """_fetch_resource as the fetch stage, labelled with the plugin that worked."""
+    with stages.stage(FETCH) as record:
+        file_name, log = _fetch_resource(resource_dir, url)
+        stages.plugin = log.get("plugin")
+        path = os.path.join(resource_dir, file_name or "")
+        if file_name and os.path.isfile(path):
+            record.add(bytes=os.path.getsize(path))
+    return file_name, log
+
+
+def _fetched_resource(collector, url, plugin, log):
+    """File name of a successful fetch, which is kept in the fetch cache."""
+    try:
+        file_name = next(reversed(list(collector.resource_dir.iterdir()))).name
+    except StopIteration:
+        raise CustomException(
+            {
+                "message": "No endpoint files found after successful fetch.",
+                **log,
+            }
+        )
+    try:
+        fetch_cache.put(url, plugin, collector.resource_dir / file_name, log)
+    except OSError as e:
+        logger.warning(f"Could not cache resource for {url}: {e}")
+    return file_name, log
+
+
 def _fetch_resource(resource_dir, url):
     """
     Fetches resource files using Collector, trying different plugins.
@@ -533,29 +758,38 @@ def _fetch_resource(resource_dir, url):
     """
     Path(resource_dir).mkdir(parents=True, exist_ok=True)
     collector = Collector(resource_dir=Path(resource_dir))
-    plugins = [None, "arcgis", "wfs"]
+    # Most likely plugin first, from the URL or what last worked for the host
+    plugins = plugin_selection.plugin_order(url)
     content_type = None
-
-    for plugin in plugins:
-        fetch_status, log = collector.fetch(url, plugin=plugin, refill_todays_logs=True)
+    tried_plain = False
+
+    while plugins:
+        plugin = plugins.pop(0)
+        cached = fetch_cache.get(url, plugin, resource_dir)
+        if cached:
+            plugin_selection.record_success(url, plugin)
+            return cached
+        with tracing.client_call(
+            "GET", **{"url.full": url, "plugin": plugin or "none"}
+        ):
+            fetch_status, log = collector.fetch(
+                url, plugin=plugin, refill_todays_logs=True
+            )
         log["fetch-status"] = fetch_status.name
         if plugin is None:
+            tried_plain = True
             content_type = log.get("response-headers", {}).get("content-type")
         if fetch_status == FetchStatus.OK:
             log["plugin"] = plugin
-            try:
-                file_name = next(reversed(list(collector.resource_dir.iterdir()))).name
-                return file_name, log
-            except StopIteration:
-                raise CustomException(
-                    {
-                        "message": "No endpoint files found after successful fetch.",
-                        **log,
-                    }
-                )
+            plugin_selection.record_success(url, plugin)
+            return _fetched_resource(collector, url, plugin, log)
         elif log.get("exception") or log.get("status", "").startswith("4"):
             log["plugin"] = plugin  # Save plugin used for arcgis error context
-            break
+            # A guessed plugin failing doesn't rule out fetching a plain file
+            if tried_plain:
+                break
+        elif plugin is None:
+            plugins = plugin_selection.next_plugins(url, plugins, content_type)
 
     # All fetch attempts failed - include content-type if available
     error_detail = {"message": "All fetch attempts failed", **log}
@@ -0,0 +1,205 @@
+"""
+Embedded HTTP server for the worker's health and metrics.
+
+Started from celeryd_init, it serves:
+
+    /health       dependency health, with task and event loop details (JSON)
+    /health/live  whether the process answers at all
+    /metrics      task metrics in the Prometheus text format
+
+Dependencies are probed in the background, so the container healthcheck is a
+single local GET rather than spawning pgrep, the AWS CLI and pg_isready.
+
+The worker runs tasks on an eventlet pool, whose green threads only switch
+when a task yields, so CPU-bound work such as a transform can hold the event
+loop for minutes. The server and probes therefore run in a real OS thread,
+with its own event loop, and keep answering. How long the tasks' event loop
+has been held is only exported as a metric, it doesn't fail the health check.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eventlet import patcher
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import text
+
+import database
+from application.logging.logger import get_logger
+from task_interface import aws_clients
+from task_interface.health import HealthMonitor
+
+logger = get_logger(__name__)
+
+WORKER_HEALTH_HOST = os.environ.get("WORKER_HEALTH_HOST", "0.0.0.0")
+WORKER_HEALTH_PORT = int(os.environ.get("WORKER_HEALTH_PORT", "8080"))
+# A green thread on the tasks' event loop beats this often, the age of its
+# last beat shows how long a task has held the loop
+WORKER_HEARTBEAT_INTERVAL_SECONDS = float(
+    os.environ.get("WORKER_HEARTBEAT_INTERVAL_SECONDS", "5")
+)
+
+# threading is monkey patched by the eventlet pool, the original module starts
+# OS threads
+os_threading = patcher.original("threading")
+
+TASKS = Counter(
+    "worker_tasks_total", "Tasks finished by the worker", ["task", "outcome"]
+)
+TASK_DURATION = Histogram(
+    "worker_task_duration_seconds",
+    "Time taken by tasks",
+    ["task"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+TASKS_ACTIVE = Gauge("worker_tasks_active", "Tasks currently running", ["task"])
+LAST_TASK_HEARTBEAT = Gauge(
+    "worker_last_task_heartbeat_timestamp_seconds",
+    "When a task last started, reported progress or finished",
+)
+EVENT_LOOP_HEARTBEAT_AGE = Gauge(
+    "worker_event_loop_heartbeat_age_seconds",
+    "Time since the tasks' event loop last ran the heartbeat",
+)
+DEPENDENCY_UP = Gauge(
+    "worker_dependency_up", "Whether a dependency was reachable", ["dependency"]
+)
+
+_pool_heartbeat = None
+_task_heartbeat = None
+_task_starts = {}
+_server = None
+
+
+def _probe_db():
+    db = database.session_maker()()
+    try:
+        return len(db.execute(text("SELECT 1")).all()) == 1
+    finally:
+        db.close()
+
+
+def _probe_sqs():
+    aws_clients.client("sqs").get_queue_url(QueueName="celery")
+    return True
+
+
+health_monitor = HealthMonitor({"request-db": _probe_db, "sqs": _probe_sqs})
+
+
+def beat():
+    """Record task activity."""
+    global _task_heartbeat
+    _task_heartbeat = time.time()
+    LAST_TASK_HEARTBEAT.set(_task_heartbeat)
+
+
+def task_started(task_id, task_name):
+    _task_starts[task_id] = (task_name, time.monotonic())
+    TASKS_ACTIVE.labels(task_name).inc()
+    beat()
+
+
+def task_finished(task_id, outcome):
+    task_name, started = _task_starts.pop(task_id, (None, None))
+    if task_name is None:
+        return
+    TASKS_ACTIVE.labels(task_name).dec()
+    TASKS.labels(task_name, outcome).inc()
+    TASK_DURATION.labels(task_name).observe(time.monotonic() - started)
+    beat()
+
+
+def pool_heartbeat_age():
+    """Seconds since the tasks' event loop last beat, None before the first beat."""
+    if _pool_heartbeat is None:
+        return None
+    age = time.monotonic() - _pool_heartbeat
+    EVENT_LOOP_HEARTBEAT_AGE.set(age)
+    return age
+
+
+def health():
+    """Health in the shape the container healthcheck printed, with pool and task details."""
+    results, checked, age = health_monitor.status()
+    for name, healthy in results.items():
+        DEPENDENCY_UP.labels(name).set(1 if healthy else 0)
+    healthy = all(results.values()) and health_monitor.is_fresh(age)
+    return healthy, {
+        "name": "request-processor",
+        "version": os.environ.get("GIT_COMMIT", "unknown"),
+        "dependencies": [
+            {"name": name, "status": "HEALTHY" if up else "UNHEALTHY"}
+            for name, up in results.items()
+        ],
+        "checked": checked.isoformat() if checked else None,
+        "age_seconds": age,
+        "pool": {"heartbeat_age_seconds": pool_heartbeat_age()},
+        "last_task_heartbeat": _task_heartbeat,
+        "tasks_active": len(_task_starts),
+    }
+
+
+class HealthRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            pool_heartbeat_age()
+            self._send(200, generate_latest(), CONTENT_TYPE_LATEST)
+        elif self.path == "/health/live":
+            body = {"alive": True, "heartbeat_age_seconds": pool_heartbeat_age()}
+            self._send_json(200, body)
+        elif self.path == "/health":
+            healthy, body = health()
+            self._send_json(200 if healthy else 500, body)
+        else:
+            self._send_json(404, {"detail": "Not Found"})
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Health checks every few seconds would flood the worker log
+        pass
+
+
+def _heartbeat():
+    global _pool_heartbeat
+    while True:
+        _pool_heartbeat = time.monotonic()
+        time.sleep(WORKER_HEARTBEAT_INTERVAL_SECONDS)
+
+
+def _serve(server):
+    # Started here, the probes run on this OS thread's event loop too
+    health_monitor.start()
+    server.serve_forever()
+
+
+def start(host=WORKER_HEALTH_HOST, port=WORKER_HEALTH_PORT):
+    """Start the heartbeat, dependency probes and HTTP server, once per process."""
+    global _server
+    if _server is not None:
+        return _server
+    # A green thread when the pool is eventlet, so it measures the tasks' loop
+    threading.Thread(target=_heartbeat, name="worker-heartbeat", daemon=True).start()
+    _server = ThreadingHTTPServer((host, port), HealthRequestHandler)
+    os_threading.Thread(
+        target=_serve, args=(_server,), name="worker-health-server", daemon=True
+    ).start()
+    logger.info(f"Worker health server listening on {host}:{port}")
+    return _server
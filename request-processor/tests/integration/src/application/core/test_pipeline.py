@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import pytest
+from digital_land.specification import Specification
+
+from src.application.core.pipeline import assign_entries, fetch_response_data
+from src.application.core.workflow import csv_to_json
+
+
+@pytest.fixture(scope="module")
+def test_data_dir(test_dir):
+    return os.path.realpath(f"{test_dir}/../../../../data")
+
+
+@pytest.fixture(scope="module")
+def bootstrap_dir(test_dir):
+    return os.path.realpath(f"{test_dir}/../../../../../../localstack_bootstrap")
+
+
+def _run_check(
+    directories, request_id, dataset, fixture_path, fetch_pipeline_csvs, assign_first
+):
+    organisation = "local-authority:CTY"
+    resource = "7e9a0e71f3ddfe"
+    resource_dir = os.path.join(directories.COLLECTION_DIR, "resource", request_id)
+    os.makedirs(resource_dir, exist_ok=True)
+    shutil.copy(fixture_path, os.path.join(resource_dir, resource))
+    fetch_pipeline_csvs(dataset, request_id)
+    pipeline_dir = os.path.join(directories.PIPELINE_DIR, dataset, request_id)
+
+    if assign_first:
+        # Previous behaviour, entries were assigned before every check
+        assign_entries(
+            resource_path=os.path.join(resource_dir, resource),
+            dataset=dataset,
+            organisation=organisation,
+            pipeline_dir=pipeline_dir,
+            specification=Specification(directories.SPECIFICATION_DIR),
+            cache_dir=directories.CACHE_DIR,
+            endpoints=[],
+        )
+
+    fetch_response_data(
+        dataset,
+        organisation,
+        request_id,
+        directories.COLLECTION_DIR,
+        directories.CONVERTED_DIR,
+        directories.ISSUE_DIR,
+        directories.COLUMN_FIELD_DIR,
+        directories.TRANSFORMED_DIR,
+        directories.DATASET_RESOURCE_DIR,
+        pipeline_dir,
+        directories.SPECIFICATION_DIR,
+        directories.CACHE_DIR,
+        additional_col_mappings={},
+        additional_concats=None,
+    )
+
+    issue_log = csv_to_json(
+        os.path.join(directories.ISSUE_DIR, dataset, request_id, f"{resource}.csv")
+    )
+    transformed = csv_to_json(
+        os.path.join(
+            directories.TRANSFORMED_DIR, dataset, request_id, f"{resource}.csv"
+        )
+    )
+    return issue_log, transformed
+
+
+@pytest.mark.parametrize(
+    "dataset, fixture",
+    [
+        ("article-4-direction-area", "article-direction-area.csv"),
+        ("conservation-area", "conservation-area-errors.csv"),
+    ],
+)
+def test_check_without_entity_assignment_matches_assigned_check(
+    mock_directories,
+    mock_fetch_pipeline_csvs,
+    test_data_dir,
+    bootstrap_dir,
+    dataset,
+    fixture,
+):
+    shutil.copy(
+        f"{test_data_dir}/csvs/organisation.csv",
+        os.path.join(mock_directories.CACHE_DIR, "organisation.csv"),
+    )
+    fixture_path = os.path.join(bootstrap_dir, fixture)
+
+    assigned_issues, assigned_transformed = _run_check(
+        mock_directories,
+        "assigned",
+        dataset,
+        fixture_path,
+        mock_fetch_pipeline_csvs,
+        assign_first=True,
+    )
+    fast_issues, fast_transformed = _run_check(
+        mock_directories,
+        "fast",
+        dataset,
+        fixture_path,
+        mock_fetch_pipeline_csvs,
+        assign_first=False,
+    )
+
+    assert fast_issues == assigned_issues
+    assert fast_transformed == assigned_transformed
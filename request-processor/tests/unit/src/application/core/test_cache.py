@@ -0,0 +1,171 @@
+import os
+from unittest.mock import MagicMock
+
+from src.application.core.cache import (
+    DatasetFieldIndex,
+    OrganisationCache,
+    ValidCategoryValuesCache,
+)
+
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_organisation_cache_loads_once(monkeypatch, tmp_path):
+    organisation_csv = tmp_path / "organisation.csv"
+    _write(organisation_csv, "organisation,name\nlocal-authority:ABC,Test\n")
+    mock_organisation = MagicMock()
+    monkeypatch.setattr("src.application.core.cache.Organisation", mock_organisation)
+    cache = OrganisationCache()
+
+    first = cache.get(str(organisation_csv), str(tmp_path / "pipeline-1"))
+    second = cache.get(str(organisation_csv), str(tmp_path / "pipeline-2"))
+
+    assert first is second
+    assert mock_organisation.call_count == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_organisation_cache_reloads_when_file_changes(monkeypatch, tmp_path):
+    organisation_csv = tmp_path / "organisation.csv"
+    _write(organisation_csv, "organisation,name\nlocal-authority:ABC,Test\n")
+    mock_organisation = MagicMock(side_effect=lambda *args: object())
+    monkeypatch.setattr("src.application.core.cache.Organisation", mock_organisation)
+    cache = OrganisationCache()
+
+    first = cache.get(str(organisation_csv), str(tmp_path))
+    _write(
+        organisation_csv,
+        "organisation,name\nlocal-authority:ABC,Test\nlocal-authority:DEF,New\n",
+    )
+    stat = os.stat(organisation_csv)
+    os.utime(organisation_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = cache.get(str(organisation_csv), str(tmp_path))
+
+    assert first is not second
+    assert mock_organisation.call_count == 2
+
+
+def test_organisation_cache_keys_on_pipeline_patches(monkeypatch, tmp_path):
+    organisation_csv = tmp_path / "organisation.csv"
+    _write(organisation_csv, "organisation,name\nlocal-authority:ABC,Test\n")
+    pipeline_a = tmp_path / "a"
+    pipeline_b = tmp_path / "b"
+    pipeline_a.mkdir()
+    pipeline_b.mkdir()
+    _write(pipeline_b / "patch.csv", "dataset,resource,field,pattern,value\n")
+    mock_organisation = MagicMock(side_effect=lambda *args: object())
+    monkeypatch.setattr("src.application.core.cache.Organisation", mock_organisation)
+    cache = OrganisationCache()
+
+    first = cache.get(str(organisation_csv), str(pipeline_a))
+    second = cache.get(str(organisation_csv), str(pipeline_b))
+
+    assert first is not second
+    assert cache.stats()["entries"] == 2
+
+
+def test_valid_category_values_cache_memoizes_per_dataset(tmp_path):
+    specification_dir = tmp_path / "specification"
+    pipeline_dir = tmp_path / "pipeline"
+    specification_dir.mkdir()
+    pipeline_dir.mkdir()
+    _write(specification_dir / "dataset.csv", "dataset\ntree\n")
+    _write(pipeline_dir / "column.csv", "dataset,column,field\n")
+    api = MagicMock()
+    api.get_valid_category_values.return_value = {"tree-species": ["oak"]}
+    cache = ValidCategoryValuesCache()
+
+    for _ in range(3):
+        values = cache.get(
+            api, "tree", MagicMock(), str(specification_dir), str(pipeline_dir)
+        )
+    cache.get(
+        api, "conservation-area", MagicMock(), str(specification_dir), str(pipeline_dir)
+    )
+
+    assert values == {"tree-species": ["oak"]}
+    assert api.get_valid_category_values.call_count == 2
+    assert cache.stats() == {"hits": 2, "misses": 2, "entries": 2}
+
+
+def test_valid_category_values_cache_misses_on_pipeline_change(tmp_path):
+    pipeline_a = tmp_path / "a"
+    pipeline_b = tmp_path / "b"
+    pipeline_a.mkdir()
+    pipeline_b.mkdir()
+    _write(pipeline_a / "column.csv", "dataset,column,field\n")
+    _write(pipeline_b / "column.csv", "dataset,column,field\ntree,ref,reference\n")
+    api = MagicMock()
+    cache = ValidCategoryValuesCache()
+
+    cache.get(api, "tree", MagicMock(), str(tmp_path), str(pipeline_a))
+    cache.get(api, "tree", MagicMock(), str(tmp_path), str(pipeline_b))
+
+    assert api.get_valid_category_values.call_count == 2
+
+
+def test_valid_category_values_cache_ignores_lookup_changes(tmp_path):
+    pipeline_a = tmp_path / "a"
+    pipeline_b = tmp_path / "b"
+    pipeline_a.mkdir()
+    pipeline_b.mkdir()
+    for pipeline_dir in (pipeline_a, pipeline_b):
+        _write(pipeline_dir / "column.csv", "dataset,column,field\n")
+    _write(pipeline_a / "lookup.csv", "prefix,reference,entity\n")
+    _write(pipeline_b / "lookup.csv", "prefix,reference,entity\ntree,T1,1\n")
+    api = MagicMock()
+    cache = ValidCategoryValuesCache()
+
+    cache.get(api, "tree", MagicMock(), str(tmp_path), str(pipeline_a))
+    cache.get(api, "tree", MagicMock(), str(tmp_path), str(pipeline_b))
+
+    assert api.get_valid_category_values.call_count == 1
+
+
+def test_valid_category_values_cache_expires_entries(tmp_path):
+    now = [0.0]
+    api = MagicMock()
+    cache = ValidCategoryValuesCache(ttl_seconds=60, clock=lambda: now[0])
+
+    cache.get(api, "tree", MagicMock(), str(tmp_path), str(tmp_path))
+    now[0] = 59
+    cache.get(api, "tree", MagicMock(), str(tmp_path), str(tmp_path))
+    now[0] = 61
+    cache.get(api, "tree", MagicMock(), str(tmp_path), str(tmp_path))
+
+    assert api.get_valid_category_values.call_count == 2
+
+
+def test_valid_category_values_cache_evicts_least_recently_used(tmp_path):
+    api = MagicMock()
+    cache = ValidCategoryValuesCache(max_entries=2)
+
+    cache.get(api, "a", MagicMock(), str(tmp_path), str(tmp_path))
+    cache.get(api, "b", MagicMock(), str(tmp_path), str(tmp_path))
+    cache.get(api, "a", MagicMock(), str(tmp_path), str(tmp_path))
+    cache.get(api, "c", MagicMock(), str(tmp_path), str(tmp_path))
+    cache.get(api, "a", MagicMock(), str(tmp_path), str(tmp_path))
+    cache.get(api, "b", MagicMock(), str(tmp_path), str(tmp_path))
+
+    assert cache.stats()["entries"] == 2
+    assert api.get_valid_category_values.call_count == 4
+
+
+def test_dataset_field_index_rebuilds_when_file_changes(tmp_path):
+    dataset_field_csv = tmp_path / "dataset-field.csv"
+    _write(dataset_field_csv, "dataset,field\ntree,name\ntree,geometry\nother,ref\n")
+    index = DatasetFieldIndex()
+
+    assert index.get(str(tmp_path), "tree") == {"name", "geometry"}
+    assert index.get(str(tmp_path), "missing") == frozenset()
+
+    _write(dataset_field_csv, "dataset,field\ntree,name\n")
+    stat = os.stat(dataset_field_csv)
+    os.utime(dataset_field_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert index.get(str(tmp_path), "tree") == {"name"}
+    assert index.get(str(tmp_path / "missing"), "tree") is None
@@ -0,0 +1,82 @@
+import csv
+
+import pytest
+
+from src.application.core import csv_reader
+from src.application.core.csv_reader import read_csv_column_values, read_csv_records
+
+
+@pytest.fixture(params=["arrow", "python"])
+def reader_backend(request, monkeypatch):
+    if request.param == "arrow":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(csv_reader, "CSV_READER_BACKEND", request.param)
+    return request.param
+
+
+def _dict_reader(path, encoding="utf-8"):
+    with open(path, "r", encoding=encoding) as f:
+        return list(csv.DictReader(f))
+
+
+def test_read_csv_records_matches_dict_reader(reader_backend, tmp_path):
+    path = tmp_path / "transformed.csv"
+    path.write_text(
+        "entry-number,field,value,entity\n"
+        '1,name,"Oak, English",100\n'
+        '1,notes,"line one\nline two",100\n'
+        "2,name,,\n"
+        '2,reference,"",101\n',
+        encoding="utf-8",
+    )
+
+    assert read_csv_records(str(path), "utf-8") == _dict_reader(path)
+
+
+def test_read_csv_records_falls_back_for_ragged_rows(reader_backend, tmp_path):
+    path = tmp_path / "ragged.csv"
+    path.write_text("a,b\n1,2\n3\n4,5,6\n", encoding="utf-8")
+
+    assert read_csv_records(str(path), "utf-8") == _dict_reader(path)
+
+
+def test_read_csv_records_non_utf8(reader_backend, tmp_path):
+    path = tmp_path / "latin.csv"
+    path.write_bytes(b"reference,name\nREF001,Caf\xe9\n")
+
+    assert read_csv_records(str(path), "latin-1") == [
+        {"reference": "REF001", "name": "Café"}
+    ]
+    with pytest.raises(UnicodeDecodeError):
+        read_csv_records(str(path), "utf-8")
+
+
+def test_read_csv_column_values(reader_backend, tmp_path):
+    path = tmp_path / "transformed.csv"
+    path.write_text(
+        "entry-number,field,entity\n1,name,100\n1,geometry, 100 \n2,name,\n3,name,101\n",
+        encoding="utf-8",
+    )
+
+    assert read_csv_column_values(str(path), "entity") == {"100", "101"}
+    assert read_csv_column_values(str(path), "missing") == set()
+
+
+def test_iter_csv_records_matches_dict_reader(reader_backend, tmp_path):
+    path = tmp_path / "transformed.csv"
+    path.write_text(
+        "entry-number,field,value\n"
+        '1,name,"Oak, English"\n'
+        '1,notes,"line one\nline two"\n'
+        "2,name,\n",
+        encoding="utf-8",
+    )
+
+    assert list(csv_reader.iter_csv_records(str(path), "utf-8")) == _dict_reader(path)
+
+
+def test_iter_csv_records_falls_back_for_ragged_rows(reader_backend, tmp_path):
+    path = tmp_path / "ragged.csv"
+    path.write_text("a,b\n1,2\n3\n4,5,6\n", encoding="utf-8")
+
+    assert list(csv_reader.iter_csv_records(str(path), "utf-8")) == _dict_reader(path)
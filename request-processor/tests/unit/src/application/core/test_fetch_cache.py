@@ -0,0 +1,170 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from src.application.core import fetch_cache as fetch_cache_module
+from src.application.core.fetch_cache import FetchCache
+
+URL = "https://example.com/data.csv"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return FetchCache(
+        cache_dir=str(tmp_path / "cache"),
+        max_bytes=100,
+        max_age_seconds=60,
+        clock=clock,
+    )
+
+
+def _resource(directory, name, content):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_text(content)
+    return path
+
+
+def _log(**headers):
+    return {"status": "200", "fetch-status": "OK", "response-headers": headers}
+
+
+def test_fresh_entry_is_served_without_a_request(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        fetch_cache_module.requests,
+        "get",
+        lambda *a, **kw: pytest.fail("fresh entries should not be revalidated"),
+    )
+    resource = _resource(tmp_path / "first", "abc123", "a,b\n1,2\n")
+    cache.put(URL, None, str(resource), _log(ETag='"v1"'))
+
+    target = tmp_path / "second"
+    target.mkdir()
+    file_name, log = cache.get(URL, None, str(target))
+
+    assert file_name == "abc123"
+    assert (target / "abc123").read_text() == "a,b\n1,2\n"
+    assert log["fetch-cache"] == "hit"
+    assert cache.get(URL, "arcgis", str(target)) is None
+
+
+def test_stale_entry_is_revalidated_with_validators(
+    cache, clock, tmp_path, monkeypatch
+):
+    calls = []
+
+    def fake_get(url, headers=None, **kwargs):
+        calls.append(headers)
+        return FakeResponse(304)
+
+    monkeypatch.setattr(fetch_cache_module.requests, "get", fake_get)
+    resource = _resource(tmp_path / "first", "abc123", "a,b\n")
+    cache.put(
+        URL,
+        None,
+        str(resource),
+        _log(ETag='"v1"', **{"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+    )
+    clock.now = 120
+
+    target = tmp_path / "second"
+    target.mkdir()
+    file_name, log = cache.get(URL, None, str(target))
+
+    assert file_name == "abc123"
+    assert log["fetch-cache"] == "revalidated"
+    assert calls[0]["If-None-Match"] == '"v1"'
+    assert calls[0]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_stale_entry_is_refetched_when_modified(cache, clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        fetch_cache_module.requests, "get", lambda *a, **kw: FakeResponse(200)
+    )
+    resource = _resource(tmp_path / "first", "abc123", "a,b\n")
+    cache.put(URL, None, str(resource), _log(ETag='"v1"'))
+    clock.now = 120
+
+    assert cache.get(URL, None, str(tmp_path)) is None
+
+
+def test_stale_plugin_entry_is_not_revalidated(cache, clock, tmp_path):
+    resource = _resource(tmp_path / "first", "abc123", "{}")
+    cache.put(URL, "arcgis", str(resource), _log(ETag='"v1"'))
+    clock.now = 120
+
+    assert cache.get(URL, "arcgis", str(tmp_path)) is None
+
+
+def test_least_recently_used_entries_are_evicted_by_size(cache, tmp_path):
+    target = tmp_path / "target"
+    target.mkdir()
+    cache.put(
+        "https://example.com/1", None, str(_resource(tmp_path, "1", "x" * 40)), _log()
+    )
+    cache.put(
+        "https://example.com/2", None, str(_resource(tmp_path, "2", "x" * 40)), _log()
+    )
+    cache.get("https://example.com/1", None, str(target))
+    cache.put(
+        "https://example.com/3", None, str(_resource(tmp_path, "3", "x" * 40)), _log()
+    )
+
+    assert cache.get("https://example.com/2", None, str(target)) is None
+    assert cache.get("https://example.com/1", None, str(target)) is not None
+    assert cache.get("https://example.com/3", None, str(target)) is not None
+
+
+def test_processes_keep_their_files_apart(cache, tmp_path):
+    other = _resource(tmp_path / "cache" / "other-host-1-abc", "entry", "a,b\n")
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    left = _resource(tmp_path / "cache" / str(exited.pid), "entry", "a,b\n")
+
+    cache.put(URL, None, str(_resource(tmp_path / "first", "abc123", "a\n")), _log())
+
+    # Directories of other containers' processes, exited or not, are left alone
+    assert other.exists()
+    assert left.exists()
+    assert os.path.basename(cache.process_dir).startswith(
+        f"{socket.gethostname()}-{os.getpid()}-"
+    )
+    assert os.listdir(cache.process_dir) == [os.path.basename(cache._path((URL, None)))]
+
+
+def test_process_directory_is_removed_only_by_its_process(tmp_path):
+    directory = tmp_path / "cache" / "host-1-abc"
+    directory.mkdir(parents=True)
+
+    fetch_cache_module._remove_process_dir(str(directory), os.getpid() + 1)
+    assert directory.exists()
+
+    fetch_cache_module._remove_process_dir(str(directory), os.getpid())
+    assert not directory.exists()
@@ -1,7 +1,14 @@
+import os
+import csv
 import pytest
+from functools import partial
 from unittest.mock import MagicMock
 from src.application.core.pipeline import (
     fetch_add_data_response,
+    fetch_response_data,
+    shutdown_transform_pool,
+    _unknown_entity_rows,
+    _merge_reprocessed_rows,
     _get_entities_breakdown,
     _get_existing_entities_breakdown,
 )
@@ -56,7 +63,7 @@ def test_fetch_add_data_response_success(monkeypatch, tmp_path):
         "src.application.core.pipeline.Lookups", lambda x: mock_lookups_instance
     )
     monkeypatch.setattr("src.application.core.pipeline.Pipeline", MagicMock())
-    monkeypatch.setattr("src.application.core.pipeline.Organisation", MagicMock())
+    monkeypatch.setattr("src.application.core.pipeline.get_organisation", MagicMock())
 
     result = fetch_add_data_response(
         dataset=dataset,
@@ -91,7 +98,7 @@ def test_fetch_add_data_response_no_files(monkeypatch, tmp_path):
         "src.application.core.pipeline.Specification", lambda x: mock_spec
     )
     monkeypatch.setattr("src.application.core.pipeline.Pipeline", MagicMock())
-    monkeypatch.setattr("src.application.core.pipeline.Organisation", MagicMock())
+    monkeypatch.setattr("src.application.core.pipeline.get_organisation", MagicMock())
 
     result = fetch_add_data_response(
         dataset=dataset,
@@ -125,7 +132,7 @@ def test_fetch_add_data_response_file_not_found(monkeypatch, tmp_path):
         "src.application.core.pipeline.Specification", lambda x: mock_spec
     )
     monkeypatch.setattr("src.application.core.pipeline.Pipeline", MagicMock())
-    monkeypatch.setattr("src.application.core.pipeline.Organisation", MagicMock())
+    monkeypatch.setattr("src.application.core.pipeline.get_organisation", MagicMock())
 
     with pytest.raises(FileNotFoundError):
         fetch_add_data_response(
@@ -163,7 +170,7 @@ def test_fetch_add_data_response_handles_processing_error(monkeypatch, tmp_path)
         "src.application.core.pipeline.Specification", lambda x: mock_spec
     )
     monkeypatch.setattr("src.application.core.pipeline.Pipeline", MagicMock())
-    monkeypatch.setattr("src.application.core.pipeline.Organisation", MagicMock())
+    monkeypatch.setattr("src.application.core.pipeline.get_organisation", MagicMock())
 
     def raise_exception(*args, **kwargs):
         raise Exception("Processing error")
@@ -183,6 +190,314 @@ def test_fetch_add_data_response_handles_processing_error(monkeypatch, tmp_path)
     assert result["new-in-resource"] == 0
 
 
+def test_fetch_add_data_response_reprocesses_only_unknown_rows(monkeypatch, tmp_path):
+    """Only rows with unknown entities are transformed again after assignment"""
+    pipeline_dir = tmp_path / "pipeline"
+    input_path = tmp_path / "resource"
+    output_dir = tmp_path / "transformed"
+    input_path.mkdir(parents=True)
+    pipeline_dir.mkdir(parents=True)
+    output_dir.mkdir(parents=True)
+    output_path = output_dir / "output.csv"
+    (input_path / "test").write_text("reference,name\nREF001,One\nREF002,Two\n")
+
+    transform_inputs = []
+
+    class FakePipeline:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def transform(self, input_path, output_path, **kwargs):
+            transform_inputs.append(input_path)
+            with open(input_path, newline="") as f:
+                rows = list(csv.DictReader(f))
+            first_pass = len(transform_inputs) == 1
+            with open(output_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=["entity", "entry-number"])
+                writer.writeheader()
+                for entry_number, row in enumerate(rows, start=1):
+                    if first_pass and row["reference"] == "REF002":
+                        continue
+                    entity = "1" if row["reference"] == "REF001" else "2"
+                    writer.writerow({"entity": entity, "entry-number": entry_number})
+            issue_log = MagicMock()
+            issue_log.rows = (
+                [
+                    {
+                        "issue-type": "unknown entity",
+                        "field": "entity",
+                        "line-number": 3,
+                        "entry-number": 2,
+                    }
+                ]
+                if first_pass
+                else [
+                    {
+                        "issue-type": "invalid date",
+                        "field": "start-date",
+                        "line-number": 2,
+                        "entry-number": 1,
+                    }
+                ]
+            )
+            return issue_log
+
+    assigned_inputs = []
+
+    def fake_assign_entries(resource_path, **kwargs):
+        with open(resource_path, newline="") as f:
+            assigned_inputs.append([row["reference"] for row in csv.DictReader(f)])
+        return [{"entity": "2", "reference": "REF002", "organisation": "test-org"}]
+
+    monkeypatch.setattr(
+        "src.application.core.pipeline.Specification", lambda x: MagicMock()
+    )
+    monkeypatch.setattr("src.application.core.pipeline.Pipeline", FakePipeline)
+    monkeypatch.setattr("src.application.core.pipeline.get_organisation", MagicMock())
+    monkeypatch.setattr(
+        "src.application.core.pipeline.assign_entries", fake_assign_entries
+    )
+
+    result = fetch_add_data_response(
+        dataset="test-dataset",
+        organisation_provider="test-org",
+        pipeline_dir=str(pipeline_dir),
+        input_dir=str(input_path),
+        output_path=str(output_path),
+        specification_dir=str(tmp_path / "specification"),
+        cache_dir=str(tmp_path / "cache"),
+        endpoint="abc123hash",
+    )
+
+    assert assigned_inputs == [["REF002"]]
+    assert len(transform_inputs) == 2
+    with open(output_path, newline="") as f:
+        transformed = list(csv.DictReader(f))
+    assert transformed == [
+        {"entity": "1", "entry-number": "1"},
+        {"entity": "2", "entry-number": "2"},
+    ]
+    assert result["new-in-resource"] == 1
+    assert result["pipeline-issues"] == [
+        {
+            "issue-type": "invalid date",
+            "field": "start-date",
+            "line-number": "3",
+            "entry-number": "2",
+        }
+    ]
+    assert list(output_dir.iterdir()) == [output_path]
+
+
+def test_unknown_entity_rows_ignores_missing_reference():
+    issue_log = MagicMock()
+    issue_log.rows = [
+        {"issue-type": "unknown entity", "line-number": "3", "entry-number": "2"},
+        {
+            "issue-type": "unknown entity - missing reference",
+            "line-number": "4",
+            "entry-number": "3",
+        },
+        {"issue-type": "invalid date", "line-number": "5", "entry-number": "4"},
+    ]
+
+    assert _unknown_entity_rows(issue_log) == {3: "2"}
+
+
+def _write_transformed(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["entry-number", "field", "value"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_merge_reprocessed_rows_keeps_entry_order(tmp_path):
+    output_path = tmp_path / "transformed.csv"
+    subset_output_path = tmp_path / "subset.csv"
+    _write_transformed(
+        output_path,
+        [
+            {"entry-number": "1", "field": "reference", "value": "REF1"},
+            {"entry-number": "2", "field": "reference", "value": "unknown"},
+            {"entry-number": "3", "field": "reference", "value": "REF3"},
+            {"entry-number": "4", "field": "reference", "value": "unknown"},
+            {"entry-number": "5", "field": "reference", "value": "REF5"},
+        ],
+    )
+    _write_transformed(
+        subset_output_path,
+        [
+            {"entry-number": "1", "field": "entity", "value": "101"},
+            {"entry-number": "1", "field": "reference", "value": "REF2"},
+            {"entry-number": "2", "field": "entity", "value": "102"},
+            {"entry-number": "2", "field": "reference", "value": "REF4"},
+        ],
+    )
+    issue_log = MagicMock()
+    issue_log.rows = [
+        {"issue-type": "unknown entity", "entry-number": "2", "line-number": "3"},
+        {"issue-type": "invalid date", "entry-number": "3", "line-number": "4"},
+        {"issue-type": "unknown entity", "entry-number": "4", "line-number": "5"},
+    ]
+    subset_issue_log = MagicMock()
+    subset_issue_log.rows = [
+        {"issue-type": "invalid date", "entry-number": "1", "line-number": "2"},
+        {"issue-type": "invalid date", "entry-number": "2", "line-number": "3"},
+    ]
+
+    _merge_reprocessed_rows(
+        issue_log,
+        subset_issue_log,
+        str(output_path),
+        str(subset_output_path),
+        [(3, "2"), (5, "4")],
+    )
+
+    with open(output_path, newline="") as f:
+        merged = [(row["entry-number"], row["value"]) for row in csv.DictReader(f)]
+    assert merged == [
+        ("1", "REF1"),
+        ("2", "101"),
+        ("2", "REF2"),
+        ("3", "REF3"),
+        ("4", "102"),
+        ("4", "REF4"),
+        ("5", "REF5"),
+    ]
+    assert [(row["entry-number"], row["line-number"]) for row in issue_log.rows] == [
+        ("2", "3"),
+        ("3", "4"),
+        ("4", "5"),
+    ]
+    assert sorted(os.listdir(tmp_path)) == ["subset.csv", "transformed.csv"]
+
+
+@pytest.mark.parametrize(
+    "disable_lookups, expected_assign_calls", [(True, 0), (False, 1)]
+)
+def test_fetch_response_data_assigns_entries_only_with_lookups(
+    monkeypatch, tmp_path, disable_lookups, expected_assign_calls
+):
+    request_id = "req-001"
+    resource_dir = tmp_path / "collection" / "resource" / request_id
+    resource_dir.mkdir(parents=True)
+    (resource_dir / "test").write_text("reference\nREF001\n")
+    mock_pipeline = MagicMock()
+    mock_assign_entries = MagicMock(return_value=[])
+
+    monkeypatch.setattr(
+        "src.application.core.pipeline.Specification", lambda x: MagicMock()
+    )
+    monkeypatch.setattr(
+        "src.application.core.pipeline.Pipeline", lambda *a, **kw: mock_pipeline
+    )
+    monkeypatch.setattr("src.application.core.pipeline.API", MagicMock())
+    monkeypatch.setattr("src.application.core.pipeline.get_organisation", MagicMock())
+    monkeypatch.setattr(
+        "src.application.core.pipeline.get_valid_category_values", MagicMock()
+    )
+    monkeypatch.setattr(
+        "src.application.core.pipeline.assign_entries", mock_assign_entries
+    )
+
+    fetch_response_data(
+        "test-dataset",
+        "test-org",
+        request_id,
+        str(tmp_path / "collection"),
+        str(tmp_path / "converted"),
+        str(tmp_path / "issue"),
+        str(tmp_path / "column-field"),
+        str(tmp_path / "transformed"),
+        str(tmp_path / "dataset-resource"),
+        str(tmp_path / "pipeline"),
+        str(tmp_path / "specification"),
+        str(tmp_path / "cache"),
+        additional_col_mappings={},
+        additional_concats=None,
+        disable_lookups=disable_lookups,
+    )
+
+    assert mock_assign_entries.call_count == expected_assign_calls
+    assert mock_pipeline.transform.call_count == 1
+    assert (
+        mock_pipeline.transform.call_args.kwargs["disable_lookups"] == disable_lookups
+    )
+
+
+def test_fetch_response_data_uses_process_pool_for_multiple_files(
+    monkeypatch, tmp_path
+):
+    request_id = "req-001"
+    resource_dir = tmp_path / "collection" / "resource" / request_id
+    resource_dir.mkdir(parents=True)
+    for name in ["b", "a"]:
+        (resource_dir / name).write_text("reference\nREF001\n")
+    pools = []
+
+    class FakeExecutor:
+        def __init__(self, max_workers, mp_context):
+            self.max_workers = max_workers
+            self.shut_down = False
+            pools.append(self)
+
+        def map(self, func, iterable):
+            return [os.path.basename(path) for path in iterable]
+
+        def shutdown(self, cancel_futures=False):
+            self.shut_down = True
+
+    built = []
+    monkeypatch.setattr(
+        "src.application.core.pipeline.Specification",
+        lambda x: built.append("specification"),
+    )
+    monkeypatch.setattr(
+        "src.application.core.pipeline.Pipeline",
+        lambda *a, **kw: built.append("pipeline"),
+    )
+    monkeypatch.setattr(
+        "src.application.core.pipeline.API", lambda **kw: built.append("api")
+    )
+    monkeypatch.setattr("src.application.core.pipeline.WORKFLOW_MAX_WORKERS", 4)
+    monkeypatch.setattr(
+        "src.application.core.pipeline.ProcessPoolExecutor", FakeExecutor
+    )
+    monkeypatch.setattr("src.application.core.pipeline._transform_pool", None)
+
+    fetch = partial(
+        fetch_response_data,
+        "test-dataset",
+        "test-org",
+        request_id,
+        str(tmp_path / "collection"),
+        str(tmp_path / "converted"),
+        str(tmp_path / "issue"),
+        str(tmp_path / "column-field"),
+        str(tmp_path / "transformed"),
+        str(tmp_path / "dataset-resource"),
+        str(tmp_path / "pipeline"),
+        str(tmp_path / "specification"),
+        str(tmp_path / "cache"),
+        additional_col_mappings={},
+        additional_concats=None,
+        file_done=lambda path: done.append(os.path.basename(path)),
+    )
+    done = []
+
+    assert fetch() == ["a", "b"]
+    assert done == ["a", "b"]
+    assert fetch() == ["a", "b"]
+    assert len(pools) == 1
+    assert pools[0].max_workers == 4
+    # Pool processes build their own, so none are built for the request
+    assert built == []
+
+    shutdown_transform_pool()
+
+    assert pools[0].shut_down
+
+
 def test_get_entities_breakdown_success():
     """Test converting entities to breakdown format"""
     new_entities = [
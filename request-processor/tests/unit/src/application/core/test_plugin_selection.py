@@ -0,0 +1,86 @@
+import pytest
+
+from src.application.core import plugin_selection
+from src.application.core.plugin_selection import (
+    classify_response,
+    classify_url,
+    next_plugins,
+    plugin_order,
+    record_success,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_host_cache():
+    plugin_selection.host_plugin_cache.clear()
+    yield
+    plugin_selection.host_plugin_cache.clear()
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://example.com/data.csv", None),
+        ("https://example.com/arcgis/rest/services/Trees/FeatureServer/0", "arcgis"),
+        ("https://example.com/server/rest/services/Trees/MapServer", "arcgis"),
+        (
+            "https://example.com/arcgis/rest/services/Trees/FeatureServer/0/query"
+            "?where=1%3D1&f=geojson",
+            None,
+        ),
+        ("https://example.com/geoserver/ows?service=WFS&request=GetFeature", "wfs"),
+        ("https://example.com/geoserver/wfs", "wfs"),
+    ],
+)
+def test_classify_url(url, expected):
+    assert classify_url(url) == expected
+
+
+@pytest.mark.parametrize(
+    "content_type, body, expected",
+    [
+        ("text/html", b"<html><title>ArcGIS REST Services Directory</title>", "arcgis"),
+        ("application/xml", b"<wfs:WFS_Capabilities version='2.0.0'>", "wfs"),
+        ("application/json", b'{"currentVersion": 10.9, "layers": []}', "arcgis"),
+        ("text/html", b"<html>Not found</html>", None),
+    ],
+)
+def test_classify_response(content_type, body, expected):
+    assert classify_response(content_type, body) == expected
+
+
+def test_plugin_order_uses_host_cache():
+    assert plugin_order("https://maps.example.com/trees") == [None, "arcgis", "wfs"]
+
+    record_success("https://maps.example.com/conservation", "wfs")
+
+    assert plugin_order("https://maps.example.com/trees") == ["wfs", None, "arcgis"]
+    assert plugin_order("https://other.example.com/trees") == [None, "arcgis", "wfs"]
+
+
+def test_plugin_order_ignores_host_cache_for_files():
+    record_success("https://maps.example.com/geoserver/ows?service=WFS", "wfs")
+
+    assert plugin_order("https://maps.example.com/data/trees.geojson") == [
+        None,
+        "arcgis",
+        "wfs",
+    ]
+    assert plugin_order("https://maps.example.com/geoserver/ows") == [
+        "wfs",
+        None,
+        "arcgis",
+    ]
+
+
+def test_next_plugins_peeks_when_content_type_is_inconclusive(monkeypatch):
+    monkeypatch.setattr(
+        plugin_selection,
+        "peek",
+        lambda url: ("text/xml", b"<wfs:WFS_Capabilities>"),
+    )
+
+    assert next_plugins("https://example.com/ows", ["arcgis", "wfs"], "text/html") == [
+        "wfs",
+        "arcgis",
+    ]
@@ -0,0 +1,40 @@
+from src.application.core.progress import ProgressReporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_progress_reporter_rate_limits_rows_within_a_stage():
+    writes = []
+    clock = FakeClock()
+    progress = ProgressReporter(writes.append, min_interval=5, clock=clock)
+
+    progress("fetching")
+    progress("transforming", 10, 100)
+    clock.now = 1
+    progress("transforming", 20)
+    clock.now = 6
+    progress("transforming", 30)
+
+    assert [(w["stage"], w["rows_processed"], w["rows_total"]) for w in writes] == [
+        ("fetching", None, None),
+        ("transforming", 10, 100),
+        ("transforming", 30, 100),
+    ]
+    assert progress.progress["rows_processed"] == 30
+
+
+def test_progress_reporter_ignores_writer_errors():
+    def writer(progress):
+        raise RuntimeError("database unavailable")
+
+    progress = ProgressReporter(writer, min_interval=5, clock=FakeClock())
+
+    progress("fetching")
+
+    assert progress.progress["stage"] == "fetching"
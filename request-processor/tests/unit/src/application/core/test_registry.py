@@ -0,0 +1,101 @@
+import csv
+
+from src.application.core.registry import (
+    ENDPOINT_FIELDNAMES,
+    SOURCE_FIELDNAMES,
+    RegistryCache,
+)
+
+
+def _write_csv(path, fieldnames, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _collection(path):
+    path.mkdir()
+    _write_csv(
+        path / "endpoint.csv",
+        ENDPOINT_FIELDNAMES,
+        [{"endpoint": "abc", "endpoint-url": "http://example.com/a"}],
+    )
+    _write_csv(
+        path / "source.csv",
+        SOURCE_FIELDNAMES,
+        [
+            {
+                "source": "s1",
+                "endpoint": "abc",
+                "organisation": "local-authority:ABC",
+                "pipelines": "tree",
+            }
+        ],
+    )
+    return path
+
+
+def test_registry_snapshot_shared_between_identical_collections(tmp_path):
+    cache = RegistryCache()
+    first = cache.open(str(_collection(tmp_path / "req-1")))
+    second = cache.open(str(_collection(tmp_path / "req-2")))
+
+    assert first is not second
+    assert first.snapshot is second.snapshot
+    assert first.find_endpoint(" http://example.com/a ")["endpoint"] == "abc"
+    assert first.find_endpoint_by_hash("abc")["endpoint-url"] == "http://example.com/a"
+    assert first.endpoints_for("local-authority:ABC", "tree") == ["abc"]
+
+
+def test_registry_overlay_is_per_request(tmp_path):
+    cache = RegistryCache()
+    first = cache.open(str(_collection(tmp_path / "req-1")))
+    second = cache.open(str(_collection(tmp_path / "req-2")))
+
+    first.add_endpoint({"endpoint": "def", "endpoint-url": "http://example.com/b"})
+    first.add_source(
+        {
+            "source": "s2",
+            "endpoint": "def",
+            "organisation": "local-authority:ABC",
+            "pipelines": "tree",
+        }
+    )
+
+    assert cache.open(str(tmp_path / "req-1")) is first
+    assert first.find_endpoint("http://example.com/b")["endpoint"] == "def"
+    assert first.endpoints_for("local-authority:ABC", "tree") == ["abc", "def"]
+    assert second.find_endpoint("http://example.com/b") is None
+    assert second.find_source("s2") is None
+    with open(tmp_path / "req-1" / "endpoint.csv", newline="") as f:
+        assert [row["endpoint"] for row in csv.DictReader(f)] == ["abc", "def"]
+
+
+def test_registry_reloads_when_file_changed_elsewhere(tmp_path):
+    cache = RegistryCache()
+    config_dir = _collection(tmp_path / "req-1")
+    first = cache.open(str(config_dir))
+
+    with open(config_dir / "endpoint.csv", "a", newline="") as f:
+        f.write("ghi,http://example.com/c,,,,,\r\n")
+
+    second = cache.open(str(config_dir))
+    assert second is not first
+    assert second.find_endpoint("http://example.com/c")["endpoint"] == "ghi"
+
+
+def test_registry_appends_after_trailing_blank_lines(tmp_path):
+    cache = RegistryCache()
+    config_dir = _collection(tmp_path / "req-1")
+    with open(config_dir / "endpoint.csv", "a") as f:
+        f.write("\n\n")
+
+    cache.open(str(config_dir)).add_endpoint(
+        {"endpoint": "def", "endpoint-url": "http://example.com/b"}
+    )
+
+    with open(config_dir / "endpoint.csv", newline="") as f:
+        lines = f.read().splitlines()
+    assert lines[-1].startswith("def,http://example.com/b")
+    assert "" not in lines
@@ -0,0 +1,49 @@
+import os
+
+from src.application.core import rules
+from src.application.core.rules import CompiledYaml
+
+
+def _write(path, text, mtime_offset=0):
+    path.write_text(text)
+    if mtime_offset:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+
+def test_compiled_yaml_compiles_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(rules.config, "RULES_HOT_RELOAD", False)
+    path = tmp_path / "mandatory_fields.yaml"
+    _write(path, "tree:\n- reference\n")
+    compiled = CompiledYaml(str(path), rules._compile_mandatory_fields)
+
+    first = compiled.get()
+    _write(path, "tree:\n- reference\n- geometry\n", mtime_offset=1_000_000)
+
+    assert compiled.get() is first
+    assert first == {"tree": ["reference"]}
+
+
+def test_compiled_yaml_hot_reloads_on_change(monkeypatch, tmp_path):
+    monkeypatch.setattr(rules.config, "RULES_HOT_RELOAD", True)
+    path = tmp_path / "mapping.yaml"
+    _write(path, "mappings:\n- field: name\n  issue-type: missing value\n")
+    compiled = CompiledYaml(str(path), rules._compile_mappings)
+
+    first = compiled.get()
+    assert compiled.get() is first
+    _write(
+        path,
+        "mappings:\n- field: geometry\n  issue-type: invalid geometry\n",
+        mtime_offset=1_000_000,
+    )
+
+    assert list(compiled.get()) == [("geometry", "invalid geometry")]
+
+
+def test_mandatory_fields_from_configs():
+    assert rules.mandatory_fields()["tree-preservation-zone"] == [
+        "reference",
+        "geometry",
+    ]
+    assert ("start-date", "invalid date") in rules.mappings()
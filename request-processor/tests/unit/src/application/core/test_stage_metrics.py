@@ -0,0 +1,60 @@
+from prometheus_client import REGISTRY
+
+# Imported as the worker imports it, a second copy would register the metrics twice
+from application.core.stage_metrics import StageMetrics
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_stage_summary_accumulates_time_bytes_and_rows():
+    stages = StageMetrics("check_url", "tree")
+
+    with stages.stage("fetch") as record:
+        record.add(bytes=100)
+    with stages.stage("fetch") as record:
+        record.add(bytes=50)
+    with stages.stage("read-outputs") as record:
+        record.add(rows=3)
+    with stages.stage("config"):
+        pass
+
+    summary = stages.summary()
+    assert summary["fetch"]["bytes"] == 150
+    assert summary["read-outputs"]["rows"] == 3
+    assert "bytes" not in summary["config"]
+    assert all(stage["seconds"] >= 0 for stage in summary.values())
+
+
+def test_stage_exports_deltas_with_labels_at_exit():
+    labels = {
+        "stage": "fetch",
+        "request_type": "add_data",
+        "dataset": "tree-preservation-zone",
+        "plugin": "arcgis",
+    }
+    bytes_before = _sample("worker_stage_bytes_total", **labels)
+    count_before = _sample("worker_stage_duration_seconds_count", **labels)
+    stages = StageMetrics("add_data", "tree-preservation-zone")
+
+    with stages.stage("fetch") as record:
+        stages.plugin = "arcgis"
+        record.add(bytes=10)
+    with stages.stage("fetch") as record:
+        record.add(bytes=5)
+
+    assert _sample("worker_stage_bytes_total", **labels) - bytes_before == 15
+    assert _sample("worker_stage_duration_seconds_count", **labels) - count_before == 2
+
+
+def test_stage_is_recorded_when_the_block_raises():
+    stages = StageMetrics("check_file", "article-4-direction")
+
+    try:
+        with stages.stage("persist"):
+            raise ValueError("failed")
+    except ValueError:
+        pass
+
+    assert "persist" in stages.summary()
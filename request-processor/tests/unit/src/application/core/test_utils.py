@@ -75,6 +75,53 @@ def test_detect_encoding(tmp_path):
     assert encoding.lower() in ("utf-8", "ascii")
 
 
+def test_detect_encoding_bom_skips_detector(monkeypatch, tmp_path):
+    file = tmp_path / "bom.csv"
+    file.write_bytes(b"\xef\xbb\xbfreference,name\nREF001,Caf\xc3\xa9\n")
+    monkeypatch.setattr(utils, "UniversalDetector", None)
+
+    assert utils.detect_encoding(str(file)) == "UTF-8-SIG"
+
+
+def test_detect_encoding_samples_capped_prefix(monkeypatch, tmp_path):
+    file = tmp_path / "large.csv"
+    file.write_bytes(b"reference,name\n" + b"REF001,Name\n" * 100000)
+    fed = []
+
+    class Detector:
+        done = False
+        result = {"encoding": "ASCII"}
+
+        def reset(self):
+            pass
+
+        def feed(self, data):
+            fed.append(len(data))
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(utils, "UniversalDetector", Detector)
+
+    encoding = utils.detect_encoding(str(file), max_bytes=128 * 1024)
+
+    assert sum(fed) <= 128 * 1024 + 64 * 1024
+    # An ASCII prefix of a longer file is read as UTF-8
+    assert encoding == "UTF-8"
+
+
+def test_detect_encoding_cached_until_file_changes(monkeypatch, tmp_path):
+    file = tmp_path / "cached.csv"
+    file.write_text("hello,world\n", encoding="utf-8")
+    first = utils.detect_encoding(str(file))
+    monkeypatch.setattr(utils, "UniversalDetector", None)
+
+    assert utils.detect_encoding(str(file)) == first
+
+    file.write_bytes(b"\xff\xfeh\x00i\x00\n\x00")
+    assert utils.detect_encoding(str(file)) == "UTF-16"
+
+
 def test_detect_encoding_break(tmp_path):
     file = tmp_path / "utf16.csv"
     file.write_bytes(
@@ -84,22 +131,6 @@ def test_detect_encoding_break(tmp_path):
     assert encoding.lower().startswith("utf-16")
 
 
-def test_extract_dataset_field_rows(tmp_path):
-    folder = tmp_path
-    csv_file = folder / "dataset-field.csv"
-    rows = [
-        {"dataset": "test", "field": "name"},
-        {"dataset": "other", "field": "ref"},
-    ]
-    with open(csv_file, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["dataset", "field"])
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-    result = utils.extract_dataset_field_rows(str(folder), "test")
-    assert result == [rows[0]]
-
-
 def test_append_endpoint(tmp_path):
     endpoint_csv = tmp_path / "endpoint.csv"
     endpoint_url = "http://example.com"
@@ -889,3 +920,14 @@ def test_read_existing_source_entry_not_found(tmp_path):
 def test_read_existing_source_entry_file_missing(tmp_path):
     result = _read_existing_source_entry(str(tmp_path / "source.csv"), "s1")
     assert result is None
+
+
+def test_content_length():
+    with requests_mock.Mocker() as m:
+        m.head("http://example.com/sized.csv", headers={"Content-Length": "2048"})
+        m.head("http://example.com/chunked.csv")
+        m.head("http://example.com/missing.csv", status_code=404)
+
+        assert utils.content_length("http://example.com/sized.csv") == 2048
+        assert utils.content_length("http://example.com/chunked.csv") is None
+        assert utils.content_length("http://example.com/missing.csv") is None
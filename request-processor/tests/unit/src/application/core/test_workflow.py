@@ -7,11 +7,17 @@ from src.application.core.workflow import (
     add_data_workflow,
     fetch_add_data_pipeline_csvs,
     add_extra_column_mappings,
+    read_resource_outputs,
+    run_workflow,
+    _estimate_rows,
+    OutputRows,
 )
 import csv
+import errno
 import hashlib
 import os
 from pathlib import Path
+from unittest.mock import MagicMock
 from urllib.error import HTTPError
 
 
@@ -65,6 +71,20 @@ def test_updateColumnFieldLog(
         )
 
 
+def test_updateColumnFieldLog_alternative_fields():
+    column_field_log = [{"field": "geometry"}, {"field": "reference-entity"}]
+    required_fields = [["point", "geometry"], ["reference", "name"]]
+
+    updateColumnFieldLog(column_field_log, required_fields)
+
+    assert column_field_log == [
+        {"field": "geometry", "missing": False},
+        {"field": "reference-entity", "missing": False},
+        {"field": "reference", "missing": True},
+        {"field": "name", "missing": True},
+    ]
+
+
 def test_error_summary():
     internal_issue = "invalid organisation"
     issue_log = [
@@ -372,6 +392,7 @@ def test_add_data_workflow(monkeypatch):
         directories,
     )
 
+    assert set(result.pop("stage-metrics")) == {"config", "transform", "read-outputs"}
     assert result == expected_response
 
 
@@ -576,6 +597,12 @@ def test_add_extra_column_mappings_mix_valid_ignore_invalid(tmp_path):
     )
 
     assert not_mapped == ["nonexistent-field"]
+    with open(column_csv, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["column"], r["field"]) for r in rows] == [
+        ("ColA", "name"),
+        ("ColB", "IGNORE"),
+    ]
 
 
 def test_add_extra_column_mappings_ignore_with_no_filtered_rows(tmp_path):
@@ -594,3 +621,161 @@ def test_add_extra_column_mappings_ignore_with_no_filtered_rows(tmp_path):
     )
 
     assert not_mapped == []
+
+
+def test_read_resource_outputs_falls_back_to_raw_resource(tmp_path, mock_directories):
+    request_id = "req-001"
+    resource_dir = tmp_path / "collection" / "resource" / request_id
+    resource_dir.mkdir(parents=True)
+    (resource_dir / "abc").write_text("reference,name\nREF001,One\n")
+    issue_dir = tmp_path / "issue" / "tree" / request_id
+    issue_dir.mkdir(parents=True)
+    (issue_dir / "abc.csv").write_text("entry-number,issue-type\n1,invalid\n")
+    directories = mock_directories._replace(
+        COLLECTION_DIR=str(tmp_path / "collection"),
+        CONVERTED_DIR=str(tmp_path / "converted"),
+        ISSUE_DIR=str(tmp_path / "issue"),
+        COLUMN_FIELD_DIR=str(tmp_path / "column-field"),
+        TRANSFORMED_DIR=str(tmp_path / "transformed"),
+    )
+
+    outputs = read_resource_outputs(directories, "tree", request_id, "abc")
+
+    assert outputs["converted-csv"] == [{"reference": "REF001", "name": "One"}]
+    assert outputs["issue-log"] == [{"entry-number": "1", "issue-type": "invalid"}]
+    assert outputs["transformed-csv"] == []
+
+
+def test_csv_to_json_retries_with_full_detection(monkeypatch, tmp_path):
+    csv_file = tmp_path / "latin.csv"
+    csv_file.write_bytes(b"reference,name\nREF001,Caf\xe9\n")
+    calls = []
+
+    def mock_detect_encoding(path, max_bytes=1024):
+        calls.append(max_bytes)
+        return "utf-8" if max_bytes else "latin-1"
+
+    monkeypatch.setattr(
+        "src.application.core.workflow.detect_encoding", mock_detect_encoding
+    )
+
+    json_data = csv_to_json(str(csv_file))
+
+    assert json_data == [{"reference": "REF001", "name": "Caf\u00e9"}]
+    assert calls == [1024, None]
+
+
+def test_run_workflow_cleans_up_when_it_fails_early(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(
+        "src.application.core.workflow.fetch_pipeline_csvs",
+        MagicMock(side_effect=RuntimeError("config unavailable")),
+    )
+    monkeypatch.setattr(
+        "src.application.core.workflow.clean_up",
+        lambda *args: calls.append("clean_up"),
+    )
+    directories = MagicMock()
+    directories.COLLECTION_DIR = str(tmp_path / "collection")
+    directories.PIPELINE_DIR = str(tmp_path / "pipeline")
+
+    response = run_workflow(
+        "upload.csv",
+        "req-001",
+        "tree",
+        "tree",
+        "",
+        "",
+        {},
+        directories,
+    )
+
+    assert response == {}
+    assert calls == ["clean_up"]
+
+
+def test_run_workflow_moves_to_disk_when_the_transform_runs_out_of_space(
+    monkeypatch, tmp_path
+):
+    memory = MagicMock(
+        COLLECTION_DIR=str(tmp_path / "memory"),
+        PIPELINE_DIR=str(tmp_path / "memory" / "pipeline"),
+    )
+    disk = MagicMock(
+        COLLECTION_DIR=str(tmp_path / "disk"),
+        PIPELINE_DIR=str(tmp_path / "disk" / "pipeline"),
+    )
+    monkeypatch.setattr(
+        "src.application.core.workflow.fetch_pipeline_csvs", lambda *args: []
+    )
+    monkeypatch.setattr("src.application.core.workflow.clean_up", lambda *args: None)
+    transforms = []
+
+    def mock_fetch_response_data(
+        dataset, organisation, request_id, collection_dir, *args, **kwargs
+    ):
+        transforms.append(collection_dir)
+        if len(transforms) == 1:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return []
+
+    monkeypatch.setattr(
+        "src.application.core.workflow.fetch_response_data", mock_fetch_response_data
+    )
+
+    run_workflow(
+        "upload.csv",
+        "req-001",
+        "tree",
+        "tree",
+        "",
+        "",
+        {},
+        memory,
+        move_to_disk=lambda: disk,
+    )
+
+    assert transforms == [memory.COLLECTION_DIR, disk.COLLECTION_DIR]
+
+
+def test_output_rows_streams_files_with_offsets(tmp_path):
+    first = tmp_path / "first.csv"
+    first.write_text("entry-number,field\n1,name\n2,name\n")
+    second = tmp_path / "second.csv"
+    second.write_text("entry-number,field\n1,reference\n")
+    rows = OutputRows()
+
+    rows.add(str(first))
+    rows.add(str(second), offset=2)
+    rows.add(str(tmp_path / "missing.csv"))
+
+    assert rows.rows == len(rows) == 3
+    assert list(rows) == [
+        {"entry-number": "1", "field": "name"},
+        {"entry-number": "2", "field": "name"},
+        {"entry-number": "3", "field": "reference"},
+    ]
+    # Read from disk again on each pass
+    assert len(list(rows)) == 3
+
+
+def test_estimate_rows_counts_small_csv_files(tmp_path):
+    path = tmp_path / "upload.csv"
+    path.write_text("reference,name\nREF1,a\nREF2,b\n")
+
+    assert _estimate_rows(str(path)) == 2
+
+
+def test_estimate_rows_from_a_sample_of_large_csv_files(tmp_path):
+    path = tmp_path / "upload.CSV"
+    path.write_text("reference,name\n" + "REF0001,a\n" * 999)
+
+    assert _estimate_rows(str(path), sample_bytes=100) == pytest.approx(999, rel=0.1)
+
+
+def test_estimate_rows_unknown_for_other_formats(tmp_path):
+    for name, content in [("upload.xlsx", b"PK\x03\x04"), ("abc123", b"a\n1\n")]:
+        path = tmp_path / name
+        path.write_bytes(content)
+
+        assert _estimate_rows(str(path)) is None
@@ -0,0 +1,153 @@
+import json
+import os
+
+from src.application.core import workspace as workspace_module
+from src.application.core.workspace import Workspace, remove_workspace
+
+
+def _configure(monkeypatch, tmp_path, backend="memory", max_mb=1):
+    memory_dir = tmp_path / "shm"
+    memory_dir.mkdir()
+    monkeypatch.setattr(workspace_module.config, "WORKSPACE_BACKEND", backend)
+    monkeypatch.setattr(
+        workspace_module.config, "WORKSPACE_MEMORY_DIR", str(memory_dir / "async")
+    )
+    monkeypatch.setattr(
+        workspace_module.config, "WORKSPACE_DISK_DIR", str(tmp_path / "disk")
+    )
+    monkeypatch.setattr(workspace_module.config, "WORKSPACE_MEMORY_MAX_MB", max_mb)
+    monkeypatch.setattr(workspace_module.config, "WORKSPACE_EXPANSION_FACTOR", 2)
+    monkeypatch.setattr(workspace_module.config, "WORKSPACE_MEMORY_BUDGET_MB", 1)
+    monkeypatch.setattr(workspace_module, "_reserved", {})
+    return memory_dir
+
+
+def test_workspace_uses_memory_backend_per_request(monkeypatch, tmp_path):
+    memory_dir = _configure(monkeypatch, tmp_path)
+
+    first = Workspace.create("req-1")
+    second = Workspace.create("req-2")
+
+    assert first.backend == "memory"
+    assert first.directories.COLLECTION_DIR.startswith(str(memory_dir))
+    assert first.directories.COLLECTION_DIR != second.directories.COLLECTION_DIR
+    assert first.directories.SPECIFICATION_DIR == "specification/"
+    assert first.directories.CACHE_DIR == "var/cache"
+
+
+def test_workspace_uses_disk_backend_when_configured(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path, backend="disk")
+
+    workspace = Workspace.create("req-1")
+
+    assert workspace.backend == "disk"
+    assert workspace.directories.COLLECTION_DIR.startswith(str(tmp_path / "disk"))
+
+
+def test_workspace_uses_given_directories(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+
+    workspace = Workspace.create(
+        "req-1", json.dumps({"COLLECTION_DIR": "/tmp/collection"})
+    )
+
+    assert workspace.backend == "custom"
+    assert workspace.directories.COLLECTION_DIR == "/tmp/collection"
+    workspace.fit(10 * 1024 * 1024)
+    assert workspace.directories.COLLECTION_DIR == "/tmp/collection"
+
+
+def test_workspace_moves_large_inputs_to_disk(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path, max_mb=1)
+    workspace = Workspace.create("req-1")
+    resource_dir = os.path.join(workspace.directories.COLLECTION_DIR, "resource")
+    os.makedirs(resource_dir)
+    with open(os.path.join(resource_dir, "large"), "wb") as f:
+        f.write(b"x" * 600 * 1024)
+
+    workspace.fit()
+
+    assert workspace.backend == "disk"
+    moved = os.path.join(workspace.directories.COLLECTION_DIR, "resource", "large")
+    assert moved.startswith(str(tmp_path / "disk"))
+    assert os.path.getsize(moved) == 600 * 1024
+
+
+def test_workspace_keeps_small_inputs_in_memory(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path, max_mb=1)
+    workspace = Workspace.create("req-1")
+
+    workspace.fit(1024)
+
+    assert workspace.backend == "memory"
+
+
+def test_remove_workspace(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    workspace = Workspace.create("req-1")
+    os.makedirs(workspace.directories.TRANSFORMED_DIR)
+
+    remove_workspace("req-1")
+
+    assert not os.path.exists(workspace.root)
+
+
+def test_workspace_held_on_disk_moves_to_memory_when_it_fits(monkeypatch, tmp_path):
+    memory_dir = _configure(monkeypatch, tmp_path, max_mb=1)
+    workspace = Workspace.create("req-1")
+
+    workspace.hold_on_disk()
+    os.makedirs(workspace.directories.COLLECTION_DIR)
+    with open(os.path.join(workspace.directories.COLLECTION_DIR, "a.csv"), "w") as f:
+        f.write("a,b\n1,2\n")
+
+    assert workspace.backend == "disk"
+    workspace.fit()
+
+    assert workspace.backend == "memory"
+    assert os.path.isfile(os.path.join(workspace.directories.COLLECTION_DIR, "a.csv"))
+    assert workspace.directories.COLLECTION_DIR.startswith(str(memory_dir))
+    assert not os.path.exists(tmp_path / "disk" / "req-1")
+
+
+def test_workspace_held_on_disk_stays_when_too_large(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path, max_mb=1)
+    workspace = Workspace.create("req-1")
+
+    workspace.hold_on_disk()
+    workspace.fit(1024 * 1024)
+
+    assert workspace.backend == "disk"
+
+
+def test_concurrent_workspaces_share_the_memory_budget(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path, max_mb=1)
+    first = Workspace.create("req-1")
+    second = Workspace.create("req-2")
+
+    first.fit(300 * 1024)
+    second.fit(300 * 1024)
+
+    assert first.backend == "memory"
+    assert second.backend == "disk"
+
+    remove_workspace("req-1")
+    third = Workspace.create("req-3")
+    third.fit(300 * 1024)
+
+    assert third.backend == "memory"
+
+
+def test_workspace_moved_to_disk_releases_its_reservation(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path, max_mb=1)
+    workspace = Workspace.create("req-1")
+    workspace.fit(300 * 1024)
+    os.makedirs(workspace.directories.COLLECTION_DIR)
+
+    directories = workspace.move_to_disk()
+
+    assert workspace.backend == "disk"
+    assert directories.COLLECTION_DIR.startswith(str(tmp_path / "disk"))
+    assert os.path.isdir(directories.COLLECTION_DIR)
+    assert workspace_module._reserved == {}
+    assert workspace.move_to_disk() is None
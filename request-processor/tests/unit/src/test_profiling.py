@@ -0,0 +1,72 @@
+import marshal
+import pstats
+from unittest.mock import MagicMock
+
+import profiling
+
+
+def _busy():
+    return sum(i * i for i in range(10000))
+
+
+def test_requested_profile_is_saved(monkeypatch):
+    saved = []
+    monkeypatch.setattr(
+        profiling,
+        "save_profile",
+        lambda request_id, profiler, seconds: saved.append((request_id, seconds)),
+    )
+
+    profiling.task_started("task-1", {"id": "req-1", "profile": True})
+    _busy()
+    profiling.task_finished("task-1", "req-1")
+
+    assert [request_id for request_id, _ in saved] == ["req-1"]
+    assert saved[0][1] >= 0
+
+
+def test_tasks_are_not_profiled_unless_requested_or_sampled(monkeypatch):
+    save_profile = MagicMock()
+    monkeypatch.setattr(profiling, "save_profile", save_profile)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+
+    profiling.task_started("task-2", {"id": "req-2"})
+    profiling.task_finished("task-2", "req-2")
+
+    save_profile.assert_not_called()
+
+
+def test_tasks_are_sampled(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1)
+
+    assert profiling.should_profile({"id": "req-3"})
+
+
+def test_saved_profile_loads_with_pstats(monkeypatch, tmp_path):
+    session = MagicMock()
+    session_maker = MagicMock()
+    session_maker.return_value.return_value.__enter__.return_value = session
+    monkeypatch.setattr(profiling.database, "session_maker", session_maker)
+
+    profiling.task_started("task-4", {"id": "req-4", "profile": True})
+    _busy()
+    profiling.task_finished("task-4", "req-4")
+
+    profile = session.add.call_args.args[0]
+    assert profile.request_id == "req-4"
+    assert "_busy" in profile.summary
+    path = tmp_path / "req-4.prof"
+    path.write_bytes(profile.data)
+    stats = pstats.Stats(str(path))
+    assert any(name == "_busy" for _, _, name in stats.stats)
+    assert marshal.loads(profile.data) == stats.stats
+    session.commit.assert_called_once()
+
+
+def test_failing_save_does_not_fail_the_task(monkeypatch):
+    monkeypatch.setattr(
+        profiling, "save_profile", MagicMock(side_effect=RuntimeError("db down"))
+    )
+
+    profiling.task_started("task-5", {"id": "req-5", "profile": True})
+    profiling.task_finished("task-5", "req-5")
@@ -0,0 +1,17 @@
+from src.s3_transfer_manager import MB, sized_transfer_config
+
+
+def test_sized_transfer_config_uses_a_single_get_for_small_objects():
+    config = sized_transfer_config(1 * MB)
+
+    assert config.use_threads is False
+
+
+def test_sized_transfer_config_scales_chunks_and_concurrency():
+    medium = sized_transfer_config(24 * MB)
+    large = sized_transfer_config(2048 * MB, max_concurrency=10)
+
+    assert medium.multipart_chunksize == 8 * MB
+    assert medium.max_concurrency == 3
+    assert large.multipart_chunksize == 21 * MB
+    assert large.max_concurrency == 10
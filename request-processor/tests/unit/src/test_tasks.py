@@ -477,7 +477,7 @@ def test_check_dataurl_with_plugin(monkeypatch):
 
     save_calls = []
 
-    def mock_save_response(req_id, response):
+    def mock_save_response(req_id, response, progress=None):
         save_calls.append(response)
 
     monkeypatch.setattr(
@@ -546,6 +546,10 @@ def test_check_dataurl_without_geom_type_and_column_mapping(monkeypatch):
         geom_type,
         column_mapping,
         directories,
+        progress=None,
+        stages=None,
+        stream_outputs=False,
+        move_to_disk=None,
     ):
         workflow_calls.append(
             {"geom_type": geom_type, "column_mapping": column_mapping}
@@ -616,6 +620,10 @@ def test_check_dataurl_workflow_called_with_correct_params(monkeypatch):
         geom_type,
         column_mapping,
         directories,
+        progress=None,
+        stages=None,
+        stream_outputs=False,
+        move_to_disk=None,
     ):
         workflow_calls.append(
             {
@@ -652,3 +660,175 @@ def test_check_dataurl_workflow_called_with_correct_params(monkeypatch):
     assert workflow_calls[0]["org"] == ""
     assert workflow_calls[0]["geom_type"] == "polygon"
     assert workflow_calls[0]["column_mapping"] == {"SiteReference": "reference"}
+
+
+def test_handle_check_file_refuses_large_files_before_downloading(monkeypatch):
+    monkeypatch.setenv("REQUEST_FILES_BUCKET_NAME", "bucket")
+    monkeypatch.setattr(
+        tasks.s3_transfer_manager,
+        "object_size",
+        lambda bucket, key: (tasks.S3_DOWNLOAD_MAX_MB + 1) * 1024 * 1024,
+    )
+    monkeypatch.setattr(
+        tasks.s3_transfer_manager,
+        "download_sized",
+        lambda *a, **kw: pytest.fail("large files should not be downloaded"),
+    )
+    saved = []
+    monkeypatch.setattr(
+        tasks, "save_response_to_db", lambda rid, log: saved.append(log)
+    )
+    workspace = MagicMock()
+    request_schema = MagicMock(id="req-large")
+    request_data = MagicMock(uploaded_filename="large.csv")
+
+    with pytest.raises(CustomException):
+        tasks.handle_check_file(request_schema, request_data, workspace)
+
+    assert saved[0]["message"].startswith("The uploaded file is larger than")
+    assert saved[0]["exception_type"] == "ObjectTooLargeError"
+    workspace.fit.assert_not_called()
+
+
+def test_handle_check_file_fits_workspace_to_object_size(monkeypatch, tmp_path):
+    monkeypatch.setenv("REQUEST_FILES_BUCKET_NAME", "bucket")
+    monkeypatch.setattr(
+        tasks.s3_transfer_manager, "object_size", lambda bucket, key: 2048
+    )
+    downloads = []
+
+    def mock_download_sized(bucket, key, path, max_concurrency, size):
+        downloads.append((key, path, size))
+        stats = tasks.s3_transfer_manager.TransferStats(size)
+        stats(size)
+        stats.seconds = 0.5
+        return stats
+
+    monkeypatch.setattr(
+        tasks.s3_transfer_manager, "download_sized", mock_download_sized
+    )
+    monkeypatch.setattr(tasks.sentry_sdk.metrics, "distribution", lambda *a, **kw: None)
+    workspace = MagicMock()
+    workspace.directories.COLLECTION_DIR = str(tmp_path)
+    request_schema = MagicMock(id="req-small")
+    request_data = MagicMock(uploaded_filename="small.csv")
+
+    file_name = tasks.handle_check_file(request_schema, request_data, workspace)
+
+    assert file_name == "small.csv"
+    workspace.fit.assert_called_once_with(2048)
+    assert downloads == [
+        ("small.csv", f"{tmp_path}/resource/req-small/small.csv", 2048)
+    ]
+
+
+def test_save_check_details_inserts_in_batches(monkeypatch):
+    monkeypatch.setattr(tasks, "RESPONSE_DETAILS_BATCH_ROWS", 2)
+    read = []
+
+    class ConvertedRows:
+        def __len__(self):
+            return 3
+
+        def __iter__(self):
+            for reference in ["A", "B", "C"]:
+                read.append(reference)
+                yield {"reference": reference}
+
+    batches = []
+    session = MagicMock()
+    session.execute.side_effect = lambda statement, rows: batches.append(
+        (list(read), rows)
+    )
+    response_data = {
+        "converted-csv": ConvertedRows(),
+        "issue-log": iter(
+            [
+                {"entry-number": "1", "issue-type": "missing value"},
+                {"entry-number": "3", "issue-type": "invalid"},
+                {"entry-number": "3", "issue-type": "missing value"},
+            ]
+        ),
+        "transformed-csv": iter(
+            [
+                {"entry-number": "1", "field": "reference"},
+                {"entry-number": "1", "field": "name"},
+                {"entry-number": "3", "field": "reference"},
+            ]
+        ),
+    }
+
+    progress = []
+    tasks._save_check_details(
+        session, "resp-1", response_data, lambda *args: progress.append(args)
+    )
+
+    assert progress == [
+        ("persisting", 0, 3),
+        ("persisting", 2, 3),
+        ("persisting", 3, 3),
+    ]
+    # Each batch is inserted before the next rows are read
+    assert [(seen, len(rows)) for seen, rows in batches] == [
+        (["A", "B"], 2),
+        (["A", "B", "C"], 1),
+    ]
+    details = [row["detail"] for _, rows in batches for row in rows]
+    assert [len(detail["transformed_row"]) for detail in details] == [2, 0, 1]
+    assert [len(detail["issue_logs"]) for detail in details] == [1, 0, 2]
+    assert details[2]["converted_row"] == {"reference": "C"}
+    assert all(row["response_id"] == "resp-1" for _, rows in batches for row in rows)
+
+
+@pytest.mark.parametrize(
+    "status, progress",
+    [("PROCESSING", {"stage": "fetching"}), ("COMPLETE", None), ("FAILED", None)],
+)
+def test_update_request_status_clears_progress_when_finished(
+    monkeypatch, status, progress
+):
+    model = MagicMock(progress={"stage": "fetching"})
+    monkeypatch.setattr(tasks.database, "session_maker", lambda: MagicMock())
+    monkeypatch.setattr(tasks.crud, "get_request", lambda session, request_id: model)
+
+    tasks._update_request_status("req-001", status)
+
+    assert model.status == status
+    assert model.progress == progress
+
+
+@pytest.mark.parametrize(
+    "url, size, fitted, held",
+    [
+        ("https://example.com/data.csv", 2048, [2048], False),
+        ("https://example.com/data.csv", None, [], True),
+        (
+            "https://example.com/arcgis/rest/services/Trees/FeatureServer/0",
+            10,
+            [],
+            True,
+        ),
+    ],
+)
+def test_fit_workspace_to_url_before_fetching(monkeypatch, url, size, fitted, held):
+    monkeypatch.setattr(tasks.utils, "content_length", lambda url: size)
+    workspace = MagicMock(backend="memory")
+
+    tasks._fit_workspace_to_url(workspace, url)
+
+    assert [c.args[0] for c in workspace.fit.call_args_list] == fitted
+    assert workspace.hold_on_disk.called == held
+
+
+def test_fit_workspace_to_url_skips_disk_workspaces(monkeypatch):
+    monkeypatch.setattr(
+        tasks.utils,
+        "content_length",
+        lambda url: pytest.fail("disk workspaces should not be sized"),
+    )
+    workspace = MagicMock(backend="disk")
+
+    tasks._fit_workspace_to_url(workspace, "https://example.com/data.csv")
+
+    workspace.fit.assert_not_called()
+    workspace.hold_on_disk.assert_not_called()
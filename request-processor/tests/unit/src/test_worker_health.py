@@ -0,0 +1,155 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+import worker_health
+from task_interface import aws_clients
+from task_interface.health import HealthMonitor
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(
+        worker_health,
+        "health_monitor",
+        HealthMonitor({"request-db": lambda: True, "sqs": lambda: True}),
+    )
+    monkeypatch.setattr(worker_health, "_pool_heartbeat", None)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), worker_health.HealthRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_health_reports_pool_and_dependencies(server, monkeypatch):
+    monkeypatch.setattr(
+        worker_health, "_pool_heartbeat", worker_health.time.monotonic()
+    )
+
+    status, body = _get(f"{server}/health")
+    health = json.loads(body)
+
+    assert status == 200
+    assert health["name"] == "request-processor"
+    assert health["dependencies"] == [
+        {"name": "request-db", "status": "HEALTHY"},
+        {"name": "sqs", "status": "HEALTHY"},
+    ]
+    assert health["pool"]["heartbeat_age_seconds"] < 5
+
+
+def test_health_ignores_a_stale_pool_heartbeat(server, monkeypatch):
+    monkeypatch.setattr(
+        worker_health, "_pool_heartbeat", worker_health.time.monotonic() - 600
+    )
+
+    status, body = _get(f"{server}/health/live")
+
+    assert status == 200
+    assert json.loads(body)["heartbeat_age_seconds"] >= 600
+    assert _get(f"{server}/health")[0] == 200
+
+
+def test_health_is_unhealthy_when_a_dependency_is_down(server, monkeypatch):
+    monkeypatch.setattr(
+        worker_health, "_pool_heartbeat", worker_health.time.monotonic()
+    )
+    monkeypatch.setattr(
+        worker_health,
+        "health_monitor",
+        HealthMonitor({"sqs": MagicMock(side_effect=RuntimeError("down"))}),
+    )
+
+    status, body = _get(f"{server}/health")
+
+    assert status == 500
+    assert json.loads(body)["dependencies"] == [{"name": "sqs", "status": "UNHEALTHY"}]
+
+
+def test_metrics_include_finished_tasks(server):
+    worker_health.task_started("task-1", "check_url")
+    worker_health.task_finished("task-1", "success")
+
+    status, body = _get(f"{server}/metrics")
+
+    assert status == 200
+    assert b'worker_tasks_total{outcome="success",task="check_url"}' in body
+    assert b"worker_task_duration_seconds_count" in body
+
+
+def test_metrics_include_aws_clients_created(server):
+    aws_clients.reset()
+    aws_clients.client("sqs", region_name="eu-west-2")
+
+    status, body = _get(f"{server}/metrics")
+
+    assert status == 200
+    assert b'aws_clients_created_total{service="sqs"}' in body
+    aws_clients.reset()
+
+
+BLOCKED_WORKER = """
+import time
+
+import eventlet
+
+eventlet.monkey_patch()
+
+import worker_health
+from task_interface import aws_clients
+from task_interface.health import HealthMonitor
+
+worker_health.health_monitor = HealthMonitor({"sqs": lambda: True})
+server = worker_health.start("127.0.0.1", 0)
+eventlet.sleep(0.5)
+print(server.server_address[1], flush=True)
+# CPU-bound, like a transform, so the event loop never runs
+end = time.monotonic() + 30
+while time.monotonic() < end:
+    pass
+"""
+
+
+def test_health_answers_while_a_task_blocks_the_event_loop():
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(
+            ["src", os.path.join("..", "."), os.environ.get("PYTHONPATH", "")]
+        ),
+        WORKER_HEARTBEAT_INTERVAL_SECONDS="0.1",
+    )
+    worker = subprocess.Popen(
+        [sys.executable, "-c", BLOCKED_WORKER], stdout=subprocess.PIPE, env=env
+    )
+    try:
+        url = f"http://127.0.0.1:{int(worker.stdout.readline())}"
+        time.sleep(2)
+
+        live_status, live = _get(f"{url}/health/live")
+        status, body = _get(f"{url}/health")
+
+        assert live_status == 200
+        assert json.loads(live)["heartbeat_age_seconds"] >= 2
+        assert status == 200
+        assert json.loads(body)["dependencies"] == [
+            {"name": "sqs", "status": "HEALTHY"}
+        ]
+    finally:
+        worker.kill()
+        worker.wait()
@@ -1,6 +1,16 @@
 import shortuuid
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Float,
+    LargeBinary,
+    Text,
+    func,
+    ForeignKey,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -18,6 +28,7 @@ class Request(Base):
     status = Column(String)
     params = Column(JSONB)
     type = Column(String)
+    progress = Column(JSONB)
 
     response = relationship(
         "Response", uselist=False, back_populates="request", lazy="joined"
@@ -48,5 +59,17 @@ class ResponseDetails(Base):
     response = relationship("Response", back_populates="details")
 
 
+class RequestProfile(Base):
+    __tablename__ = "request_profile"
+
+    id = Column(Integer, primary_key=True)
+    request_id = Column(String, ForeignKey("request.id"), index=True)
+    created = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    seconds = Column(Float)
+    summary = Column(Text)
+    # cProfile stats in the pstats file format
+    data = Column(LargeBinary)
+
+
 class ResponseData(BaseModel):
     message: str
@@ -87,6 +87,13 @@ class ResponseModel(BaseModel):
     error: Optional[Dict[str, Any]]
 
 
+class Progress(BaseModel):
+    stage: str
+    rows_processed: Optional[int] = None
+    rows_total: Optional[int] = None
+    updated: Optional[datetime.datetime] = None
+
+
 class Request(RequestBase):
     id: str
     type: RequestTypeEnum
@@ -94,4 +101,5 @@ class Request(RequestBase):
     created: datetime.datetime
     modified: datetime.datetime
     response: Optional[ResponseModel]
+    progress: Optional[Progress] = None
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,86 @@
+"""
+Shared AWS clients for the api and the worker.
+
+Creating a boto3 client resolves credentials and loads endpoint data, so
+clients are created on first use and then reused by every request and task.
+boto3 clients are thread safe, the default session is not, so clients are
+created from a session of their own under a lock. Clients created are counted
+in aws_clients_created_total, served from the /metrics of the api and worker.
+"""
+
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+from task_interface import tracing
+
+try:
+    from sentry_sdk import metrics as sentry_metrics
+except ImportError:  # pragma: no cover
+    sentry_metrics = None
+
+try:
+    from prometheus_client import Counter
+except ImportError:  # pragma: no cover
+    Counter = None
+
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "20"))
+AWS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("AWS_CONNECT_TIMEOUT_SECONDS", "5"))
+AWS_READ_TIMEOUT_SECONDS = float(os.environ.get("AWS_READ_TIMEOUT_SECONDS", "60"))
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "5"))
+
+_session = None
+_clients = {}
+_lock = threading.Lock()
+CLIENTS_CREATED = (
+    Counter("aws_clients_created_total", "Shared AWS clients created", ["service"])
+    if Counter is not None
+    else None
+)
+
+
+def client_config():
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=AWS_READ_TIMEOUT_SECONDS,
+        retries={"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS},
+    )
+
+
+def client(service_name, region_name=None, endpoint_url=None):
+    """The shared client for service_name, created on first use."""
+    global _session
+    key = (service_name, region_name, endpoint_url)
+    aws_client = _clients.get(key)
+    if aws_client is not None:
+        return aws_client
+    with _lock:
+        aws_client = _clients.get(key)
+        if aws_client is None:
+            if _session is None:
+                _session = boto3.session.Session()
+            aws_client = _session.client(
+                service_name,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=client_config(),
+            )
+            tracing.trace_aws_calls(aws_client)
+            _clients[key] = aws_client
+            if CLIENTS_CREATED is not None:
+                CLIENTS_CREATED.labels(service_name).inc()
+            count = getattr(sentry_metrics, "count", None)
+            if count is not None:
+                count("aws.client.created", 1, attributes={"service": service_name})
+    return aws_client
+
+
+def reset():
+    """Drop the shared clients, e.g. after credentials change or in tests."""
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
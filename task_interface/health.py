@@ -0,0 +1,128 @@
+"""
+Dependency health probed in the background, for the api and the worker.
+
+Health checks read the last result instead of querying the database and SQS
+on every call, so a slow dependency can't make the health check itself slow.
+Each probe runs with a timeout, and a probe that is still stuck from an
+earlier round counts as unhealthy without starting another.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime, timezone
+
+HEALTH_PROBE_INTERVAL_SECONDS = float(
+    os.environ.get("HEALTH_PROBE_INTERVAL_SECONDS", "15")
+)
+HEALTH_PROBE_TIMEOUT_SECONDS = float(
+    os.environ.get("HEALTH_PROBE_TIMEOUT_SECONDS", "5")
+)
+# Results older than this are not trusted, e.g. when the probe loop has stalled
+HEALTH_MAX_AGE_SECONDS = float(
+    os.environ.get("HEALTH_MAX_AGE_SECONDS", str(HEALTH_PROBE_INTERVAL_SECONDS * 3))
+)
+
+
+class HealthMonitor:
+    """Runs named probes on an interval and keeps the latest results."""
+
+    def __init__(
+        self,
+        probes,
+        interval=HEALTH_PROBE_INTERVAL_SECONDS,
+        timeout=HEALTH_PROBE_TIMEOUT_SECONDS,
+        max_age=HEALTH_MAX_AGE_SECONDS,
+        on_unhealthy=None,
+        clock=time.monotonic,
+    ):
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = max_age
+        self.on_unhealthy = on_unhealthy
+        self.clock = clock
+        self.results = {}
+        self.checked = None
+        self._checked_at = None
+        self._running = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(probes), thread_name_prefix="health-probe"
+        )
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def probe(self):
+        """Run every probe once, waiting at most timeout for them together."""
+        futures = {}
+        for name, probe in self.probes.items():
+            running = self._running.get(name)
+            if running is None or running.done():
+                running = self._running[name] = self._executor.submit(probe)
+            futures[name] = running
+
+        deadline = self.clock() + self.timeout
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = bool(
+                    future.result(timeout=max(deadline - self.clock(), 0))
+                )
+            except TimeoutError:
+                logging.warning(f"Health check of {name} timed out")
+                results[name] = False
+            except Exception:
+                logging.exception(f"Health check of {name} failed")
+                results[name] = False
+
+        with self._lock:
+            previous = self.results
+            self.results = results
+            self.checked = datetime.now(timezone.utc)
+            self._checked_at = self.clock()
+        if self.on_unhealthy:
+            for name, healthy in results.items():
+                if not healthy and previous.get(name, True):
+                    self.on_unhealthy(name)
+        return results
+
+    def status(self):
+        """
+        The latest results, when they were checked and their age in seconds.
+        Probes run now if there are no results yet.
+        """
+        with self._lock:
+            checked_at = self._checked_at
+        if checked_at is None:
+            self.probe()
+        with self._lock:
+            return dict(self.results), self.checked, self.clock() - self._checked_at
+
+    def is_fresh(self, age):
+        return age <= self.max_age
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="health-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception:
+                logging.exception("Health probes failed")
+            self._stop.wait(self.interval)
@@ -0,0 +1,372 @@
+"""
+Tracing spans for the api and the worker.
+
+With tracing enabled, Sentry's integrations already trace each request and
+task, along with their HTTP, S3 and database calls. span() adds the workflow
+stages to those traces.
+
+When TRACE_EXPORT_FILE is set, spans are also appended to that file as
+OpenTelemetry (OTLP) JSON lines, which the OpenTelemetry Collector's
+otlpjsonfile receiver and most trace viewers read, so traces can be analysed
+offline without Sentry. Locally exported traces start in the api and are
+carried to the worker in a W3C traceparent header on the Celery message.
+Outbound calls are only exported as children of a span, so queries made
+outside a request or task do not start traces of their own.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from celery.signals import before_task_publish
+
+try:
+    import sentry_sdk
+except ImportError:  # pragma: no cover
+    sentry_sdk = None
+
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE")
+
+# OpenTelemetry span kinds
+INTERNAL, SERVER, CLIENT, PRODUCER, CONSUMER = 1, 2, 3, 4, 5
+
+_current = ContextVar("trace_span", default=None)
+_exporter = None
+_task_spans = {}
+_queries_traced = False
+
+
+class Span:
+    """One span of a trace, exported in the OTLP JSON shape when it ends."""
+
+    def __init__(self, name, trace_id, parent_id=None, kind=INTERNAL, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self.error = None
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns()
+        self.error = error
+        if _exporter is not None:
+            _exporter.export(self)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [
+                _attribute(key, value) for key, value in self.attributes.items()
+            ],
+            "status": {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": 2, "message": str(self.error)}
+        return span
+
+
+class _NoSpan:
+    """Stands in for a span when nothing is exported."""
+
+    traceparent = None
+
+    def set(self, key, value):
+        pass
+
+    def end(self, error=None):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _parse_traceparent(traceparent):
+    parts = traceparent.split("-") if traceparent else []
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+class FileSpanExporter:
+    """Appends each span to a file as a line of OTLP JSON."""
+
+    def __init__(self, path, service_name):
+        self.path = path
+        self.service_name = service_name
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                _attribute("service.name", self.service_name)
+                            ]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": "async-request-backend"},
+                                "spans": [span.to_otlp()],
+                            }
+                        ],
+                    }
+                ]
+            }
+        )
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def init(service_name, path=TRACE_EXPORT_FILE):
+    """Export spans to the file at path, if there is one. Called once per process."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = FileSpanExporter(path, service_name) if path else None
+    if _exporter is not None:
+        _trace_queries()
+
+
+def start_span(name, kind=INTERNAL, parent=None, **attributes):
+    """
+    A span that is a child of parent, a span or traceparent header, or of the
+    current span. It is only recorded when spans are exported.
+    """
+    if _exporter is None:
+        return NO_SPAN
+    if parent is None:
+        parent = _current.get()
+    if isinstance(parent, Span):
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = _parse_traceparent(parent)
+    return Span(name, trace_id or secrets.token_hex(16), parent_id, kind, attributes)
+
+
+def child_span(name, kind=CLIENT, **attributes):
+    """A span for a call made within the current span, if there is one."""
+    if _current.get() is None:
+        return NO_SPAN
+    return start_span(name, kind, **attributes)
+
+
+def activate(span):
+    """Make span the current span, returning a token for deactivate."""
+    if span is NO_SPAN:
+        return None
+    return _current.set(span)
+
+
+def deactivate(token):
+    if token is not None:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name, op, kind=INTERNAL, **attributes):
+    """
+    Trace the block as a Sentry span and, when exporting, as the current span.
+    Attributes set on the yielded span are only exported locally.
+    """
+    local = start_span(name, kind, **attributes)
+    token = activate(local)
+    sentry_span = (
+        sentry_sdk.start_span(op=op, description=name) if sentry_sdk else nullcontext()
+    )
+    try:
+        with sentry_span as s:
+            if s is not None:
+                for key, value in attributes.items():
+                    s.set_data(key, value)
+            yield local
+    except BaseException as e:
+        local.end(error=e)
+        raise
+    finally:
+        deactivate(token)
+        local.end()
+
+
+@contextmanager
+def client_call(name, kind=CLIENT, **attributes):
+    """
+    Export an outbound call within the current span. Sentry's integrations
+    already span these calls, so they are only exported locally.
+    """
+    call = child_span(name, kind, **attributes)
+    try:
+        yield call
+    except BaseException as e:
+        call.end(error=e)
+        raise
+    finally:
+        call.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware starting a trace for each request, continuing any traceparent sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        request_span = start_span(
+            f"{scope['method']} {scope['path']}",
+            SERVER,
+            parent=traceparent or None,
+            **{"http.request.method": scope["method"], "url.path": scope["path"]},
+        )
+        token = activate(request_span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                request_span.set("http.response.status_code", message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            request_span.end(error=e)
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                request_span.name = f"{scope['method']} {route.path}"
+                request_span.set("http.route", route.path)
+            deactivate(token)
+            request_span.end()
+
+
+@before_task_publish.connect
+def _inject_traceparent(headers=None, **_kwargs):
+    current_span = _current.get()
+    if headers is not None and current_span is not None:
+        headers["traceparent"] = current_span.traceparent
+
+
+def task_started(task_id, task):
+    """Start the span of a task, continuing the trace of the request that sent it."""
+    task_span = start_span(
+        task.name,
+        CONSUMER,
+        parent=getattr(task.request, "traceparent", None),
+        **{"messaging.system": "celery", "messaging.message.id": task_id},
+    )
+    _task_spans[task_id] = (task_span, activate(task_span))
+
+
+def task_finished(task_id, error=None):
+    task_span, token = _task_spans.pop(task_id, (NO_SPAN, None))
+    deactivate(token)
+    task_span.end(error=error)
+
+
+def trace_aws_calls(aws_client):
+    """Export each call made by a boto3 client."""
+    events = aws_client.meta.events
+    events.register("before-call", _before_aws_call)
+    events.register("after-call", _after_aws_call)
+    events.register("after-call-error", _after_aws_call)
+
+
+def _before_aws_call(model, context, **_kwargs):
+    service = model.service_model.service_name
+    context["trace_span"] = child_span(
+        f"{service}.{model.name}",
+        CLIENT,
+        **{"rpc.system": "aws-api", "rpc.service": service, "rpc.method": model.name},
+    )
+
+
+def _after_aws_call(context, exception=None, **_kwargs):
+    context.pop("trace_span", NO_SPAN).end(error=exception)
+
+
+def _trace_queries():
+    """Export each database query, in either app."""
+    global _queries_traced
+    if _queries_traced:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, "before_cursor_execute", _before_query)
+    event.listen(Engine, "after_cursor_execute", _after_query)
+    event.listen(Engine, "handle_error", _query_error)
+    _queries_traced = True
+
+
+def _before_query(conn, cursor, statement, parameters, context, many):
+    operation = statement.split(None, 1)[0].upper() if statement.strip() else "QUERY"
+    conn.info.setdefault("trace_spans", []).append(
+        child_span(
+            operation,
+            CLIENT,
+            **{"db.system": conn.dialect.name, "db.statement": statement},
+        )
+    )
+
+
+def _after_query(conn, cursor, statement, parameters, context, many):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        spans.pop().end()
+
+
+def _query_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        spans.pop().end(error=exception_context.original_exception)